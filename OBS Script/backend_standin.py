@@ -0,0 +1,190 @@
+# Local stand-in for the backend's event export routes.
+# Serves <export dir>/<event name>.json the way GET /openapi/event/:eventName/export does (Express sendFile:
+# ETag, Last-Modified and 304 on conditional requests), so fetching lineups can be tried without the
+# backend and its database. Connections are kept alive and counted.
+
+import json
+import os
+import socket
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import unquote
+
+EXPORT_PREFIX = "/openapi/event/"
+EXPORT_SUFFIX = "/export"
+
+
+class BackendStandin:
+    """HTTP server on localhost serving the exports in export_dir, port 0 picks a free port.
+
+    with BackendStandin(export_dir) as backend:
+        LineupFetcher(backend.url, cache_dir).fetch("My Event")
+    """
+
+    def __init__(self, export_dir, port=0, host="127.0.0.1"):
+        self.export_dir = Path(export_dir)
+        self.host = host
+        # Status code answered to every request instead of the export, e.g. 500
+        self.fail_status = None
+        self.connections = 0
+        self.open_sockets = set()
+        # [(method, event name, status)]
+        self.requests = []
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like Express
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                standin.connections += 1
+                standin.open_sockets.add(self.request)
+
+            def finish(self):
+                standin.open_sockets.discard(self.request)
+                super().finish()
+
+            def do_GET(self):
+                standin.serve_export(self)
+
+            def do_POST(self):
+                standin.serve_post(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        # Kept-alive connections would otherwise keep being served
+        for sock in list(self.open_sockets):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+        return False
+
+    def write_export(self, event_name, data):
+        # What POST /:eventName/export leaves in EXPORT_ROOT
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.export_dir.joinpath(event_name + ".json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def event_name(self, handler):
+        path = handler.path.split("?", 1)[0]
+        if not (path.startswith(EXPORT_PREFIX) and path.endswith(EXPORT_SUFFIX)):
+            return None
+        name = unquote(path[len(EXPORT_PREFIX):-len(EXPORT_SUFFIX)])
+        return name if name and "/" not in name and name not in (".", "..") else None
+
+    def send(self, handler, status, body=b"", headers=()):
+        handler.send_response(status)
+        for key, value in headers:
+            handler.send_header(key, value)
+        if status != 304:
+            handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        if body and handler.command != "HEAD":
+            handler.wfile.write(body)
+
+    def send_error_json(self, handler, status, error_type, message):
+        body = json.dumps({"errorType": error_type, "message": message}).encode()
+        self.send(handler, status, body, [("Content-Type", "application/json; charset=utf-8")])
+
+    def serve_export(self, handler):
+        name = self.event_name(handler)
+        if self.fail_status:
+            self.requests.append(("GET", name, self.fail_status))
+            self.send_error_json(handler, self.fail_status, "Error", "Stand-in failure")
+            return
+        path = self.export_dir.joinpath(f"{name}.json") if name else None
+        if path is None or not path.is_file():
+            self.requests.append(("GET", name, 404))
+            self.send_error_json(handler, 404, "Error", f"Event {name} has not been exported")
+            return
+        stat = os.stat(path)
+        # Same weak validator as Express: size and mtime in hex
+        etag = f'W/"{stat.st_size:x}-{int(stat.st_mtime * 1000):x}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+        headers = [("ETag", etag), ("Last-Modified", last_modified), ("Cache-Control", "public, max-age=0")]
+        if self.not_modified(handler, etag, stat.st_mtime):
+            self.requests.append(("GET", name, 304))
+            self.send(handler, 304, headers=headers)
+            return
+        with open(path, "rb") as f:
+            body = f.read()
+        self.requests.append(("GET", name, 200))
+        self.send(handler, 200, body, headers + [("Content-Type", "application/json; charset=UTF-8")])
+
+    def not_modified(self, handler, etag, mtime):
+        if_none_match = handler.headers.get("If-None-Match")
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(",")]
+        if_modified_since = handler.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def serve_post(self, handler):
+        # Exports are written with write_export, a POST only reports whether one exists
+        length = int(handler.headers.get("Content-Length") or 0)
+        handler.rfile.read(length)
+        name = self.event_name(handler)
+        exists = name and self.export_dir.joinpath(f"{name}.json").is_file()
+        self.requests.append(("POST", name, 200 if exists else 409))
+        if exists:
+            self.send(handler, 200)
+        else:
+            self.send_error_json(handler, 409, "Error", f"{name} has no export")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve exported events like the backend's export route")
+    parser.add_argument("export_dir", help="Directory of <event name>.json exports")
+    parser.add_argument("--port", type=int, default=4004)
+    args = parser.parse_args()
+
+    backend = BackendStandin(args.export_dir, args.port, host="0.0.0.0")
+    backend.start()
+    print(f"Serving {args.export_dir} on http://127.0.0.1:{backend.port}{EXPORT_PREFIX}<event name>{EXPORT_SUFFIX}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        backend.stop()
+
+
+if __name__ == "__main__":
+    main()
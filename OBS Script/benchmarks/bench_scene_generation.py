@@ -0,0 +1,160 @@
+"""Scene generation benchmark, runs the hijack script against fake_obs.FakeObs.
+
+Usage: python "OBS Script/benchmarks/bench_scene_generation.py" [--sizes 10 100 1000] [--json out.json]
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).absolute().parent.parent
+sys.path.insert(0, str(SCRIPT_DIR))
+sys.path.insert(0, str(Path(__file__).absolute().parent))
+
+import shizu_obs_hijack_script as hijack_script  # noqa: E402
+from fake_obs import FakeObs  # noqa: E402
+from lineup_model import parse_lineup  # noqa: E402
+from reconcile import LineupReconciler  # noqa: E402
+from scene_collection import SceneCollectionBackend  # noqa: E402
+from synthetic_lineup import make_lineup  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000]
+PHASES = ["parse_lineup", "init_lineup_data", "render_text_cards", "generate_scenes", "generate_objects", "reconcile", "reapply"]
+
+
+def identity_path_map():
+    # Docker and host roots are the same, still exercises the translation code
+    path_map = {}
+    for name in ["LOGOS", "RECORDINGS", "THEMES", "GENERIC_VISUALS"]:
+        root = f"/var/{name.lower().replace('generic_', '')}"
+        path_map[f"DOCKER_{name}_PATH"] = root
+        path_map[f"LOCAL_{name}_PATH"] = root
+    return path_map
+
+
+def run_phases(lineup_text, host_paths, on_phase):
+    # Execute one full generation, on_phase(backend, results, name, fn) runs each phase.
+    # Scenes are planned in memory like Hijack.begin, then applied to a fake live OBS twice
+    backend = SceneCollectionBackend()
+    hijack_script.set_obs_backend(backend)
+    hijack = hijack_script.Hijack()
+    hijack.host_paths = host_paths
+    hijack.generate_macros = True
+    hijack.path_translation_map = identity_path_map() if host_paths else {}
+    hijack.path_translator = hijack_script.PathTranslator(hijack.path_translation_map) if host_paths else None
+    hijack.ass_manager = hijack_script.AdvancedSceneSwitchManager()
+
+    results = {}
+    lineup_data = on_phase(backend, results, "parse_lineup", lambda: parse_lineup(lineup_text))
+    lineup = on_phase(backend, results, "init_lineup_data", lambda: hijack.init_lineup_data(lineup_data))
+    # Cached in OBS Script/.cache after the first run, like in OBS
+    on_phase(backend, results, "render_text_cards", lambda: hijack.render_text_cards(lineup))
+    on_phase(backend, results, "generate_scenes", lambda: hijack.generate_scenes(lineup))
+    on_phase(
+        backend,
+        results,
+        "generate_objects",
+        lambda: hijack.ass_manager.generate_objects(hijack.promos_scene_name, hijack_script.ENDING_SCENE),
+    )
+    live = FakeObs()
+    on_phase(live, results, "reconcile", lambda: LineupReconciler(live, backend).apply())
+    # Unchanged lineup, should touch nothing
+    on_phase(live, results, "reapply", lambda: LineupReconciler(live, backend).apply())
+    return live, results
+
+
+def bench_size(dj_count, host_paths):
+    lineup_data = make_lineup(dj_count)
+    # Parsed from text like an export file
+    lineup_text = json.dumps(lineup_data)
+    devnull = open(os.devnull, "w")
+
+    # Pass 1: wall time and OBS call counts, without tracemalloc overhead
+    def timed(backend, results, name, fn):
+        calls_before = backend.total_calls
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(devnull):
+            value = fn()
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "wall_ms": elapsed * 1000,
+            "obs_calls": backend.total_calls - calls_before,
+        }
+        return value
+
+    # Pass 2: peak Python memory per phase
+    def traced(backend, results, name, fn):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        with contextlib.redirect_stdout(devnull):
+            value = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        results[name] = {"peak_kib": (peak - base) / 1024}
+        return value
+
+    try:
+        backend, timings = run_phases(lineup_text, host_paths, timed)
+        tracemalloc.start()
+        try:
+            _, memory = run_phases(lineup_text, host_paths, traced)
+        finally:
+            tracemalloc.stop()
+    finally:
+        devnull.close()
+
+    for name in PHASES:
+        timings[name].update(memory[name])
+    return {
+        "djs": dj_count,
+        "promos": len(lineup_data["promos"]),
+        "phases": timings,
+        "scenes": len(backend.scenes),
+        "sources": len(backend.sources),
+        "outstanding_handles": len(backend.outstanding()),
+        "over_released": len(backend.over_released),
+        "top_calls": backend.calls.most_common(5),
+    }
+
+
+def print_report(reports):
+    header = f"{'DJs':>6} {'phase':<18} {'wall ms':>10} {'OBS calls':>10} {'peak KiB':>10}"
+    print(header)
+    print("-" * len(header))
+    for report in reports:
+        for name in PHASES:
+            phase = report["phases"][name]
+            print(
+                f"{report['djs']:>6} {name:<18} {phase['wall_ms']:>10.2f} "
+                f"{phase['obs_calls']:>10} {phase['peak_kib']:>10.1f}"
+            )
+        print(
+            f"{'':>6} scenes: {report['scenes']}, sources: {report['sources']}, "
+            f"outstanding handles: {report['outstanding_handles']}, "
+            f"over-released: {report['over_released']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="DJ counts to benchmark")
+    parser.add_argument("--host-paths", action="store_true", help="Exercise docker->host path translation")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+    # Only the report is printed, not the script log
+    hijack_script.log.setLevel(logging.WARNING)
+
+    reports = [bench_size(size, args.host_paths) for size in args.sizes]
+    print_report(reports)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
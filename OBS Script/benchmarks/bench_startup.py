@@ -0,0 +1,138 @@
+"""Script load benchmark, what OBS pays when it (re)loads the hijack script.
+
+Imports the script in fresh interpreters (median of --runs) and lists the slowest modules from -X importtime,
+then times .env parsing cold and from the cache.
+
+Usage: python "OBS Script/benchmarks/bench_startup.py" [--runs 10] [--top 10] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).absolute().parent.parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+SCRIPT_MODULE = "shizu_obs_hijack_script"
+# Must stay out of script load, only imported when a feature needs them
+HEAVY_MODULES = ["PIL", "PIL.Image", "subprocess", "argparse", "platform", "http.client"]
+ENV_KEYS = 200
+ENV_REPEATS = 1000
+
+IMPORT_SNIPPET = f"""
+import json, sys, time
+start = time.perf_counter()
+import {SCRIPT_MODULE}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"import_ms": elapsed * 1000, "heavy": [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+"""
+
+
+def interpreter_env():
+    env = dict(os.environ)
+    # OBS keeps compiled bytecode, without it every run measures compilation
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def run_import(extra_args=()):
+    result = subprocess.run(
+        [sys.executable, *extra_args, "-c", IMPORT_SNIPPET],
+        cwd=SCRIPT_DIR, env=interpreter_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+
+def parse_importtime(stderr):
+    # [(self us, cumulative us, module)] from -X importtime output
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), int(cumulative_us), name.strip()))
+    return modules
+
+
+def bench_import(runs, top):
+    run_import()  # writes the bytecode cache
+    samples = []
+    heavy = []
+    for _ in range(runs):
+        result, _ = run_import()
+        samples.append(result["import_ms"])
+        heavy = result["heavy"]
+    _, stderr = run_import(["-X", "importtime"])
+    modules = sorted(parse_importtime(stderr), reverse=True)[:top]
+    return {
+        "runs": runs,
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "heavy_modules_loaded": heavy,
+        "slowest_modules": [
+            {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for self_us, cumulative_us, name in modules
+        ],
+    }
+
+
+def bench_env():
+    import shizu_obs_hijack_script as hijack_script
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env_path = os.path.join(temp_dir, ".env")
+        with open(env_path, "w") as f:
+            f.write("# Generated for the startup benchmark\n\n")
+            for index in range(ENV_KEYS):
+                f.write(f'DOCKER_ROOT_{index}_PATH="/var/root_{index}"\n')
+
+        start = time.perf_counter()
+        _, cached = hijack_script.read_env_file(env_path)
+        cold_ms = (time.perf_counter() - start) * 1000
+        assert not cached
+
+        start = time.perf_counter()
+        for _ in range(ENV_REPEATS):
+            _, cached = hijack_script.read_env_file(env_path)
+        cached_ms = (time.perf_counter() - start) * 1000 / ENV_REPEATS
+        assert cached
+    return {"keys": ENV_KEYS, "cold_ms": cold_ms, "cached_ms": cached_ms}
+
+
+def print_report(report):
+    imports = report["import"]
+    print(
+        f"Script import: median {imports['median_ms']:.1f} ms "
+        f"(min {imports['min_ms']:.1f}, max {imports['max_ms']:.1f}, {imports['runs']} runs)"
+    )
+    print(f"Heavy modules loaded: {', '.join(imports['heavy_modules_loaded']) or 'none'}")
+    print(f"{'module':<36} {'self ms':>8} {'cum ms':>8}")
+    for module in imports["slowest_modules"]:
+        print(f"{module['module']:<36} {module['self_ms']:>8.2f} {module['cumulative_ms']:>8.2f}")
+    env = report["env"]
+    print(f".env parse ({env['keys']} keys): cold {env['cold_ms']:.3f} ms, cached {env['cached_ms']:.4f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters to time the import in")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = {"import": bench_import(args.runs, args.top), "env": bench_env()}
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Synthetic lineups shaped like the backend's event export (see export_event in backend/src/database.ts)
+
+DOCKER_LOGOS_PATH = "/var/logos"
+DOCKER_RECORDINGS_PATH = "/var/recordings"
+DOCKER_THEMES_PATH = "/var/themes"
+DOCKER_GENERIC_VISUALS_PATH = "/var/visuals"
+
+GENERIC_VISUALS = ["generic_a.mp4", "generic_b.mp4", "generic_c.mp4"]
+
+
+def make_dj(index):
+    # Rotate through the shapes an export can contain:
+    # live, recording only, recording + own visuals, recording + generic visuals
+    kind = index % 4
+    dj = {
+        "name": f"DJ {index:04d}",
+        "logo_path": f"{DOCKER_LOGOS_PATH}/dj_{index:04d}.png" if index % 3 else "",
+        "recording_path": "",
+        "visuals_path": "",
+        "resolution": [],
+        "url": "",
+        "vj": f"VJ {index:04d}" if index % 5 == 0 else "",
+    }
+    if kind == 0:
+        dj["url"] = f"rtmp://rtmp-zone-a.server/dj-key/key{index:04d}"
+        return dj
+    dj["recording_path"] = f"{DOCKER_RECORDINGS_PATH}/dj_{index:04d}_set.mp4"
+    if kind == 1:
+        dj["resolution"] = [1920, 1080]
+    elif kind == 2:
+        dj["visuals_path"] = f"{DOCKER_RECORDINGS_PATH}/dj_{index:04d}_visuals.mp4"
+        dj["resolution"] = [1280, 720]
+    else:
+        dj["visuals_path"] = f"{DOCKER_GENERIC_VISUALS_PATH}/{GENERIC_VISUALS[index % len(GENERIC_VISUALS)]}"
+        # Older exports may lack a probed resolution
+        dj["resolution"] = [] if index % 8 == 3 else [3840, 2160]
+    return dj
+
+
+def make_lineup(dj_count, promo_count=None, theme=True):
+    if promo_count is None:
+        promo_count = max(1, dj_count // 10)
+    lineup = {
+        "djs": [make_dj(index) for index in range(dj_count)],
+        "promos": [
+            {
+                "name": f"Promo {index:03d}",
+                "path": f"{DOCKER_RECORDINGS_PATH}/promo_{index:03d}.mp4",
+                "resolution": [1920, 1080],
+            }
+            for index in range(promo_count)
+        ],
+        "theme": {},
+    }
+    if theme:
+        lineup["theme"] = {
+            "name": "Synthetic Theme",
+            "overlay": f"{DOCKER_THEMES_PATH}/overlay.png",
+            "starting": f"{DOCKER_THEMES_PATH}/starting.mp4",
+            "ending": f"{DOCKER_THEMES_PATH}/ending.png",
+            "video_width": 1530,
+            "video_height": 857,
+            "video_offset_x": 20,
+            "video_offset_y": 20,
+            "chat_width": 300,
+            "chat_height": 800,
+            "chat_offset_x": 1600,
+            "chat_offset_y": 100,
+        }
+    return lineup
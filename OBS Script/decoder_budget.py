@@ -0,0 +1,95 @@
+# Decoder budget for generated media sources.
+# Only the media of a small window of scenes around the program scene is kept open, everything else
+# closes while inactive so a long event does not hold a demuxer and hardware decoder per set.
+
+import json
+import logging
+import time
+
+from obs_handles import HandleScope
+
+MEDIA_SOURCE_IDS = ("ffmpeg_source",)
+
+log = logging.getLogger("shizu.decoder_budget")
+
+
+def scene_media_from_plan(plan):
+    # {scene name: [media source names]} in lineup order.
+    # Nested scenes (the overlay) render inside every scene and are never closed.
+    nested = {item.source.name for scene in plan.scenes.values() for item in scene.items if item.source.id == "scene"}
+    scene_media = {}
+    for name, scene in plan.scenes.items():
+        if name in plan.placeholder_scenes or name in nested:
+            continue
+        scene_media[name] = [item.source.name for item in scene.items if item.source.id in MEDIA_SOURCE_IDS]
+    return scene_media
+
+
+class DecoderBudget:
+    """Keeps media open for the previous, current and next `warm_scenes` scenes in lineup order.
+
+    The previous scene stays open so a running transition never loses its frames.
+    """
+
+    def __init__(self, obs, scene_media, warm_scenes):
+        self.obs = obs
+        self.scene_order = list(scene_media)
+        self.scene_media = scene_media
+        self.warm_scenes = warm_scenes
+        self.current_scene = None
+        self.previous_scene = None
+        self.open_sources = set()
+        # (timestamp, open media sources) after every scene change
+        self.history = []
+
+    def media_sources(self):
+        # Shared visuals appear in several scenes, each source is listed once
+        return list(dict.fromkeys(name for names in self.scene_media.values() for name in names))
+
+    def warm_window(self, current_scene):
+        if current_scene not in self.scene_media:
+            # Program is outside the lineup (starting scene, manual scene), warm the start of the show
+            return self.scene_order[:self.warm_scenes + 1]
+        index = self.scene_order.index(current_scene)
+        window = self.scene_order[index:index + self.warm_scenes + 1]
+        if self.previous_scene in self.scene_media:
+            window.append(self.previous_scene)
+        return window
+
+    def rebalance(self, current_scene):
+        if current_scene != self.current_scene:
+            self.previous_scene = self.current_scene
+            self.current_scene = current_scene
+        warm = {name for scene in self.warm_window(current_scene) for name in self.scene_media[scene]}
+        # Sources on program or in the outgoing transition are already open, updating them would restart playback
+        on_air = {
+            name for scene in (current_scene, self.previous_scene) for name in self.scene_media.get(scene, [])
+        }
+        for name in self.media_sources():
+            if name not in on_air:
+                self.set_close_when_inactive(name, name not in warm)
+        self.open_sources = warm
+        self.history.append((time.time(), len(warm)))
+        log.info("Decoder budget: %d/%d media sources open on %s", len(warm), len(self.media_sources()), current_scene)
+
+    def set_close_when_inactive(self, name, close):
+        # Updating an ffmpeg source reopens its media, so untouched sources are left alone
+        with HandleScope(self.obs) as scope:
+            source = scope.source(self.obs.obs_get_source_by_name(name))
+            if source is None:
+                return
+            current_settings = scope.data(self.obs.obs_source_get_settings(source))
+            live_settings = json.loads(self.obs.obs_data_get_json(current_settings))
+            if live_settings.get("close_when_inactive", False) == close:
+                return
+            settings = scope.data(self.obs.obs_data_create())
+            self.obs.obs_data_set_bool(settings, "close_when_inactive", close)
+            self.obs.obs_data_set_bool(settings, "restart_on_activate", True)
+            self.obs.obs_source_update(source, settings)
+
+    def refresh(self):
+        # Rebalance around the scene currently on program
+        with HandleScope(self.obs) as scope:
+            name = self.obs.obs_source_get_name(scope.source(self.obs.obs_frontend_get_current_scene()))
+        if name != self.current_scene or not self.history:
+            self.rebalance(name)
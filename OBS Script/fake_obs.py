@@ -0,0 +1,505 @@
+# In-process stand-in for the obspython module.
+# Records scenes, sources, settings and refcounts so the hijack script can be
+# exercised (benchmarks, debugging) without a running OBS instance.
+
+import json
+from collections import Counter
+from copy import deepcopy
+
+# Prefixes of the obspython functions that are tallied in FakeObs.calls
+COUNTED_PREFIXES = ("obs_", "vec2", "source_list_", "sceneitem_list_", "timer_", "signal_handler_", "video_output_")
+
+# From obs-frontend-api.h
+OBS_FRONTEND_EVENT_SCENE_CHANGED = 8
+
+
+class vec2:
+    def __init__(self):
+        self.x = 0.0
+        self.y = 0.0
+
+    def __repr__(self) -> str:
+        return f"vec2({self.x}, {self.y})"
+
+
+class FakeHandle:
+    # Base for every refcounted object handed back to the script
+    kind = None
+
+    def __init__(self, obs, tracked=True):
+        self.refs = 1 if tracked else 0
+        if tracked:
+            obs.handles.append(self)
+
+
+class FakeData(FakeHandle):
+    kind = "obs_data"
+
+    def __init__(self, obs, values=None):
+        super().__init__(obs)
+        self.values = values if values is not None else {}
+        self.children = []
+
+
+class FakeSource(FakeHandle):
+    kind = "obs_source"
+
+    def __init__(self, obs, source_id, name, settings, tracked=True):
+        super().__init__(obs, tracked)
+        self.id = source_id
+        self.name = name
+        self.settings = settings
+        self.volume = 1.0
+        self.width = 0
+        self.height = 0
+        # References held by scene items rather than the script
+        self.item_refs = 0
+        self.scene = None
+        self.private_settings = FakeData(obs)
+        self.private_settings.refs = 0
+        self.removed = False
+        # Playback position in milliseconds, set by tests to emulate decoded frames
+        self.media_time = 0
+        # {signal: [callbacks]}, the source's signal handler
+        self.signals = {}
+
+
+class FakeScene(FakeHandle):
+    kind = "obs_scene"
+
+    def __init__(self, obs, name):
+        super().__init__(obs)
+        # The scene's source shares the scene's refcount
+        self.source = FakeSource(obs, "scene", name, {}, tracked=False)
+        self.source.width = obs.render_width
+        self.source.height = obs.render_height
+        self.source.scene = self
+        self.items = []
+
+    @property
+    def name(self):
+        return self.source.name
+
+
+class FakeOutput(FakeHandle):
+    kind = "obs_output"
+
+    def __init__(self, obs):
+        super().__init__(obs, tracked=False)
+        self.active = True
+        self.total_frames = 0
+        self.frames_dropped = 0
+
+
+class FakeSceneItem:
+    def __init__(self, obs, scene, source):
+        self.scene = scene
+        self.source = source
+        self.pos = (0.0, 0.0)
+        self.scale = (1.0, 1.0)
+        self.alignment = 5  # OBS_ALIGN_TOP | OBS_ALIGN_LEFT
+        self.private_settings = FakeData(obs)
+        self.private_settings.refs = 0
+
+
+class FakeObs:
+    """Implements the subset of obspython used by the hijack script.
+
+    Like OBS an input source is destroyed, and no longer found by name, once neither the script
+    nor a scene item holds a reference. Scenes are kept, the frontend holds them. Refcounts are
+    tracked so leaks and over-releases can be inspected after a run.
+    """
+
+    def __init__(self, render_width=1920, render_height=1080, media_sizes=None, size_lookup=None):
+        self.render_width = render_width
+        self.render_height = render_height
+        # Optional {file path: (width, height)} to emulate decoded frames
+        self.media_sizes = media_sizes or {}
+        # Optional callable(source name, settings) -> (width, height) or None, checked first
+        self.size_lookup = size_lookup
+        self.calls = Counter()
+        self.handles = []
+        self.scenes = {}
+        self.sources = {}
+        self.over_released = []
+        self.destroyed_sources = 0
+        self.name_collisions = 0
+        self.timers = []
+        # {callback: interval_ms} as registered, run_timers ignores it
+        self.timer_intervals = {}
+        self.frontend_callbacks = []
+        self.current_scene = None
+        # Render and encoder counters, moved on with advance_frames
+        self.active_fps = 60.0
+        self.frame_time_ns = 4000000
+        self.rendered_frames = 0
+        self.lagged_frames = 0
+        self.encoded_frames = 0
+        self.skipped_frames = 0
+        # FakeOutput while streaming
+        self.streaming_output = None
+
+    def __getattribute__(self, name):
+        if name.startswith(COUNTED_PREFIXES):
+            object.__getattribute__(self, "calls")[name] += 1
+        return object.__getattribute__(self, name)
+
+    # Inspection helpers
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def outstanding(self):
+        # Handles the script acquired and never released
+        return [handle for handle in self.handles if handle.refs > 0]
+
+    def _release(self, handle):
+        if handle is None:
+            return
+        handle.refs -= 1
+        if handle.refs < 0:
+            self.over_released.append(handle)
+        elif handle.refs == 0 and isinstance(handle, FakeData):
+            for child in handle.children:
+                self._release(child)
+        elif isinstance(handle, FakeSource):
+            self._destroy_unreferenced(handle)
+
+    def _destroy_unreferenced(self, source):
+        # Last reference gone, libobs destroys the source
+        if source.refs == 0 and source.item_refs == 0 and self.sources.get(source.name) is source:
+            del self.sources[source.name]
+            self.destroyed_sources += 1
+
+    def run_timers(self, ticks=1):
+        # Stand-in for the OBS tick loop, fires every registered timer once per tick
+        for _ in range(ticks):
+            for callback in list(self.timers):
+                if callback in self.timers:
+                    callback()
+
+    def emit_signal(self, source_name, signal):
+        # Stand-in for a source signal, e.g. media_ended when a recording finishes
+        source = self.sources[source_name]
+        for callback in list(source.signals.get(signal, [])):
+            callback(None)
+
+    def advance_frames(self, frames, lagged=0, skipped=0, dropped=0):
+        # Stand-in for OBS rendering and streaming, lagged frames are never rendered
+        self.rendered_frames += frames - lagged
+        self.lagged_frames += lagged
+        self.encoded_frames += frames - lagged - skipped
+        self.skipped_frames += skipped
+        if self.streaming_output and self.streaming_output.active:
+            self.streaming_output.total_frames += frames - lagged - skipped
+            self.streaming_output.frames_dropped += dropped
+
+    def program_sources(self):
+        # Sources rendered by the program scene, nested scenes included
+        active = set()
+        pending = [self.scenes[self.current_scene]] if self.current_scene in self.scenes else []
+        while pending:
+            scene = pending.pop()
+            for item in scene.items:
+                if item.source.scene is not None:
+                    pending.append(item.source.scene)
+                else:
+                    active.add(item.source.name)
+        return active
+
+    # Timers
+    def timer_add(self, callback, interval_ms):
+        self.timers.append(callback)
+        self.timer_intervals[callback] = interval_ms
+
+    def timer_remove(self, callback):
+        if callback in self.timers:
+            self.timers.remove(callback)
+
+    # Signals, the handler belongs to the source and is not refcounted
+    def obs_source_get_signal_handler(self, source):
+        return source.signals
+
+    def signal_handler_connect(self, handler, signal, callback):
+        handler.setdefault(signal, []).append(callback)
+
+    def signal_handler_disconnect(self, handler, signal, callback):
+        if callback in handler.get(signal, []):
+            handler[signal].remove(callback)
+
+    # Frontend
+    OBS_FRONTEND_EVENT_SCENE_CHANGED = OBS_FRONTEND_EVENT_SCENE_CHANGED
+
+    def obs_frontend_add_event_callback(self, callback):
+        self.frontend_callbacks.append(callback)
+
+    def obs_frontend_remove_event_callback(self, callback):
+        if callback in self.frontend_callbacks:
+            self.frontend_callbacks.remove(callback)
+
+    def obs_frontend_get_current_scene(self):
+        scene = self.scenes.get(self.current_scene)
+        if scene is None:
+            return None
+        scene.refs += 1
+        return scene.source
+
+    def obs_frontend_set_current_scene(self, source):
+        # Stand-in for a program scene switch, notifies the frontend callbacks like OBS does
+        self.current_scene = source.name
+        for callback in list(self.frontend_callbacks):
+            callback(OBS_FRONTEND_EVENT_SCENE_CHANGED)
+
+    # Statistics
+    def obs_get_active_fps(self):
+        return self.active_fps
+
+    def obs_get_average_frame_time_ns(self):
+        return self.frame_time_ns
+
+    def obs_get_total_frames(self):
+        return self.rendered_frames
+
+    def obs_get_lagged_frames(self):
+        return self.lagged_frames
+
+    def obs_get_video(self):
+        # The video output is owned by OBS, not refcounted
+        return self
+
+    def video_output_get_total_frames(self, video):
+        return self.encoded_frames
+
+    def video_output_get_skipped_frames(self, video):
+        return self.skipped_frames
+
+    def obs_frontend_get_streaming_output(self):
+        output = self.streaming_output
+        if output is None:
+            return None
+        if output not in self.handles:
+            self.handles.append(output)
+        output.refs += 1
+        return output
+
+    def obs_output_active(self, output):
+        return output.active
+
+    def obs_output_get_total_frames(self, output):
+        return output.total_frames
+
+    def obs_output_get_frames_dropped(self, output):
+        return output.frames_dropped
+
+    def obs_output_release(self, output):
+        self._release(output)
+
+    def obs_source_active(self, source):
+        return source.name in self.program_sources()
+
+    # Math
+    def vec2(self):
+        return vec2()
+
+    # obs_data
+    def obs_data_create(self):
+        return FakeData(self)
+
+    def obs_data_create_from_json(self, json_string):
+        return FakeData(self, json.loads(json_string))
+
+    def obs_data_set_string(self, data, key, value):
+        data.values[key] = value
+
+    def obs_data_set_bool(self, data, key, value):
+        data.values[key] = bool(value)
+
+    def obs_data_set_int(self, data, key, value):
+        data.values[key] = int(value)
+
+    def obs_data_set_double(self, data, key, value):
+        data.values[key] = float(value)
+
+    def obs_data_set_obj(self, data, key, obj):
+        obj.refs += 1
+        data.children.append(obj)
+        data.values[key] = obj.values
+
+    def obs_data_get_string(self, data, key):
+        return data.values.get(key, "")
+
+    def obs_data_get_bool(self, data, key):
+        return bool(data.values.get(key, False))
+
+    def obs_data_get_int(self, data, key):
+        return int(data.values.get(key, 0))
+
+    def obs_data_get_obj(self, data, key):
+        value = data.values.get(key)
+        if not isinstance(value, dict):
+            return None
+        return FakeData(self, value)
+
+    def obs_data_get_json(self, data):
+        return json.dumps(data.values)
+
+    def obs_data_release(self, data):
+        self._release(data)
+
+    # Sources
+    def obs_source_create(self, source_id, name, settings, hotkey_data):
+        if name in self.sources or name in self.scenes:
+            self.name_collisions += 1
+        values = deepcopy(settings.values) if settings else {}
+        source = FakeSource(self, source_id, name, values)
+        size = self.size_lookup(name, values) if self.size_lookup else None
+        width, height = size or self.media_sizes.get(
+            values.get("local_file") or values.get("file"), (0, 0)
+        )
+        source.width = width
+        source.height = height
+        self.sources[name] = source
+        return source
+
+    def obs_get_source_by_name(self, name):
+        if name in self.scenes:
+            self.scenes[name].refs += 1
+            return self.scenes[name].source
+        source = self.sources.get(name)
+        if source is not None:
+            source.refs += 1
+        return source
+
+    def obs_source_get_name(self, source):
+        return source.name if source is not None else None
+
+    def obs_source_get_id(self, source):
+        return source.id
+
+    def obs_source_get_width(self, source):
+        return source.width
+
+    def obs_source_get_height(self, source):
+        return source.height
+
+    def obs_source_set_volume(self, source, volume):
+        source.volume = volume
+
+    def obs_source_get_settings(self, source):
+        return FakeData(self, deepcopy(source.settings))
+
+    def obs_source_update(self, source, settings):
+        source.settings.update(deepcopy(settings.values))
+
+    def obs_source_get_volume(self, source):
+        return source.volume
+
+    def obs_source_media_get_time(self, source):
+        return source.media_time
+
+    def obs_source_get_private_settings(self, source):
+        source.private_settings.refs += 1
+        return source.private_settings
+
+    def obs_source_remove(self, source):
+        source.removed = True
+        if source.scene is not None:
+            self.scenes.pop(source.name, None)
+        else:
+            self.sources.pop(source.name, None)
+        for scene in self.scenes.values():
+            for item in scene.items:
+                if item.source is source:
+                    source.item_refs -= 1
+            scene.items = [item for item in scene.items if item.source is not source]
+
+    def obs_enum_sources(self):
+        # Inputs only, scenes are listed by obs_frontend_get_scenes
+        for source in self.sources.values():
+            source.refs += 1
+        return list(self.sources.values())
+
+    def obs_frontend_get_scenes(self):
+        for scene in self.scenes.values():
+            scene.refs += 1
+        return [scene.source for scene in self.scenes.values()]
+
+    def source_list_release(self, sources):
+        for source in sources:
+            self.obs_source_release(source)
+
+    def obs_source_release(self, source):
+        if source is not None and source.scene is not None:
+            self._release(source.scene)
+        else:
+            self._release(source)
+
+    # Scenes
+    def obs_scene_create(self, name):
+        if name in self.sources or name in self.scenes:
+            self.name_collisions += 1
+        scene = FakeScene(self, name)
+        self.scenes[name] = scene
+        return scene
+
+    def obs_get_scene_by_name(self, name):
+        scene = self.scenes.get(name)
+        if scene is not None:
+            scene.refs += 1
+        return scene
+
+    def obs_scene_get_source(self, scene):
+        # libobs tolerates NULL handles, mirror that for missing scenes
+        return scene.source if scene is not None else None
+
+    def obs_scene_from_source(self, source):
+        return source.scene
+
+    def obs_scene_add(self, scene, source):
+        if scene is None or source is None:
+            return None
+        item = FakeSceneItem(self, scene, source)
+        source.item_refs += 1
+        scene.items.append(item)
+        return item
+
+    def obs_scene_release(self, scene):
+        self._release(scene)
+
+    def obs_scene_enum_items(self, scene):
+        return list(scene.items)
+
+    def sceneitem_list_release(self, items):
+        pass
+
+    # Scene items
+    def obs_sceneitem_set_pos(self, item, pos):
+        if item is not None:
+            item.pos = (pos.x, pos.y)
+
+    def obs_sceneitem_set_scale(self, item, scale):
+        if item is not None:
+            item.scale = (scale.x, scale.y)
+
+    def obs_sceneitem_set_alignment(self, item, alignment):
+        if item is not None:
+            item.alignment = alignment
+
+    def obs_sceneitem_get_source(self, item):
+        return item.source
+
+    def obs_sceneitem_get_private_settings(self, item):
+        item.private_settings.refs += 1
+        return item.private_settings
+
+    def obs_sceneitem_remove(self, item):
+        item.source.item_refs -= 1
+        item.scene.items.remove(item)
+        if item.source.scene is None:
+            self._destroy_unreferenced(item.source)
+
+    def obs_sceneitem_set_order_position(self, item, position):
+        # Position 0 is the bottom of the scene
+        items = item.scene.items
+        items.remove(item)
+        items.insert(position, item)
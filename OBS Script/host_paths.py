@@ -0,0 +1,119 @@
+# Docker -> host path translation.
+# The backend exports paths as seen inside its container, OBS on the host opens them under the matching
+# LOCAL_*_PATH. Every DOCKER_*_PATH/LOCAL_*_PATH pair of the .env file is compiled once into roots matched
+# longest first, so each path finds its own root, and files are stat'ed at most once per run.
+
+import os
+import posixpath
+import stat
+
+DOCKER_PREFIX = "DOCKER_"
+LOCAL_PREFIX = "LOCAL_"
+PATH_SUFFIX = "_PATH"
+
+
+class PathTranslationError(Exception):
+    """A path is not under any DOCKER_*_PATH root of the .env file."""
+
+
+def path_pairs(values):
+    # [(name, docker root, host root)] in .env order, e.g. ("RECORDINGS", "/var/recordings", "D:\\Shizu\\recordings")
+    pairs = []
+    for key, docker_root in values.items():
+        if not (key.startswith(DOCKER_PREFIX) and key.endswith(PATH_SUFFIX)):
+            continue
+        name = key[len(DOCKER_PREFIX):-len(PATH_SUFFIX)]
+        host_root = values.get(LOCAL_PREFIX + name + PATH_SUFFIX)
+        if docker_root and host_root:
+            pairs.append((name, docker_root, host_root))
+    return pairs
+
+
+class PathTranslator:
+    """Maps docker paths to host paths by the longest DOCKER_*_PATH root they start with.
+
+    Docker paths are POSIX, the container is Linux. Host paths are built with pathmod, the host OS's
+    os.path by default, so a Windows root like C:/Shizu/logos comes out as C:\\Shizu\\logos\\<file>.
+    Roots shared by several pairs (recordings and generic visuals in one volume) keep every host root,
+    translate returns the first one where the file exists.
+    """
+
+    def __init__(self, values, pathmod=os.path):
+        self.pathmod = pathmod
+        roots = {}
+        for name, docker_root, host_root in path_pairs(values):
+            docker_root = posixpath.normpath(docker_root)
+            roots.setdefault(docker_root, []).append((name, pathmod.normpath(host_root)))
+        # Longest first, /var/recordings/visuals is tried before /var/recordings
+        self.roots = sorted(roots.items(), key=lambda root: len(root[0]), reverse=True)
+        # {docker path: (host path, ...)}
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.roots)
+
+    def candidates(self, docker_path):
+        # Host paths of docker_path, one per pair sharing its root
+        cached = self.memo.get(docker_path)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        path = posixpath.normpath(docker_path)
+        for docker_root, host_roots in self.roots:
+            if path == docker_root:
+                rest = []
+            elif path.startswith(docker_root.rstrip("/") + "/"):
+                rest = path[len(docker_root):].lstrip("/").split("/")
+            else:
+                continue
+            result = tuple(self.pathmod.join(host_root, *rest) for _, host_root in host_roots)
+            self.memo[docker_path] = result
+            return result
+        raise PathTranslationError(
+            f"{docker_path} is not under any DOCKER_*_PATH in .env ({', '.join(root for root, _ in self.roots)})"
+        )
+
+    def translate(self, docker_path, stats=None):
+        # stats (StatCache) picks between host roots sharing a docker root, the first one otherwise
+        candidates = self.candidates(docker_path)
+        if stats is not None and len(candidates) > 1:
+            for candidate in candidates:
+                if stats.is_file(candidate):
+                    return candidate
+        return candidates[0]
+
+
+class StatCache:
+    """os.stat results of one run, shared by the translation, the pre-flight check, probing and image hashing.
+
+    Each file is stat'ed once whoever asks first, a failed stat is remembered and raised again.
+    Build a new one per run, files may change between runs.
+    """
+
+    def __init__(self):
+        # {path: os.stat_result or OSError}
+        self.results = {}
+
+    def stat(self, path):
+        result = self.results.get(path)
+        if result is None:
+            try:
+                result = os.stat(path)
+            except OSError as error:
+                result = error
+            self.results[path] = result
+        if isinstance(result, OSError):
+            raise result
+        return result
+
+    def is_file(self, path):
+        try:
+            return stat.S_ISREG(self.stat(path).st_mode)
+        except OSError:
+            return False
+
+    def __len__(self):
+        return len(self.results)
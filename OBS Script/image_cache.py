@@ -0,0 +1,126 @@
+# Display sized variants of logos and still theme images.
+# Variants live in a content addressed directory, named after the source hash and target box,
+# so a rerun only processes files whose content changed.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+
+log = logging.getLogger("shizu.image_cache")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def variant_name(source_hash, box):
+    return f"{source_hash[:32]}_{box[0]}x{box[1]}.png"
+
+
+def downscale_image(source_path, dest_path, box):
+    # Returns True if a variant was written, False if the source already fits the box
+    from PIL import Image
+
+    with Image.open(source_path) as image:
+        if image.width <= box[0] and image.height <= box[1]:
+            return False
+        # Animated images would lose their frames
+        if getattr(image, "is_animated", False):
+            return False
+        image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        image.thumbnail(box, Image.LANCZOS)
+        temp_path = f"{dest_path}.{threading.get_ident()}.tmp"
+        image.save(temp_path, "PNG")
+    os.replace(temp_path, dest_path)
+    return True
+
+
+class ImageCache:
+    """Resolves image paths to cached variants that fit a target box.
+
+    Pillow releases the GIL while decoding and resampling, so a thread pool spreads
+    the work across cores without spawning processes from inside OBS.
+    """
+
+    def __init__(self, cache_dir, workers=None, stats=None):
+        self.cache_dir = Path(cache_dir)
+        self.workers = workers or os.cpu_count() or 4
+        # host_paths.StatCache of the run
+        self.stat = stats.stat if stats is not None else os.stat
+        self.index = {"version": INDEX_VERSION, "hashes": {}, "fits": {}}
+        self.processed = 0
+        self.reused = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_dir.joinpath(INDEX_FILE), "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if index.get("version") == INDEX_VERSION:
+            self.index = index
+
+    def save(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_dir.joinpath(INDEX_FILE + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(temp_path, self.cache_dir.joinpath(INDEX_FILE))
+
+    def source_hash(self, path):
+        # Hashes are remembered per size and mtime, unchanged files are not read again
+        stat = self.stat(path)
+        entry = self.index["hashes"].get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return entry["hash"]
+        source_hash = file_hash(path)
+        self.index["hashes"][path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": source_hash}
+        return source_hash
+
+    def resolve_one(self, path, box):
+        try:
+            name = variant_name(self.source_hash(path), box)
+        except OSError:
+            # Missing files are reported by the pre-flight check, keep the original path
+            return path
+        variant_path = self.cache_dir.joinpath(name)
+        if self.index["fits"].get(name) or variant_path.exists():
+            self.reused += 1
+            return path if self.index["fits"].get(name) else str(variant_path)
+        try:
+            written = downscale_image(path, str(variant_path), box)
+        except Exception as error:
+            log.warning("Could not downscale %s, using the original: %s", path, error)
+            return path
+        self.processed += 1
+        if not written:
+            self.index["fits"][name] = True
+            return path
+        return str(variant_path)
+
+    def resolve(self, requests):
+        # requests: iterable of (path, (max width, max height)), returns {request: path to use}
+        unique_requests = list(dict.fromkeys(request for request in requests if request[0]))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = dict(zip(
+                unique_requests,
+                pool.map(lambda request: self.resolve_one(*request), unique_requests)
+            ))
+        self.save()
+        return results
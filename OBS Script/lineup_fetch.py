@@ -0,0 +1,329 @@
+# Lineups fetched from the backend.
+# GET /openapi/event/<name>/export returns the last export of an event. Repeat fetches are conditional
+# (If-None-Match / If-Modified-Since) over one kept-alive connection, so an unchanged lineup costs a 304
+# and is not parsed again. The last good lineup is kept on disk and used while the backend is unreachable.
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from lineup_model import LineupError, parse_lineup
+
+EXPORT_ROUTE = "/openapi/event/%s/export"
+FETCH_TIMEOUT = 10.0
+# Characters kept in cache file names, anything else in an event name becomes _
+UNSAFE_FILE_CHARS = re.compile(r"[^\w\-. ]")
+# Hex digits of the event name's hash in cache file names
+NAME_HASH_LENGTH = 12
+
+log = logging.getLogger("shizu.lineup_fetch")
+
+
+class FetchError(Exception):
+    """The backend refused the request, or was unreachable with nothing cached."""
+
+
+class FetchResult:
+    __slots__ = ("event_name", "path", "lineup", "status", "changed", "offline")
+
+    def __init__(self, event_name, path, lineup, status, changed, offline=False):
+        self.event_name = event_name
+        # Cached copy of the export, generated files are saved next to it
+        self.path = path
+        self.lineup = lineup
+        # HTTP status, None when the backend could not be reached
+        self.status = status
+        # The export differs from the previous fetch
+        self.changed = changed
+        # Served from the disk cache because the backend could not be reached
+        self.offline = offline
+
+    def __str__(self) -> str:
+        if self.offline:
+            return f"{self.event_name}: backend unreachable, using the cached lineup"
+        return f"{self.event_name}: {'updated' if self.changed else 'unchanged'} (HTTP {self.status})"
+
+
+class LineupFetcher:
+    """Fetches event exports from base_url into cache_dir.
+
+    Thread safe, the watch mode fetches on a worker while an update may fetch on the UI thread.
+    """
+
+    def __init__(self, base_url, cache_dir, timeout=FETCH_TIMEOUT):
+        parts = urlsplit(base_url if "://" in base_url else "http://" + base_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Not a backend URL: {base_url!r}")
+        self.base_url = base_url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip("/")
+        self.cache_dir = Path(cache_dir)
+        self.timeout = timeout
+        self.connection = None
+        self.lock = threading.Lock()
+        # {event name: {"etag", "last_modified", "fetched"}}, loaded from the cache on first use
+        self.validators = {}
+        # {event name: ((validator, stage, day), Lineup)}, a 304 reuses the parsed lineup
+        self.parsed = {}
+        self.requests = 0
+        self.connects = 0
+
+    def url(self, event_name):
+        return f"{self.scheme}://{self.host}{f':{self.port}' if self.port else ''}{self.route(event_name)}"
+
+    def route(self, event_name):
+        return self.prefix + EXPORT_ROUTE % quote(event_name, safe="")
+
+    def cache_name(self, event_name):
+        # Readable part plus a hash of the raw name, "a/b" and "a_b" must not share a cache file
+        digest = hashlib.sha256(event_name.encode("utf-8")).hexdigest()[:NAME_HASH_LENGTH]
+        return f"{UNSAFE_FILE_CHARS.sub('_', event_name)}-{digest}"
+
+    def cache_path(self, event_name):
+        return self.cache_dir.joinpath(self.cache_name(event_name) + ".json")
+
+    def meta_path(self, event_name):
+        return self.cache_dir.joinpath(self.cache_name(event_name) + ".meta.json")
+
+    def open_connection(self):
+        # One connection reused for every fetch, HTTP/1.1 keeps it alive between polls
+        import http.client
+
+        if self.connection is None:
+            connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self.connection = connection_class(self.host, self.port, timeout=self.timeout)
+            self.connects += 1
+        return self.connection
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def request(self, method, path, headers):
+        # (status, headers, body). A kept-alive connection the server already closed is retried once.
+        import http.client
+
+        for attempt in (0, 1):
+            connection = self.open_connection()
+            try:
+                connection.request(method, path, headers=headers)
+                response = connection.getresponse()
+                # Read to the end, the connection is only reusable once the body is consumed
+                body = response.read()
+                self.requests += 1
+                if response.will_close:
+                    self.connection.close()
+                    self.connection = None
+                return response.status, response.headers, body
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+            except (OSError, http.client.HTTPException):
+                self.connection.close()
+                self.connection = None
+                raise
+
+    def load_validators(self, event_name):
+        if event_name not in self.validators:
+            try:
+                with open(self.meta_path(event_name), "r") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            # Validators without the export they describe would turn into 304s for nothing
+            self.validators[event_name] = meta if self.cache_path(event_name).exists() else {}
+        return self.validators[event_name]
+
+    def store(self, event_name, text, headers):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "url": self.url(event_name),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched": time.time(),
+        }
+        for path, data in ((self.cache_path(event_name), text), (self.meta_path(event_name), json.dumps(meta))):
+            temp_path = path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        self.validators[event_name] = meta
+
+    def validator(self, event_name):
+        # Identifies the cached export
+        meta = self.validators.get(event_name) or {}
+        return meta.get("etag") or meta.get("last_modified") or meta.get("fetched")
+
+    def cached_lineup(self, event_name, stage, day):
+        # Parsed lineup of the cached export, reused while the export and the selection are the same
+        key = (self.validator(event_name), stage, day)
+        held = self.parsed.get(event_name)
+        if held and held[0] == key:
+            return held[1]
+        path = self.cache_path(event_name)
+        with open(path, "r", encoding="utf-8-sig") as f:
+            lineup = parse_lineup(f.read(), str(path), stage, day)
+        self.parsed[event_name] = (key, lineup)
+        return lineup
+
+    def fetch(self, event_name, stage=None, day=None):
+        with self.lock:
+            return self.fetch_locked(event_name, stage or None, day or None)
+
+    def fetch_locked(self, event_name, stage, day):
+        import http.client
+
+        path = self.cache_path(event_name)
+        validators = self.load_validators(event_name)
+        headers = {"Accept": "application/json"}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        try:
+            status, response_headers, body = self.request("GET", self.route(event_name), headers)
+        except (OSError, http.client.HTTPException) as error:
+            return self.offline(event_name, stage, day, f"{type(error).__name__}: {error}")
+
+        if status == 304:
+            return FetchResult(event_name, path, self.cached_lineup(event_name, stage, day), status, False)
+        if status >= 500:
+            return self.offline(event_name, stage, day, f"HTTP {status} {error_message(body)}")
+        if status != 200:
+            raise FetchError(f"{self.url(event_name)}: HTTP {status} {error_message(body)}")
+
+        text = body.decode("utf-8-sig")
+        # Validated before it replaces the last good lineup
+        lineup = parse_lineup(text, self.url(event_name), stage, day)
+        changed = True
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                changed = f.read() != text
+        except OSError:
+            pass
+        self.store(event_name, text, response_headers)
+        self.parsed[event_name] = ((self.validator(event_name), stage, day), lineup)
+        return FetchResult(event_name, path, lineup, status, changed)
+
+    def offline(self, event_name, stage, day, reason):
+        if not self.cache_path(event_name).exists():
+            raise FetchError(f"Could not fetch {event_name} from {self.base_url} ({reason}) and no copy is cached")
+        fetched = self.validators.get(event_name, {}).get("fetched")
+        log.warning(
+            "Could not fetch %s (%s), using the copy fetched %s", event_name, reason,
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(fetched)) if fetched else "earlier"
+        )
+        return FetchResult(event_name, self.cache_path(event_name), self.cached_lineup(event_name, stage, day), None, False, True)
+
+    def export(self, event_name):
+        # Asks the backend to write a fresh export, what the frontend's export button does
+        with self.lock:
+            status, _, body = self.request("POST", self.route(event_name), {"Content-Length": "0"})
+        if status != 200:
+            raise FetchError(f"Export of {event_name} failed: HTTP {status} {error_message(body)}")
+
+
+def error_message(body):
+    # The backend answers errors with {"errorType", "message"}
+    try:
+        data = json.loads(body)
+        return f"{data.get('errorType', '')}: {data.get('message', '')}".strip(": ")
+    except (ValueError, AttributeError):
+        return body[:200].decode("utf-8", "replace")
+
+
+class FetchWatcher:
+    """Watch mode for fetched lineups, polls the backend with conditional GETs on a worker thread.
+
+    Same contract as LineupWatcher: on_change(lineup) gets the lineup the fetch parsed,
+    returning False offers the change again on the next poll.
+    """
+
+    def __init__(self, obs, fetcher, event_name, on_change, interval_ms=5000, stage=None, day=None):
+        self.obs = obs
+        self.fetcher = fetcher
+        self.event_name = event_name
+        self.path = fetcher.url(event_name)
+        self.on_change = on_change
+        self.interval_ms = interval_ms
+        self.stage = stage
+        self.day = day
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lineup_fetch")
+        self.pending = None
+        self.lineup = None
+        self.apply_requested = False
+        self.running = False
+        self.poll_callback = self.poll
+
+    def start(self):
+        self.running = True
+        self.obs.timer_add(self.poll_callback, self.interval_ms)
+        log.info("Watching %s for changes", self.path)
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.obs.timer_remove(self.poll_callback)
+        self.pool.shutdown(wait=False)
+
+    def request_apply(self):
+        self.apply_requested = True
+
+    def poll(self):
+        if self.pending is not None and self.pending.done():
+            try:
+                result = self.pending.result()
+            except (FetchError, LineupError) as error:
+                log.warning("Watch: %s", error)
+            else:
+                if result.changed:
+                    log.info("%s", result)
+                    self.lineup = result.lineup
+                    self.apply_requested = True
+            self.pending = None
+        if self.apply_requested:
+            if self.on_change(self.lineup) is not False:
+                self.apply_requested = False
+            return
+        if self.pending is None:
+            self.pending = self.pool.submit(self.fetcher.fetch, self.event_name, self.stage, self.day)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch an event's lineup from the backend like the script does")
+    parser.add_argument("backend", help="Backend URL, e.g. http://localhost:4004")
+    parser.add_argument("event", help="Event name")
+    parser.add_argument("--cache", default=str(Path(__file__).absolute().parent.joinpath(".cache", "lineups")))
+    parser.add_argument("--export", action="store_true", help="Export the event on the backend first")
+    parser.add_argument("--repeat", type=int, default=1, help="Fetch this many times over the same connection")
+    args = parser.parse_args()
+
+    fetcher = LineupFetcher(args.backend, args.cache)
+    if args.export:
+        fetcher.export(args.event)
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result = fetcher.fetch(args.event)
+        print(f"{result} in {(time.perf_counter() - start) * 1000:.1f} ms, {len(result.lineup.djs)} DJs -> {result.path}")
+    print(f"{fetcher.requests} requests over {fetcher.connects} connection(s)")
+    fetcher.close()
+
+
+if __name__ == "__main__":
+    main()
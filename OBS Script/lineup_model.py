@@ -0,0 +1,339 @@
+# Typed model of an exported event, see export_event in backend/src/database.ts.
+# The export text is decoded entry by entry: every selected entry is validated as soon as it is decoded,
+# errors point at the line and column of the offending value, and entries outside the selected
+# stage/day are skipped on their raw tags, without building or validating a model object.
+
+import json
+import logging
+import re
+
+DJ_KEY = "djs"
+PROMO_KEY = "promos"
+THEME_KEY = "theme"
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+log = logging.getLogger("shizu.lineup_model")
+
+
+class LineupError(Exception):
+    """A malformed export, with the position of the value that failed."""
+
+    def __init__(self, message, source="<lineup>", location="", line=None, column=None):
+        self.message = message
+        self.source = source
+        self.location = location
+        self.line = line
+        self.column = column
+        position = f"{source}:{line}:{column}" if line else source
+        super().__init__(f"{position}: {location + ': ' if location else ''}{message}")
+
+
+def type_name(value):
+    if value is None:
+        return "null"
+    return {bool: "boolean", int: "number", float: "number", str: "string", list: "array", dict: "object"}.get(
+        type(value), type(value).__name__
+    )
+
+
+# Field types, matched exactly so a boolean is not accepted as a number
+STRING = ((str,), "a string")
+NUMBER = ((int, float), "a number")
+ARRAY = ((list,), "an array")
+
+
+class LineupRecord:
+    """Base of the lineup entries. FIELDS maps each field to its (type, default), null reads as the default."""
+
+    __slots__ = ()
+    FIELDS = {}
+
+    def __init__(self, **values):
+        for name, (_, default) in self.FIELDS.items():
+            setattr(self, name, values.get(name, default))
+
+    @classmethod
+    def from_entry(cls, entry, error):
+        # error(message, field=None) raises a LineupError pointing at the entry or one of its fields
+        if not isinstance(entry, dict):
+            error(f"expected an object, got {type_name(entry)}")
+        # Filled in place, this runs once per entry of a possibly large export
+        record = cls.__new__(cls)
+        get = entry.get
+        for name, ((types, expected), default) in cls.FIELDS.items():
+            value = get(name)
+            if value is None:
+                value = default
+            elif type(value) not in types:
+                error(f"expected {expected}, got {type_name(value)}", name)
+            setattr(record, name, value)
+        record.check(error)
+        return record
+
+    def check(self, error):
+        pass
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+def check_resolution(record, error):
+    # Probed [width, height] of the media, empty when the export could not probe it
+    if not record.resolution:
+        record.resolution = ()
+        return
+    if len(record.resolution) != 2 or not all(type(size) is int and size > 0 for size in record.resolution):
+        error("expected [width, height] in pixels", "resolution")
+    record.resolution = tuple(record.resolution)
+
+
+class LineupDj(LineupRecord):
+    FIELDS = {
+        "name": (STRING, ""),
+        "logo_path": (STRING, ""),
+        "recording_path": (STRING, ""),
+        "visuals_path": (STRING, ""),
+        "resolution": (ARRAY, ()),
+        "url": (STRING, ""),
+        "vj": (STRING, ""),
+        # Only set in exports covering several stages or days
+        "stage": (STRING, ""),
+        "day": (STRING, ""),
+    }
+    __slots__ = tuple(FIELDS)
+
+    def check(self, error):
+        if not self.name:
+            error("a DJ needs a name", "name")
+        if self.url and "://" not in self.url:
+            error(f"not a stream URL: {self.url!r}", "url")
+        check_resolution(self, error)
+
+
+class LineupPromo(LineupRecord):
+    FIELDS = {
+        "name": (STRING, ""),
+        "path": (STRING, ""),
+        "resolution": (ARRAY, ()),
+        "stage": (STRING, ""),
+        "day": (STRING, ""),
+    }
+    __slots__ = tuple(FIELDS)
+
+    def check(self, error):
+        check_resolution(self, error)
+
+
+class LineupTheme(LineupRecord):
+    FIELDS = {
+        "name": (STRING, ""),
+        "overlay": (STRING, ""),
+        "starting": (STRING, ""),
+        "stinger": (STRING, ""),
+        "ending": (STRING, ""),
+        # Layout, None keeps the script defaults
+        "video_width": (NUMBER, None),
+        "video_height": (NUMBER, None),
+        "video_offset_x": (NUMBER, None),
+        "video_offset_y": (NUMBER, None),
+        "chat_width": (NUMBER, None),
+        "chat_height": (NUMBER, None),
+        "chat_offset_x": (NUMBER, None),
+        "chat_offset_y": (NUMBER, None),
+    }
+    __slots__ = tuple(FIELDS)
+
+    def check(self, error):
+        for name in ("video_width", "video_height", "chat_width", "chat_height"):
+            if getattr(self, name) is not None and getattr(self, name) <= 0:
+                error("must be greater than 0", name)
+
+
+class Lineup:
+    __slots__ = ("djs", "promos", "theme", "stage", "day", "stages", "days", "skipped")
+
+    def __init__(self, stage=None, day=None):
+        self.djs = []
+        self.promos = []
+        self.theme = None
+        # Selection, None keeps every entry
+        self.stage = stage
+        self.day = day
+        # Stages and days found in the file, in order of appearance
+        self.stages = {}
+        self.days = {}
+        # Entries outside the selection
+        self.skipped = 0
+
+    def selects(self, stage, day):
+        # Entries without a stage/day (promos, single stage exports) belong to every selection
+        return (not self.stage or not stage or stage == self.stage) and (not self.day or not day or day == self.day)
+
+
+def entry_tags(entry):
+    # (stage, day) of a decoded entry, None when it is not an object or they are not strings
+    if not isinstance(entry, dict):
+        return None
+    stage = entry.get("stage")
+    day = entry.get("day")
+    if not (stage is None or type(stage) is str) or not (day is None or type(day) is str):
+        return None
+    return stage or "", day or ""
+
+
+class LineupParser:
+    """Walks the top level of the export by hand and decodes one entry at a time with the C scanner.
+
+    The whole text is held in memory, raw_decode needs it to report positions.
+    """
+
+    ENTRY_TYPES = {DJ_KEY: LineupDj, PROMO_KEY: LineupPromo}
+    REQUIRED_KEYS = (DJ_KEY, PROMO_KEY)
+
+    def __init__(self, text, source="<lineup>", stage=None, day=None):
+        self.text = text
+        self.source = source
+        self.stage = stage or None
+        self.day = day or None
+        self.decoder = json.JSONDecoder()
+        self.field_patterns = {}
+
+    def error(self, message, pos, location=""):
+        line = self.text.count("\n", 0, pos) + 1
+        column = pos - self.text.rfind("\n", 0, pos)
+        raise LineupError(message, self.source, location, line, column)
+
+    def skip_whitespace(self, pos):
+        return WHITESPACE.match(self.text, pos).end()
+
+    def expect(self, char, pos, location=""):
+        pos = self.skip_whitespace(pos)
+        if self.text[pos:pos + 1] != char:
+            self.error(f"expected '{char}'", pos, location)
+        return pos + 1
+
+    def decode(self, pos, location=""):
+        try:
+            return self.decoder.raw_decode(self.text, pos)
+        except json.JSONDecodeError as error:
+            self.error(error.msg, error.pos, location)
+
+    def next_item(self, pos, closing, location):
+        # Returns (position after the separator, whether another item follows)
+        pos = self.skip_whitespace(pos)
+        char = self.text[pos:pos + 1]
+        if char == ",":
+            return pos + 1, True
+        if char == closing:
+            return pos + 1, False
+        self.error(f"expected ',' or '{closing}'", pos, location)
+
+    def field_position(self, field, start, end):
+        # Position of the field's value inside the entry spanning text[start:end], the entry start if not found
+        pattern = self.field_patterns.get(field)
+        if pattern is None:
+            pattern = self.field_patterns[field] = re.compile(r'"%s"\s*:\s*' % re.escape(field))
+        match = pattern.search(self.text, start, end)
+        return match.end() if match else start
+
+    def record(self, cls, value, start, end, location):
+        def error(message, field=None):
+            if field is None:
+                self.error(message, start, location)
+            self.error(message, self.field_position(field, start, end), f"{location}.{field}")
+
+        return cls.from_entry(value, error)
+
+    def parse(self):
+        lineup = Lineup(self.stage, self.day)
+        found = set()
+        pos = self.skip_whitespace(self.expect("{", 0))
+        more = self.text[pos:pos + 1] != "}"
+        if not more:
+            pos += 1
+        while more:
+            pos = self.skip_whitespace(pos)
+            if self.text[pos:pos + 1] != '"':
+                self.error("expected a key", pos)
+            key, pos = self.decode(pos)
+            pos = self.expect(":", pos, key)
+            found.add(key)
+            if key in self.ENTRY_TYPES:
+                pos = self.parse_entries(key, pos, lineup)
+            elif key == THEME_KEY:
+                start = self.skip_whitespace(pos)
+                value, pos = self.decode(start, key)
+                # The export writes an empty object when the event has no theme
+                lineup.theme = self.record(LineupTheme, value, start, pos, key) if value else None
+            else:
+                # Unknown keys are skipped, newer exports may add some
+                _, pos = self.decode(self.skip_whitespace(pos), key)
+            pos, more = self.next_item(pos, "}", key)
+        pos = self.skip_whitespace(pos)
+        if pos != len(self.text):
+            self.error("unexpected data after the lineup", pos)
+        for key in self.REQUIRED_KEYS:
+            if key not in found:
+                self.error(f"missing '{key}'", 0)
+
+        # A typo in the selection would otherwise quietly produce a lineup of untagged entries only
+        for kind, selection, found_values in (("stage", self.stage, lineup.stages), ("day", self.day, lineup.days)):
+            if selection and selection not in found_values:
+                raise LineupError(
+                    f"{kind} {selection!r} not found, the lineup has: {', '.join(found_values) or 'none'}", self.source
+                )
+        return lineup
+
+    def parse_entries(self, key, pos, lineup):
+        cls = self.ENTRY_TYPES[key]
+        selected = getattr(lineup, key)
+        pos = self.expect("[", pos, key)
+        after = self.skip_whitespace(pos)
+        if self.text[after:after + 1] == "]":
+            return after + 1
+        index = 0
+        more = True
+        while more:
+            location = f"{key}[{index}]"
+            start = self.skip_whitespace(pos)
+            value, pos = self.decode(start, location)
+            tags = entry_tags(value)
+            if tags is None:
+                # Fails the full check, which reports it with its position
+                self.record(cls, value, start, pos, location)
+            stage, day = tags
+            if stage:
+                lineup.stages[stage] = None
+            if day:
+                lineup.days[day] = None
+            if lineup.selects(stage, day):
+                selected.append(self.record(cls, value, start, pos, location))
+            else:
+                lineup.skipped += 1
+            index += 1
+            pos, more = self.next_item(pos, "]", location)
+        return pos
+
+
+def parse_lineup(text, source="<lineup>", stage=None, day=None):
+    return LineupParser(text, source, stage, day).parse()
+
+
+def load_lineup(path, stage=None, day=None):
+    # utf-8-sig, exports edited on Windows may start with a byte order mark
+    with open(path, encoding="utf-8-sig") as f:
+        text = f.read()
+    return select_lineup(text, str(path), stage, day)
+
+
+def select_lineup(text, source="<lineup>", stage=None, day=None):
+    # parse_lineup, logging how much of a multi-stage/day export was selected
+    lineup = parse_lineup(text, source, stage, day)
+    if lineup.skipped:
+        log.info(
+            "Selected %s: %d DJs, %d promos (%d entries of other stages/days skipped)",
+            " / ".join(part for part in (stage, day) if part), len(lineup.djs), len(lineup.promos), lineup.skipped
+        )
+    return lineup
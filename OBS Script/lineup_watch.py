@@ -0,0 +1,121 @@
+# Watch mode for the exported lineup.
+# The file is polled from an OBS timer: a stat per poll, the content is only read and hashed once the
+# size/mtime changed and stayed put long enough for the export to have finished writing. A changed file
+# is parsed once, here, and the parsed lineup is handed to the update.
+
+import hashlib
+import logging
+import os
+import time
+
+from lineup_model import LineupError, select_lineup
+
+log = logging.getLogger("shizu.lineup_watch")
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LineupWatcher:
+    """Calls on_change(lineup) when the content of path changed, settled and parses.
+
+    lineup is the stage/day selection of the new content. on_change returns False when it could not
+    apply yet (e.g. a generation is running), the change is then offered again on the next poll.
+    """
+
+    def __init__(self, obs, path, on_change, interval_ms=1000, settle_ms=2000, stage=None, day=None):
+        self.obs = obs
+        self.path = path
+        self.on_change = on_change
+        self.interval_ms = interval_ms
+        self.settle = settle_ms / 1000
+        self.stage = stage
+        self.day = day
+        # Last lineup parsed, None until the file changes, retries reuse it
+        self.lineup = None
+        # Hash of content that did not parse, reported once
+        self.failed_hash = None
+        self.signature = file_signature(path)
+        content = self.read_content()
+        self.content_hash = content[0] if content else None
+        # Signature seen last poll and since when, a write in progress keeps changing it
+        self.pending_signature = None
+        self.pending_since = None
+        self.apply_requested = False
+        self.running = False
+        # timer_remove matches on the callable, keep one bound method around
+        self.poll_callback = self.poll
+
+    def start(self):
+        self.running = True
+        self.obs.timer_add(self.poll_callback, self.interval_ms)
+        log.info("Watching %s for changes", self.path)
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.obs.timer_remove(self.poll_callback)
+
+    def request_apply(self):
+        # Apply on the next poll even if the file did not change, used to retry deferred updates.
+        # Nothing parsed yet hands None, the update then reads the file itself
+        self.apply_requested = True
+
+    def read_content(self):
+        # (sha256, bytes) of the file, None if it cannot be read
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        return hashlib.sha256(data).hexdigest(), data
+
+    def poll(self):
+        if self.apply_requested:
+            if self.on_change(self.lineup) is not False:
+                self.apply_requested = False
+            return
+
+        signature = file_signature(self.path)
+        if signature is None or signature == self.signature:
+            self.pending_signature = None
+            return
+        now = time.monotonic()
+        if signature != self.pending_signature:
+            # Changed since the last poll, still being written
+            self.pending_signature = signature
+            self.pending_since = now
+            return
+        if now - self.pending_since < self.settle:
+            return
+
+        content = self.read_content()
+        if content is None:
+            return
+        content_hash, data = content
+        if content_hash == self.content_hash:
+            # Touched or rewritten with the same content
+            self.signature = signature
+            self.pending_signature = None
+            return
+        try:
+            lineup = select_lineup(data.decode("utf-8-sig"), self.path, self.stage, self.day)
+        except (LineupError, UnicodeDecodeError) as error:
+            # Settled but not valid yet, keep waiting for the rest of the write
+            if content_hash != self.failed_hash:
+                self.failed_hash = content_hash
+                log.warning("%s changed but cannot be applied yet: %s", self.path, error)
+            self.pending_since = now
+            return
+
+        self.lineup = lineup
+        if self.on_change(lineup) is False:
+            return
+        self.signature = signature
+        self.content_hash = content_hash
+        self.pending_signature = None
@@ -0,0 +1,536 @@
+# Live DJ streams.
+# VLC only connects once a source is shown, so a live set used to open on seconds of black and a dead
+# stream was only found on air. The next live DJ's source is connected while the previous set plays,
+# and upcoming stream URLs are checked on a worker thread: reachable, time to first media byte, bitrate.
+
+import json
+import logging
+import os
+import socket
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from decoder_budget import scene_media_from_plan
+from obs_handles import HandleScope
+
+LIVE_SOURCE_IDS = ("vlc_source",)
+# vlc_source playback_behavior values, always_play keeps the stream connected while hidden
+PLAYBACK_ALWAYS = "always_play"
+PLAYBACK_DEFAULT = "stop_restart"
+
+# Health checks
+CHECK_INTERVAL_MS = 30000
+CHECK_AHEAD = 3
+SAMPLE_SECONDS = 2.0
+CONNECT_TIMEOUT = 5.0
+
+RTMP_PORT = 1935
+RTMP_HANDSHAKE_SIZE = 1536
+# RTMP message types
+MSG_SET_CHUNK_SIZE = 1
+MSG_ACKNOWLEDGEMENT = 3
+MSG_USER_CONTROL = 4
+MSG_WINDOW_ACK_SIZE = 5
+MSG_SET_PEER_BANDWIDTH = 6
+MSG_AUDIO = 8
+MSG_VIDEO = 9
+MSG_COMMAND_AMF0 = 20
+USER_CONTROL_PING = 6
+USER_CONTROL_PONG = 7
+
+log = logging.getLogger("shizu.live_streams")
+
+
+# AMF0, the subset used by connect/createStream/play and their replies
+def amf_encode(*values):
+    out = bytearray()
+    for value in values:
+        if value is None:
+            out += b"\x05"
+        elif isinstance(value, bool):
+            out += b"\x01" + (b"\x01" if value else b"\x00")
+        elif isinstance(value, (int, float)):
+            out += b"\x00" + struct.pack(">d", value)
+        elif isinstance(value, str):
+            encoded = value.encode("utf-8")
+            out += b"\x02" + struct.pack(">H", len(encoded)) + encoded
+        elif isinstance(value, dict):
+            out += b"\x03"
+            for key, item in value.items():
+                encoded = key.encode("utf-8")
+                out += struct.pack(">H", len(encoded)) + encoded + amf_encode(item)
+            out += b"\x00\x00\x09"
+        else:
+            raise TypeError(f"Cannot encode {type(value).__name__} as AMF0")
+    return bytes(out)
+
+
+def amf_decode(data):
+    # Decodes values until the end of data or the first unsupported type
+    values = []
+    pos = 0
+    while pos < len(data):
+        try:
+            value, pos = amf_decode_value(data, pos)
+        except (ValueError, IndexError, struct.error):
+            break
+        values.append(value)
+    return values
+
+
+def amf_decode_value(data, pos):
+    marker = data[pos]
+    pos += 1
+    if marker == 0x00:
+        return struct.unpack_from(">d", data, pos)[0], pos + 8
+    if marker == 0x01:
+        return data[pos] != 0, pos + 1
+    if marker == 0x02:
+        length = struct.unpack_from(">H", data, pos)[0]
+        return data[pos + 2:pos + 2 + length].decode("utf-8", "replace"), pos + 2 + length
+    if marker in (0x05, 0x06):
+        return None, pos
+    if marker in (0x03, 0x08):
+        if marker == 0x08:
+            # ECMA array, a count followed by the same layout as an object
+            pos += 4
+        value = {}
+        while data[pos:pos + 3] != b"\x00\x00\x09":
+            length = struct.unpack_from(">H", data, pos)[0]
+            key = data[pos + 2:pos + 2 + length].decode("utf-8", "replace")
+            value[key], pos = amf_decode_value(data, pos + 2 + length)
+        return value, pos + 3
+    raise ValueError(f"Unsupported AMF0 type {marker}")
+
+
+class ChunkStream:
+    """Minimal RTMP chunk stream over a connected socket, used by the check and the local stand-in."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = bytearray()
+        self.in_chunk_size = 128
+        self.out_chunk_size = 128
+        # {chunk stream id: [timestamp, length, type, stream id, extended timestamp]} of the last header
+        self.headers = {}
+        # {chunk stream id: payload read so far} of messages split over several chunks
+        self.partial = {}
+        self.bytes_in = 0
+        self.window = 0
+        self.acknowledged = 0
+
+    def read_exact(self, size):
+        while len(self.buffer) < size:
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError("Connection closed by the server")
+            self.buffer += data
+            self.bytes_in += len(data)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def read_message(self):
+        # (type, stream id, payload) of the next complete message, protocol control is applied on the way
+        while True:
+            first = self.read_exact(1)[0]
+            fmt = first >> 6
+            csid = first & 0x3F
+            if csid == 0:
+                csid = 64 + self.read_exact(1)[0]
+            elif csid == 1:
+                low, high = self.read_exact(2)
+                csid = 64 + low + high * 256
+            header = self.headers.setdefault(csid, [0, 0, 0, 0, False])
+            if fmt < 3:
+                fields = self.read_exact((11, 7, 3)[fmt])
+                timestamp = int.from_bytes(fields[0:3], "big")
+                if fmt < 2:
+                    header[1] = int.from_bytes(fields[3:6], "big")
+                    header[2] = fields[6]
+                if fmt == 0:
+                    header[3] = int.from_bytes(fields[7:11], "little")
+                header[4] = timestamp == 0xFFFFFF
+                if header[4]:
+                    timestamp = int.from_bytes(self.read_exact(4), "big")
+                header[0] = timestamp if fmt == 0 else header[0] + timestamp
+            elif header[4]:
+                self.read_exact(4)
+
+            payload = self.partial.setdefault(csid, bytearray())
+            payload += self.read_exact(min(self.in_chunk_size, header[1] - len(payload)))
+            self.acknowledge()
+            if len(payload) < header[1]:
+                continue
+            del self.partial[csid]
+            message = (header[2], header[3], bytes(payload))
+            self.handle_control(*message)
+            return message
+
+    def handle_control(self, msg_type, stream_id, payload):
+        if msg_type == MSG_SET_CHUNK_SIZE:
+            self.in_chunk_size = struct.unpack(">I", payload[:4])[0] & 0x7FFFFFFF
+        elif msg_type == MSG_WINDOW_ACK_SIZE:
+            self.window = struct.unpack(">I", payload[:4])[0]
+        elif msg_type == MSG_USER_CONTROL and payload[:2] == struct.pack(">H", USER_CONTROL_PING):
+            self.write_message(2, MSG_USER_CONTROL, 0, struct.pack(">H", USER_CONTROL_PONG) + payload[2:6])
+
+    def acknowledge(self):
+        # Servers stop sending once a window of bytes went unacknowledged
+        if self.window and self.bytes_in - self.acknowledged >= self.window // 2:
+            self.acknowledged = self.bytes_in
+            self.write_message(2, MSG_ACKNOWLEDGEMENT, 0, struct.pack(">I", self.bytes_in & 0xFFFFFFFF))
+
+    def write_message(self, csid, msg_type, stream_id, payload, timestamp=0):
+        extended = timestamp >= 0xFFFFFF
+        out = bytearray([csid])
+        out += min(timestamp, 0xFFFFFF).to_bytes(3, "big")
+        out += len(payload).to_bytes(3, "big") + bytes([msg_type]) + stream_id.to_bytes(4, "little")
+        extended_bytes = timestamp.to_bytes(4, "big") if extended else b""
+        out += extended_bytes
+        for start in range(0, max(len(payload), 1), self.out_chunk_size):
+            if start:
+                out += bytes([0xC0 | csid]) + extended_bytes
+            out += payload[start:start + self.out_chunk_size]
+        self.sock.sendall(out)
+
+    def set_chunk_size(self, size):
+        self.write_message(2, MSG_SET_CHUNK_SIZE, 0, struct.pack(">I", size))
+        self.out_chunk_size = size
+
+    def command(self, stream_id, *values):
+        self.write_message(3 if stream_id == 0 else 8, MSG_COMMAND_AMF0, stream_id, amf_encode(*values))
+
+
+def rtmp_client_handshake(sock):
+    c1 = struct.pack(">II", int(time.time()) & 0xFFFFFFFF, 0) + os.urandom(RTMP_HANDSHAKE_SIZE - 8)
+    sock.sendall(b"\x03" + c1)
+    stream = ChunkStream(sock)
+    s0s1 = stream.read_exact(1 + RTMP_HANDSHAKE_SIZE)
+    stream.read_exact(RTMP_HANDSHAKE_SIZE)
+    sock.sendall(s0s1[1:])
+    return stream
+
+
+def rtmp_server_handshake(sock):
+    stream = ChunkStream(sock)
+    c0c1 = stream.read_exact(1 + RTMP_HANDSHAKE_SIZE)
+    s1 = struct.pack(">II", int(time.time()) & 0xFFFFFFFF, 0) + os.urandom(RTMP_HANDSHAKE_SIZE - 8)
+    sock.sendall(b"\x03" + s1 + c0c1[1:])
+    stream.read_exact(RTMP_HANDSHAKE_SIZE)
+    return stream
+
+
+class StreamHealth:
+    __slots__ = ("url", "reachable", "live", "connect_ms", "first_byte_ms", "kbps", "error", "checked")
+
+    def __init__(self, url):
+        self.url = url
+        # Server answered / media is flowing
+        self.reachable = False
+        self.live = False
+        self.connect_ms = None
+        # From the start of the check to the first audio/video byte, what a viewer waits for
+        self.first_byte_ms = None
+        self.kbps = None
+        self.error = None
+        self.checked = time.time()
+
+    def __str__(self) -> str:
+        if self.live:
+            return f"OK {self.kbps:.0f} kbps, first byte {self.first_byte_ms:.0f} ms"
+        return f"{'NO MEDIA' if self.reachable else 'DOWN'} ({self.error})"
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def check_stream(url, sample_seconds=SAMPLE_SECONDS, timeout=CONNECT_TIMEOUT):
+    health = StreamHealth(url)
+    scheme = urlsplit(url).scheme.lower()
+    checks = {"rtmp": check_rtmp, "http": check_http, "https": check_http}
+    if scheme not in checks:
+        health.error = f"unsupported scheme {scheme or 'none'}"
+        return health
+    try:
+        checks[scheme](health, sample_seconds, timeout)
+    except (OSError, ValueError) as error:
+        health.error = str(error) or type(error).__name__
+    return health
+
+
+def check_rtmp(health, sample_seconds, timeout):
+    parts = urlsplit(health.url)
+    app, _, stream_key = parts.path.lstrip("/").rpartition("/")
+    start = time.perf_counter()
+    with socket.create_connection((parts.hostname, parts.port or RTMP_PORT), timeout) as sock:
+        health.connect_ms = (time.perf_counter() - start) * 1000
+        sock.settimeout(timeout)
+        # The commands are small writes waiting on replies, Nagle would add its delay to the first byte time
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = rtmp_client_handshake(sock)
+        health.reachable = True
+        stream.set_chunk_size(4096)
+        tc_url = f"{parts.scheme}://{parts.netloc}/{app}"
+        stream.command(0, "connect", 1, {"app": app, "tcUrl": tc_url, "flashVer": "LNX 9,0,124,2", "fpad": False})
+        rtmp_result(stream, 1)
+        stream.command(0, "createStream", 2, None)
+        values = rtmp_result(stream, 2)
+        if len(values) < 4 or not isinstance(values[3], float):
+            raise ConnectionError("createStream returned no stream id")
+        stream_id = int(values[3])
+        stream.command(stream_id, "play", 0, None, stream_key)
+        sample_media(health, stream.read_message, start, sample_seconds, timeout)
+
+
+def rtmp_result(stream, transaction):
+    # Values of the _result for transaction, an _error reply raises
+    while True:
+        msg_type, _, payload = stream.read_message()
+        if msg_type != MSG_COMMAND_AMF0:
+            continue
+        values = amf_decode(payload)
+        if len(values) > 1 and values[1] == transaction:
+            if values[0] != "_result":
+                raise ConnectionError(f"{values[0]}: {status_code(values)}")
+            return values
+
+
+def status_info(values):
+    # Info object of a command reply or onStatus: [name, transaction, null, info]
+    return values[3] if len(values) > 3 and isinstance(values[3], dict) else {}
+
+
+def status_code(values):
+    info = status_info(values)
+    return info.get("code") or info.get("description") or "rejected"
+
+
+def sample_media(health, read_message, start, sample_seconds, timeout):
+    # Counts audio/video payload bytes for sample_seconds after the first one arrives
+    media_bytes = 0
+    first = None
+    while True:
+        now = time.perf_counter()
+        if first is None and now - start > timeout:
+            raise TimeoutError(f"no media within {timeout:.0f} s")
+        if first is not None and now - first >= sample_seconds:
+            break
+        msg_type, _, payload = read_message()
+        if msg_type == MSG_COMMAND_AMF0:
+            values = amf_decode(payload)
+            if values and values[0] == "onStatus" and status_info(values).get("level") == "error":
+                raise ConnectionError(status_code(values))
+        elif msg_type in (MSG_AUDIO, MSG_VIDEO) and payload:
+            if first is None:
+                # The clock starts here, so this message is not part of the sample
+                first = time.perf_counter()
+                health.first_byte_ms = (first - start) * 1000
+            else:
+                media_bytes += len(payload)
+    health.live = True
+    health.kbps = media_bytes * 8 / (time.perf_counter() - first) / 1000
+
+
+def check_http(health, sample_seconds, timeout):
+    # HTTP-FLV/MPEG-TS style endpoints, every body byte counts as media
+    import http.client
+
+    parts = urlsplit(health.url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    start = time.perf_counter()
+    connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    try:
+        connection.connect()
+        health.connect_ms = (time.perf_counter() - start) * 1000
+        connection.request("GET", path)
+        response = connection.getresponse()
+        health.reachable = True
+        if response.status >= 400:
+            raise ConnectionError(f"HTTP {response.status} {response.reason}")
+
+        def read_message():
+            data = response.read1(65536)
+            if not data:
+                raise ConnectionError("Stream ended")
+            return MSG_VIDEO, 0, data
+
+        sample_media(health, read_message, start, sample_seconds, timeout)
+    except http.client.HTTPException as error:
+        raise ConnectionError(f"{type(error).__name__}: {error}") from error
+    finally:
+        connection.close()
+
+
+def scene_streams_from_plan(plan):
+    # {scene name: [(live source name, stream URL)]} for every lineup scene, in lineup order
+    scene_streams = {}
+    for scene_name in scene_media_from_plan(plan):
+        streams = []
+        for item in plan.scenes[scene_name].items:
+            if item.source.id not in LIVE_SOURCE_IDS:
+                continue
+            playlist = plan.sources[item.source.name].settings.get("playlist") or [{}]
+            url = playlist[0].get("value") or ""
+            # The promo playlist is a VLC source of local files
+            if "://" in url and not url.startswith("file:"):
+                streams.append((item.source.name, url))
+        scene_streams[scene_name] = streams
+    return scene_streams
+
+
+class LiveStreams:
+    """Pre-connects the next scene's live sources and checks the upcoming live DJs' URLs.
+
+    Checks run on worker threads, results are collected from an OBS timer so logging and
+    on_report stay on the OBS thread.
+    """
+
+    def __init__(self, obs, scene_streams, prewarm=True, interval_ms=CHECK_INTERVAL_MS, on_report=None):
+        self.obs = obs
+        self.scene_order = list(scene_streams)
+        self.scene_streams = scene_streams
+        self.prewarm = prewarm
+        self.interval_ms = interval_ms
+        self.on_report = on_report
+        self.pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="stream_health")
+        self.current_scene = None
+        self.previous_scene = None
+        self.warm_sources = set()
+        # {url: future} of running checks, {url: StreamHealth} of the last finished one
+        self.pending = {}
+        self.health = {}
+        self.running = False
+        self.poll_callback = self.poll
+
+    def live_scenes(self):
+        return [name for name in self.scene_order if self.scene_streams[name]]
+
+    def start(self):
+        if not self.live_scenes():
+            return
+        self.refresh()
+        if self.interval_ms > 0:
+            self.running = True
+            self.obs.timer_add(self.poll_callback, self.interval_ms)
+            self.check_upcoming()
+
+    def next_scene(self, scene_name):
+        if scene_name not in self.scene_streams:
+            return self.scene_order[0] if self.scene_order else None
+        index = self.scene_order.index(scene_name)
+        return self.scene_order[index + 1] if index + 1 < len(self.scene_order) else None
+
+    def upcoming_scenes(self):
+        # Live scenes after the program scene, the next CHECK_AHEAD are checked
+        if self.current_scene in self.scene_streams:
+            following = self.scene_order[self.scene_order.index(self.current_scene) + 1:]
+        else:
+            following = self.scene_order
+        return [name for name in following if self.scene_streams[name]][:CHECK_AHEAD]
+
+    def refresh(self):
+        with HandleScope(self.obs) as scope:
+            name = self.obs.obs_source_get_name(scope.source(self.obs.obs_frontend_get_current_scene()))
+        if name == self.current_scene and name is not None:
+            return
+        self.previous_scene = self.current_scene
+        self.current_scene = name
+        if self.prewarm:
+            self.rebalance()
+        if self.running:
+            self.check_upcoming()
+
+    def rebalance(self):
+        next_scene = self.next_scene(self.current_scene)
+        warm = {source for source, _ in self.scene_streams.get(next_scene, [])}
+        # Updating a VLC source restarts its playlist, sources on program or in the outgoing transition stay as they are
+        on_air = {
+            source for scene in (self.current_scene, self.previous_scene)
+            for source, _ in self.scene_streams.get(scene, [])
+        }
+        for scene in self.scene_order:
+            for source, _ in self.scene_streams[scene]:
+                if source not in on_air:
+                    self.set_playback(source, PLAYBACK_ALWAYS if source in warm else PLAYBACK_DEFAULT)
+        if warm - self.warm_sources:
+            log.info("Pre-connecting %s ahead of its slot", ", ".join(sorted(warm)))
+        self.warm_sources = warm
+
+    def set_playback(self, name, behavior):
+        with HandleScope(self.obs) as scope:
+            source = scope.source(self.obs.obs_get_source_by_name(name))
+            if source is None:
+                return
+            current_settings = scope.data(self.obs.obs_source_get_settings(source))
+            live_settings = json.loads(self.obs.obs_data_get_json(current_settings))
+            if live_settings.get("playback_behavior", PLAYBACK_DEFAULT) == behavior:
+                return
+            settings = scope.data(self.obs.obs_data_create())
+            self.obs.obs_data_set_string(settings, "playback_behavior", behavior)
+            self.obs.obs_source_update(source, settings)
+
+    def check_upcoming(self):
+        for scene in self.upcoming_scenes():
+            for _, url in self.scene_streams[scene]:
+                if url and url not in self.pending:
+                    self.pending[url] = self.pool.submit(check_stream, url)
+
+    def poll(self):
+        finished = [url for url, future in self.pending.items() if future.done()]
+        for url in finished:
+            future = self.pending.pop(url)
+            if future.cancelled():
+                continue
+            health = future.result()
+            previous = self.health.get(url)
+            self.health[url] = health
+            if not health.live:
+                log.warning("Live stream %s: %s", url, health)
+            elif previous and not previous.live:
+                log.info("Live stream %s is back: %s", url, health)
+        if finished and self.on_report:
+            self.on_report(self.report())
+        # Next round once the last one finished, a slow server never piles up checks
+        if not self.pending:
+            self.check_upcoming()
+
+    def report(self):
+        lines = []
+        for scene in self.upcoming_scenes():
+            for _, url in self.scene_streams[scene]:
+                health = self.health.get(url)
+                lines.append(f"{scene}: {health if health else 'checking..'}")
+        return "\n".join(lines) or "No upcoming live DJs"
+
+    def close(self):
+        if self.running:
+            self.running = False
+            self.obs.timer_remove(self.poll_callback)
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check live DJ stream URLs like the script does before their slot")
+    parser.add_argument("urls", nargs="+", help="rtmp:// or http(s):// stream URLs")
+    parser.add_argument("--sample", type=float, default=SAMPLE_SECONDS, help="Seconds of media to measure the bitrate over")
+    parser.add_argument("--timeout", type=float, default=CONNECT_TIMEOUT, help="Seconds to wait for the server and first media")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda url: check_stream(url, args.sample, args.timeout), args.urls))
+    if args.json:
+        print(json.dumps([health.to_dict() for health in results], indent=2))
+    else:
+        for health in results:
+            print(f"{health.url}: {health}")
+
+
+if __name__ == "__main__":
+    main()
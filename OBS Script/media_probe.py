@@ -0,0 +1,386 @@
+# Media metadata probing.
+# Reads width, height, duration and codec straight from container headers (MP4/MOV, Matroska/WebM),
+# images through PIL. Results are cached on disk keyed by path, size and mtime so repeated runs over
+# the same media library never touch the files again.
+
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+CACHE_VERSION = 1
+DEFAULT_WORKERS = 8
+# moov boxes are a few MB even for long sets, anything bigger is not worth reading
+MAX_HEADER_BYTES = 64 * 1024 * 1024
+
+MP4_CODECS = {
+    "avc1": "h264",
+    "avc3": "h264",
+    "hvc1": "hevc",
+    "hev1": "hevc",
+    "av01": "av1",
+    "vp09": "vp9",
+    "mp4v": "mpeg4",
+    "apcn": "prores",
+    "apch": "prores",
+}
+MKV_CODECS = {
+    "V_MPEG4/ISO/AVC": "h264",
+    "V_MPEGH/ISO/HEVC": "hevc",
+    "V_AV1": "av1",
+    "V_VP9": "vp9",
+    "V_VP8": "vp8",
+}
+MP4_CONTAINERS = {"moov", "trak", "mdia", "minf", "stbl"}
+
+# Matroska element ids
+EBML_HEADER = 0x1A45DFA3
+MKV_SEGMENT = 0x18538067
+MKV_CLUSTER = 0x1F43B675
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_VIDEO = 0xE0
+MKV_PIXEL_WIDTH = 0xB0
+MKV_PIXEL_HEIGHT = 0xBA
+
+
+def media_info(width=None, height=None, duration=None, codec=None):
+    return {"width": width, "height": height, "duration": duration, "codec": codec}
+
+
+# MP4 / MOV
+
+
+def iter_mp4_boxes(data, offset=0, end=None):
+    end = len(data) if end is None else end
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type.decode("latin-1"), offset + header, offset + size
+        offset += size
+
+
+def read_mp4_moov(f):
+    # Walk the top level boxes by seeking, moov may sit after gigabytes of mdat
+    offset = 0
+    file_size = os.fstat(f.fileno()).st_size
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(16)
+        if len(header) < 8:
+            return None
+        size, box_type = struct.unpack_from(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", header, 8)[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - offset
+        if size < header_size:
+            return None
+        if box_type == b"moov":
+            if size > MAX_HEADER_BYTES:
+                return None
+            f.seek(offset + header_size)
+            return f.read(size - header_size)
+        offset += size
+    return None
+
+
+def parse_mp4_track(data, start, end, track):
+    for box_type, box_start, box_end in iter_mp4_boxes(data, start, end):
+        if box_type in MP4_CONTAINERS:
+            parse_mp4_track(data, box_start, box_end, track)
+        elif box_type == "hdlr":
+            track["handler"] = data[box_start + 8:box_start + 12].decode("latin-1")
+        elif box_type == "tkhd":
+            # Display size, 16.16 fixed point at the end of the box
+            width, height = struct.unpack_from(">II", data, box_end - 8)
+            track.setdefault("width", width >> 16)
+            track.setdefault("height", height >> 16)
+        elif box_type == "stsd":
+            entry_start = box_start + 8
+            if entry_start + 36 <= box_end:
+                fourcc = data[entry_start + 4:entry_start + 8].decode("latin-1")
+                track["codec"] = MP4_CODECS.get(fourcc, fourcc)
+                # Coded size from the visual sample entry, what the decoder hands to OBS
+                width, height = struct.unpack_from(">HH", data, entry_start + 32)
+                if width and height:
+                    track["coded_width"] = width
+                    track["coded_height"] = height
+
+
+def probe_mp4(f):
+    moov = read_mp4_moov(f)
+    if moov is None:
+        return None
+    info = media_info()
+    for box_type, start, end in iter_mp4_boxes(moov):
+        if box_type == "mvhd":
+            version = moov[start]
+            if version == 1:
+                timescale, duration = struct.unpack_from(">IQ", moov, start + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", moov, start + 12)
+            if timescale:
+                info["duration"] = duration / timescale
+        elif box_type == "trak" and info["codec"] is None:
+            track = {}
+            parse_mp4_track(moov, start, end, track)
+            if track.get("handler") == "vide":
+                info["codec"] = track.get("codec")
+                info["width"] = track.get("coded_width", track.get("width"))
+                info["height"] = track.get("coded_height", track.get("height"))
+    return info
+
+
+# Matroska / WebM
+
+
+def read_vint(f, keep_marker=False):
+    first = f.read(1)
+    if not first:
+        raise EOFError
+    value = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not value & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("Invalid EBML variable length integer")
+    if not keep_marker:
+        value &= mask - 1
+    unknown = value == mask - 1
+    for byte in f.read(length - 1):
+        value = (value << 8) | byte
+        unknown = unknown and byte == 0xFF
+    return value, unknown
+
+
+def iter_ebml(f, end):
+    while f.tell() < end:
+        try:
+            element_id, _ = read_vint(f, keep_marker=True)
+            size, unknown = read_vint(f)
+        except EOFError:
+            return
+        start = f.tell()
+        yield element_id, start, end if unknown else start + size
+
+
+def read_uint(f, start, end):
+    f.seek(start)
+    return int.from_bytes(f.read(end - start), "big")
+
+
+def probe_matroska(f):
+    file_size = os.fstat(f.fileno()).st_size
+    f.seek(0)
+    element_id, _ = read_vint(f, keep_marker=True)
+    if element_id != EBML_HEADER:
+        return None
+    f.seek(0)
+    info = media_info()
+    timecode_scale = 1000000
+    duration = None
+    for element_id, start, end in iter_ebml(f, file_size):
+        if element_id != MKV_SEGMENT:
+            f.seek(end)
+            continue
+        for child_id, child_start, child_end in iter_ebml(f, end):
+            if child_id == MKV_CLUSTER:
+                break
+            if child_id == MKV_INFO:
+                for info_id, info_start, info_end in iter_ebml(f, child_end):
+                    if info_id == MKV_TIMECODE_SCALE:
+                        timecode_scale = read_uint(f, info_start, info_end)
+                    elif info_id == MKV_DURATION:
+                        f.seek(info_start)
+                        raw = f.read(info_end - info_start)
+                        duration = struct.unpack(">f" if len(raw) == 4 else ">d", raw)[0]
+                    f.seek(info_end)
+            elif child_id == MKV_TRACKS:
+                for entry_id, entry_start, entry_end in iter_ebml(f, child_end):
+                    if entry_id == MKV_TRACK_ENTRY and info["codec"] is None:
+                        probe_matroska_track(f, entry_end, info)
+                    f.seek(entry_end)
+            f.seek(child_end)
+        break
+    if duration is not None:
+        info["duration"] = duration * timecode_scale / 1e9
+    return info
+
+
+def probe_matroska_track(f, end, info):
+    track = {}
+    for element_id, start, element_end in iter_ebml(f, end):
+        if element_id == MKV_TRACK_TYPE:
+            track["type"] = read_uint(f, start, element_end)
+        elif element_id == MKV_CODEC_ID:
+            f.seek(start)
+            track["codec"] = f.read(element_end - start).rstrip(b"\0").decode("ascii", "replace")
+        elif element_id == MKV_VIDEO:
+            for video_id, video_start, video_end in iter_ebml(f, element_end):
+                if video_id == MKV_PIXEL_WIDTH:
+                    track["width"] = read_uint(f, video_start, video_end)
+                elif video_id == MKV_PIXEL_HEIGHT:
+                    track["height"] = read_uint(f, video_start, video_end)
+                f.seek(video_end)
+        f.seek(element_end)
+    if track.get("type") == 1:
+        info["codec"] = MKV_CODECS.get(track.get("codec"), track.get("codec"))
+        info["width"] = track.get("width")
+        info["height"] = track.get("height")
+
+
+# Images and fallback
+
+
+def probe_image(path):
+    # PIL only reads the header on open
+    from PIL import Image
+
+    with Image.open(path) as image:
+        width, height = image.size
+        return media_info(width, height, None, (image.format or "").lower() or None)
+
+
+def probe_ffprobe(path):
+    # Last resort for containers without a header parser (ts, flv, avi..), imported here to keep script load fast
+    import shutil
+    import subprocess
+
+    ffprobe = shutil.which("ffprobe")
+    if not ffprobe:
+        return None
+    try:
+        result = subprocess.run(
+            [
+                ffprobe, "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "stream=width,height,codec_name:format=duration",
+                "-of", "json", path,
+            ],
+            capture_output=True, timeout=30,
+        )
+    except subprocess.SubprocessError:
+        return None
+    if result.returncode != 0:
+        return None
+    data = json.loads(result.stdout)
+    streams = data.get("streams") or [{}]
+    duration = data.get("format", {}).get("duration")
+    return media_info(
+        streams[0].get("width"),
+        streams[0].get("height"),
+        float(duration) if duration else None,
+        streams[0].get("codec_name"),
+    )
+
+
+def probe_file(path):
+    # Returns media_info for path, or None if the format is unknown
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            if head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+                info = probe_mp4(f)
+            elif head[:4] == b"\x1a\x45\xdf\xa3":
+                info = probe_matroska(f)
+            else:
+                info = None
+    except (OSError, ValueError, struct.error, EOFError):
+        return None
+    if info and info["width"]:
+        return info
+    try:
+        return probe_image(path)
+    except Exception:
+        pass
+    try:
+        return probe_ffprobe(path)
+    except (OSError, ValueError):
+        return None
+
+
+class MediaProbe:
+    """Probe results for media files, persisted to cache_path.
+
+    Entries are reused while a file keeps the same size and mtime.
+    """
+
+    def __init__(self, cache_path, workers=DEFAULT_WORKERS, stats=None):
+        self.cache_path = Path(cache_path)
+        self.workers = workers
+        # host_paths.StatCache of the run, files checked by the pre-flight are not stat'ed again
+        self.stat = stats.stat if stats is not None else os.stat
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, f)
+        os.replace(temp_path, self.cache_path)
+        self.dirty = False
+
+    def lookup(self, path, stat):
+        entry = self.entries.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return entry
+        return None
+
+    def probe(self, path):
+        try:
+            stat = self.stat(path)
+        except OSError:
+            return None
+        entry = self.lookup(path, stat)
+        if entry:
+            self.hits += 1
+            return entry["info"]
+        self.misses += 1
+        info = probe_file(path)
+        self.entries[path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "info": info}
+        self.dirty = True
+        return info
+
+    def probe_all(self, paths):
+        # Warm the cache for a whole lineup at once, the headers are read concurrently
+        unique_paths = list(dict.fromkeys(path for path in paths if path))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(unique_paths, pool.map(self.probe, unique_paths)))
+
+    def size(self, path):
+        info = self.probe(path) if path else None
+        if info and info.get("width") and info.get("height"):
+            return info["width"], info["height"]
+        return None
@@ -0,0 +1,133 @@
+# Scoped ownership of obspython handles.
+# Every obs_data, obs_source, obs_scene, obs_output and list the script acquires is adopted by a HandleScope,
+# which releases them in reverse order when the scope exits, including when an exception is raised.
+
+import logging
+import traceback
+
+# How each kind of handle is given back to OBS
+RELEASE_FUNCTIONS = {
+    "data": "obs_data_release",
+    "source": "obs_source_release",
+    "scene": "obs_scene_release",
+    "source_list": "source_list_release",
+    "item_list": "sceneitem_list_release",
+    "output": "obs_output_release",
+}
+
+log = logging.getLogger("shizu.obs_handles")
+
+
+class HandleTracker:
+    """Records where every adopted handle came from while enabled, for the leak audit."""
+
+    def __init__(self):
+        self.enabled = False
+        # {id(handle): (kind, acquired at)}
+        self.held = {}
+        self.adopted = 0
+        self.released = 0
+
+    def reset(self):
+        self.held = {}
+        self.adopted = 0
+        self.released = 0
+
+    def add(self, kind, handle):
+        if not self.enabled:
+            return
+        # Skip the scope frames, report the line that acquired the handle
+        frame = traceback.extract_stack(limit=4)[0]
+        self.held[id(handle)] = (kind, f"{frame.filename}:{frame.lineno} {frame.name}")
+        self.adopted += 1
+
+    def remove(self, handle):
+        if self.held.pop(id(handle), None):
+            self.released += 1
+
+    def report(self):
+        lines = [f"Handles: {self.adopted} adopted, {self.released} released, {len(self.held)} outstanding"]
+        for kind, site in self.held.values():
+            lines.append(f"  {kind} acquired at {site}")
+        return "\n".join(lines)
+
+
+tracker = HandleTracker()
+
+
+class HandleScope:
+    """Owns obspython handles until the scope exits.
+
+    with HandleScope(S) as scope:
+        settings = scope.data(S.obs_data_create())
+        source = scope.source(S.obs_source_create("image_source", name, settings, None))
+    """
+
+    def __init__(self, obs):
+        # Bound at creation, the script swaps its backend while planning
+        self.obs = obs
+        self.handles = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.release_all()
+        return False
+
+    def adopt(self, kind, handle):
+        # Returns handle so acquisition and adoption read as one expression, None is passed through
+        if handle is None:
+            return None
+        self.handles.append((kind, handle))
+        tracker.add(kind, handle)
+        return handle
+
+    def data(self, handle):
+        return self.adopt("data", handle)
+
+    def source(self, handle):
+        return self.adopt("source", handle)
+
+    def scene(self, handle):
+        return self.adopt("scene", handle)
+
+    def source_list(self, handle):
+        return self.adopt("source_list", handle)
+
+    def item_list(self, handle):
+        return self.adopt("item_list", handle)
+
+    def output(self, handle):
+        return self.adopt("output", handle)
+
+    def take(self, handle):
+        # Remove handle from the scope without releasing it
+        for index, (kind, held) in enumerate(self.handles):
+            if held is handle:
+                del self.handles[index]
+                return kind
+        raise ValueError("Handle is not owned by this scope")
+
+    def release(self, handle):
+        # Release before the scope exits, e.g. one scene per loop iteration
+        self.give_back(self.take(handle), handle)
+
+    def detach(self, handle):
+        # Ownership moves to the caller, who must release it
+        self.take(handle)
+        tracker.remove(handle)
+        return handle
+
+    def give_back(self, kind, handle):
+        tracker.remove(handle)
+        getattr(self.obs, RELEASE_FUNCTIONS[kind])(handle)
+
+    def release_all(self):
+        # Newest first, a failing release must not keep the others alive or hide the original error
+        while self.handles:
+            kind, handle = self.handles.pop()
+            try:
+                self.give_back(kind, handle)
+            except Exception as error:
+                log.error("Could not release %s handle: %s", kind, error)
@@ -0,0 +1,118 @@
+# Phase profiler for a lineup update.
+# Times the phases of Hijack.begin and counts/times every obspython call made through an InstrumentedObs,
+# the report is written as JSON next to the lineup so runs can be compared across machines and events.
+
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Functions of the obspython module that are counted, constants and classes pass straight through
+INSTRUMENTED_PREFIXES = ("obs_", "source_list_", "sceneitem_list_", "timer_")
+REPORT_VERSION = 1
+
+
+class InstrumentedObs:
+    """Forwards to an obspython-like backend, recording each call in profiler."""
+
+    def __init__(self, backend, profiler):
+        self._backend = backend
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if not (callable(attr) and name.startswith(INSTRUMENTED_PREFIXES)):
+            return attr
+        record = self._profiler.record_call
+
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return attr(*args)
+            finally:
+                record(name, time.perf_counter() - start)
+
+        # Cached on the instance, later lookups skip __getattr__
+        setattr(self, name, timed)
+        return timed
+
+
+class Profiler:
+    def __init__(self):
+        self.started = time.time()
+        self.start = time.perf_counter()
+        # {phase: {"count", "wall_ms", "obs_calls", "obs_ms"}} in first run order
+        self.phases = {}
+        # {function name: [calls, seconds]}
+        self.calls = defaultdict(lambda: [0, 0.0])
+        self.obs_calls = 0
+        self.obs_seconds = 0.0
+        self.info = {}
+
+    def record_call(self, name, seconds):
+        entry = self.calls[name]
+        entry[0] += 1
+        entry[1] += seconds
+        self.obs_calls += 1
+        self.obs_seconds += seconds
+
+    @contextmanager
+    def phase(self, name):
+        # Repeated phases (one per scene type) accumulate, nested phases are also counted in their parent
+        calls_before = self.obs_calls
+        seconds_before = self.obs_seconds
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(
+                name,
+                time.perf_counter() - start,
+                self.obs_calls - calls_before,
+                self.obs_seconds - seconds_before
+            )
+
+    def add(self, name, seconds, obs_calls=0, obs_seconds=0.0):
+        phase = self.phases.setdefault(name, {"count": 0, "wall_ms": 0.0, "obs_calls": 0, "obs_ms": 0.0})
+        phase["count"] += 1
+        phase["wall_ms"] += seconds * 1000
+        phase["obs_calls"] += obs_calls
+        phase["obs_ms"] += obs_seconds * 1000
+
+    def to_dict(self):
+        # Only needed when a report is written
+        import platform
+
+        calls = sorted(self.calls.items(), key=lambda call: call[1][1], reverse=True)
+        return {
+            "version": REPORT_VERSION,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "machine": {
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+            },
+            **self.info,
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "phases": {
+                name: {key: round(value, 3) for key, value in phase.items()}
+                for name, phase in self.phases.items()
+            },
+            "obs_calls": {
+                name: {"count": count, "total_ms": round(seconds * 1000, 3)}
+                for name, (count, seconds) in calls
+            },
+        }
+
+    def summary(self):
+        lines = [f"Profile: {self.obs_calls} OBS calls, {self.obs_seconds * 1000:.1f} ms in OBS"]
+        for name, phase in self.phases.items():
+            lines.append(f"  {name}: {phase['wall_ms']:.1f} ms, {phase['obs_calls']} OBS calls")
+        return "\n".join(lines)
+
+    def write(self, path):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp_path, path)
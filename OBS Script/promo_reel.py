@@ -0,0 +1,115 @@
+# Gapless promo reel.
+# The promos are written to an ffmpeg concat list and played by one media source, so the whole reel
+# uses a single demuxer and hardware decoder instead of VLC reopening both for every clip.
+# The concat demuxer only joins clips sharing a codec and size, mismatches are found up front.
+
+import os
+from collections import Counter
+
+REEL_EXT = ".ffconcat"
+REEL_SUFFIX = "_promos" + REEL_EXT
+REEL_HEADER = "ffconcat version 1.0"
+# The concat demuxer refuses absolute paths unless its safe option is off
+REEL_FFMPEG_OPTIONS = "safe=0"
+
+
+def clip_format(info):
+    # (codec, width, height) of probed media, None when the probe found nothing usable
+    if not info or not info.get("codec") or not info.get("width") or not info.get("height"):
+        return None
+    return info["codec"], info["width"], info["height"]
+
+
+def format_name(clip):
+    codec, width, height = clip
+    return f"{codec} {width}x{height}"
+
+
+class ReelReport:
+    def __init__(self, clips, reel_format, problems):
+        # Clips that can be joined, in lineup order
+        self.clips = clips
+        # (codec, width, height) every clip of the reel shares
+        self.reel_format = reel_format
+        # {path: problem}
+        self.problems = problems
+
+    @property
+    def ok(self):
+        return not self.problems
+
+    def __str__(self) -> str:
+        if not self.reel_format:
+            return "Promo reel: no clip could be probed, no reel format"
+        header = f"Promo reel: {len(self.clips)} clips as {format_name(self.reel_format)}"
+        if self.ok:
+            return header
+        lines = [f"{header}, {len(self.problems)} incompatible"]
+        for path, problem in self.problems.items():
+            lines.append(f"  {path}: {problem}")
+        return "\n".join(lines)
+
+
+def check_reel(paths, probe):
+    # The reel takes the format most clips share, ties go to the earliest clip
+    formats = {path: clip_format(probe.probe(path)) for path in dict.fromkeys(paths)}
+    counts = Counter(clip for clip in formats.values() if clip)
+    if not counts:
+        return ReelReport([], None, {path: "could not be probed" for path in formats})
+    # most_common keeps first-seen order between equal counts
+    reel_format = counts.most_common(1)[0][0]
+    codec, width, height = reel_format
+
+    clips = []
+    problems = {}
+    for path in paths:
+        clip = formats[path]
+        if clip == reel_format:
+            clips.append(path)
+        elif clip is None:
+            problems[path] = "could not be probed"
+        elif clip[0] != codec:
+            problems[path] = f"{clip[0]} instead of {codec}"
+        else:
+            problems[path] = f"{clip[1]}x{clip[2]} instead of {width}x{height}"
+    return ReelReport(clips, reel_format, problems)
+
+
+def quote(path):
+    # Single quoted, a quote inside the path closes, escapes and reopens
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+def unquote(value):
+    # Only the outer quotes, a path may start or end with a quote of its own
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        value = value[1:-1]
+    return value.replace("'\\''", "'")
+
+
+def write_concat_list(list_path, paths, durations=None):
+    # durations ({path: seconds}) lets the demuxer place every clip without opening it first
+    lines = [REEL_HEADER]
+    for path in paths:
+        lines.append(f"file {quote(os.path.abspath(path))}")
+        if durations and durations.get(path):
+            lines.append(f"duration {durations[path]:.6f}")
+    text = "\n".join(lines) + "\n"
+    try:
+        with open(list_path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    temp_path = f"{list_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, list_path)
+    return True
+
+
+def read_concat_list(list_path):
+    # Clip paths of a reel written by write_concat_list
+    with open(list_path, "r", encoding="utf-8") as f:
+        return [unquote(line[len("file "):]) for line in f if line.startswith("file ")]
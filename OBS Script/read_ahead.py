@@ -0,0 +1,211 @@
+# Read-ahead of upcoming media.
+# Recordings live on network storage where the first seconds of a cold file stutter, the head of the
+# next scene's files is pulled into the OS page cache on a background thread while the current set plays.
+# A long set can outlive the cached pages, the next scene's files are warmed again every few minutes.
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from decoder_budget import scene_media_from_plan
+from obs_handles import HandleScope
+from promo_reel import REEL_EXT, read_concat_list
+
+READ_CHUNK = 1024 * 1024
+# Polling interval and give up time for the first frame after a scene change
+FIRST_FRAME_POLL_MS = 10
+FIRST_FRAME_TIMEOUT = 10.0
+# Warmed files are read again after this long, pages still cached cost no storage reads
+REWARM_INTERVAL_MS = 5 * 60 * 1000
+# Staleness is checked this many times per interval, a file is read again at most 1/10 interval late
+REWARM_CHECKS = 10
+
+log = logging.getLogger("shizu.read_ahead")
+
+
+def scene_files_from_plan(plan):
+    # {scene name: [media file paths]} in lineup order, same scenes as the decoder budget
+    scene_files = {}
+    for scene_name, source_names in scene_media_from_plan(plan).items():
+        paths = [plan.sources[name].settings.get("local_file") for name in source_names]
+        scene_files[scene_name] = [clip for path in paths if path for clip in reel_head(path)]
+    return scene_files
+
+
+def started_media_from_plan(plan):
+    # {scene name: [media source names]} restarted when the scene goes live, the recording or the promos.
+    # Looping visuals are left out, shared between scenes they may already be playing
+    return {
+        scene_name: [name for name in source_names if not plan.sources[name].settings.get("looping")]
+        for scene_name, source_names in scene_media_from_plan(plan).items()
+    }
+
+
+def reel_head(path):
+    # A promo reel starts with its first clip, the concat list itself is a few bytes
+    if not path.endswith(REEL_EXT):
+        return [path]
+    try:
+        return read_concat_list(path)[:1]
+    except OSError:
+        return []
+
+
+def warm_file(path, budget_bytes):
+    # Returns the number of bytes read into the page cache
+    read = 0
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            # Starts asynchronous read-ahead where supported, the reads below make sure it happened
+            os.posix_fadvise(f.fileno(), 0, budget_bytes, os.POSIX_FADV_WILLNEED)
+        while read < budget_bytes:
+            chunk = f.read(min(READ_CHUNK, budget_bytes - read))
+            if not chunk:
+                break
+            read += len(chunk)
+    return read
+
+
+class ReadAhead:
+    """Warms the next lineup scene's files on every program scene change and times the first frame.
+
+    scene_media lists the media restarted by each scene (see started_media_from_plan), the first
+    frame is the first one of those.
+
+    While a scene stays on program the next one is warmed again every rewarm_ms, each time reading
+    at most budget_bytes per file. A single worker keeps the reads sequential, competing with the
+    playing set for bandwidth is worse than warming late.
+    """
+
+    def __init__(self, obs, scene_media, scene_files, budget_bytes, rewarm_ms=REWARM_INTERVAL_MS):
+        self.obs = obs
+        self.scene_order = list(scene_files)
+        self.scene_media = scene_media
+        self.scene_files = scene_files
+        self.budget_bytes = budget_bytes
+        self.rewarm_interval = rewarm_ms / 1000
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="read_ahead")
+        self.pending = None
+        self.current_scene = None
+        # {path: time.monotonic() of the last warm}
+        self.warmed = {}
+        self.bytes_read = 0
+        self.running = False
+        self.rewarm_callback = self.rewarm
+        # First frame timing of the scene that was just switched to
+        self.switch_scene = None
+        self.switch_time = None
+        # {source name: media time at the switch}, sources not restarted yet are still in it
+        self.start_times = {}
+        self.poll_callback = self.poll_first_frame
+        # {scene name: (milliseconds to first frame or None on timeout, files were warmed)}
+        self.first_frames = {}
+
+    def next_scene(self, scene_name):
+        if scene_name not in self.scene_files:
+            # Outside the lineup, the show starts with the first scene
+            return self.scene_order[0] if self.scene_order else None
+        index = self.scene_order.index(scene_name)
+        return self.scene_order[index + 1] if index + 1 < len(self.scene_order) else None
+
+    def start(self):
+        self.refresh()
+        if self.rewarm_interval > 0:
+            self.running = True
+            self.obs.timer_add(self.rewarm_callback, max(1, round(self.rewarm_interval * 1000 / REWARM_CHECKS)))
+
+    def stale(self, path):
+        warmed = self.warmed.get(path)
+        return warmed is None or (self.rewarm_interval > 0 and time.monotonic() - warmed >= self.rewarm_interval)
+
+    def warm(self, scene_name):
+        paths = [path for path in self.scene_files.get(scene_name, []) if self.stale(path)]
+        if not paths:
+            return
+        # A newer scene change wins, files of a skipped scene are not worth the bandwidth
+        if self.pending:
+            self.pending.cancel()
+        self.pending = self.pool.submit(self.warm_paths, paths)
+
+    def warm_paths(self, paths):
+        for path in paths:
+            try:
+                self.bytes_read += warm_file(path, self.budget_bytes)
+            except OSError as error:
+                log.warning("Read-ahead of %s failed: %s", path, error)
+                continue
+            self.warmed[path] = time.monotonic()
+
+    def rewarm(self):
+        # Timer, the next scene of a long set may have left the page cache since it was warmed
+        if self.pending and not self.pending.done():
+            return
+        next_scene = self.next_scene(self.current_scene)
+        if next_scene:
+            self.warm(next_scene)
+
+    def refresh(self):
+        with HandleScope(self.obs) as scope:
+            name = self.obs.obs_source_get_name(scope.source(self.obs.obs_frontend_get_current_scene()))
+        if name == self.current_scene and name is not None:
+            return
+        self.current_scene = name
+        self.start_first_frame_timer(name)
+        next_scene = self.next_scene(name)
+        if next_scene:
+            self.warm(next_scene)
+
+    def start_first_frame_timer(self, scene_name):
+        self.stop_first_frame_timer()
+        if not self.scene_media.get(scene_name):
+            return
+        self.switch_scene = scene_name
+        self.switch_time = time.perf_counter()
+        with HandleScope(self.obs) as scope:
+            for name in self.scene_media[scene_name]:
+                source = scope.source(self.obs.obs_get_source_by_name(name))
+                if source is not None:
+                    self.start_times[name] = self.obs.obs_source_media_get_time(source)
+        self.obs.timer_add(self.poll_callback, FIRST_FRAME_POLL_MS)
+
+    def stop_first_frame_timer(self):
+        if self.switch_scene:
+            self.obs.timer_remove(self.poll_callback)
+            self.switch_scene = None
+            self.start_times = {}
+
+    def poll_first_frame(self):
+        # Media time moves past 0 once the first frame of the restarted media is decoded.
+        # A source that had played before counts once its time went back below where it was at the switch
+        elapsed = time.perf_counter() - self.switch_time
+        playing = False
+        with HandleScope(self.obs) as scope:
+            for name in self.scene_media[self.switch_scene]:
+                source = scope.source(self.obs.obs_get_source_by_name(name))
+                if source is None:
+                    continue
+                media_time = self.obs.obs_source_media_get_time(source)
+                start_time = self.start_times.get(name, 0)
+                if start_time > 0:
+                    if media_time < start_time:
+                        self.start_times[name] = 0
+                    continue
+                if media_time > 0:
+                    playing = True
+        if not playing and elapsed < FIRST_FRAME_TIMEOUT:
+            return
+        warmed = all(path in self.warmed for path in self.scene_files[self.switch_scene])
+        self.first_frames[self.switch_scene] = (round(elapsed * 1000) if playing else None, warmed)
+        if playing:
+            log.info("First frame of %s after %.0f ms%s", self.switch_scene, elapsed * 1000, " (warmed)" if warmed else "")
+        else:
+            log.warning("No frame from %s within %.0f s", self.switch_scene, FIRST_FRAME_TIMEOUT)
+        self.stop_first_frame_timer()
+
+    def close(self):
+        self.stop_first_frame_timer()
+        if self.running:
+            self.running = False
+            self.obs.timer_remove(self.rewarm_callback)
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,388 @@
+# Incremental re-apply of a generated lineup.
+# The desired scenes are built in memory first (see scene_collection.SceneCollectionBackend),
+# then diffed against what the script previously generated in OBS so only changes are applied.
+# Sources that did not change are never touched and keep their decoders and buffered media.
+
+import json
+import time
+from collections import Counter
+
+from obs_handles import HandleScope
+
+# Private settings markers, persisted with the scene collection
+OWNER_KEY = "shizu_generated"
+TRANSFORM_KEY = "shizu_transform"
+
+
+def item_transform(item):
+    # Serialized transform of a planned scene item, compared against the last applied one
+    return json.dumps({"pos": item.pos, "scale": item.scale, "align": item.alignment})
+
+
+def live_source_size(obs):
+    # Size lookup for planning, reuses frames already decoded by an existing source of the same media
+    def lookup(name, settings):
+        with HandleScope(obs) as scope:
+            source = scope.source(obs.obs_get_source_by_name(name))
+            if source is None:
+                return None
+            live_settings = scope.data(obs.obs_source_get_settings(source))
+            same_media = json.loads(obs.obs_data_get_json(live_settings)).get("local_file") == settings.get("local_file")
+            width = obs.obs_source_get_width(source)
+            height = obs.obs_source_get_height(source)
+        if same_media and width and height:
+            return width, height
+        return None
+    return lookup
+
+
+class LineupReconciler:
+    """Applies a planned scene graph to OBS, creating, updating, restacking and removing only what changed.
+
+    Scenes the plan only references (placeholder scenes such as an existing overlay) are left untouched.
+    Protected scenes (the program scene and the scenes nested in it) and their sources are not changed,
+    differences are counted as deferred instead.
+    """
+
+    def __init__(self, obs, plan, protected_scenes=()):
+        self.obs = obs
+        self.plan = plan
+        self.protected_scenes = set(protected_scenes)
+        self.protected_sources = set()
+        self.owned_scenes = set()
+        self.owned_sources = set()
+        self.stats = Counter()
+        # Names created by this apply, removed again on rollback
+        self.created = []
+        # References to the sources created by this apply. Nothing else holds a new source until a
+        # scene item does, libobs would destroy it on release, so they are kept until the items are added
+        self.held = []
+        self.steps_done = 0
+        self.scenes_done = 0
+
+    def apply(self):
+        for _ in self.steps():
+            pass
+        return self.stats
+
+    def steps(self):
+        # Yields after every unit of work so callers can spread the apply over several ticks
+        try:
+            self.snapshot()
+            yield
+            for source in self.plan.sources.values():
+                self.ensure_source(source)
+                yield
+            planned_scenes = self.planned_scenes()
+            # All scenes must exist before items are added, scenes nest into each other
+            for scene in planned_scenes:
+                self.ensure_scene(scene)
+                yield
+            for scene in planned_scenes:
+                self.reconcile_items(scene)
+                self.scenes_done += 1
+                yield
+        finally:
+            # Also when the apply fails or the generator is closed on cancel
+            self.release_held()
+        self.remove_stale()
+        yield
+
+    def release_held(self):
+        # Created sources now referenced by their scene items, unused ones are destroyed by libobs
+        held, self.held = self.held, []
+        for source in held:
+            self.obs.obs_source_release(source)
+
+    def rollback(self):
+        # Undo the creations of a cancelled or failed apply, updates to existing sources are kept
+        self.release_held()
+        for name in reversed(self.created):
+            self.remove_source(name)
+        self.stats["rolled_back"] = len(self.created)
+        self.created = []
+
+    def total_steps(self):
+        return 2 + len(self.plan.sources) + 2 * len(self.planned_scenes())
+
+    def planned_scenes(self):
+        return [
+            scene for name, scene in self.plan.scenes.items()
+            if name not in self.plan.placeholder_scenes
+        ]
+
+    def is_owned(self, source):
+        with HandleScope(self.obs) as scope:
+            private_settings = scope.data(self.obs.obs_source_get_private_settings(source))
+            return self.obs.obs_data_get_bool(private_settings, OWNER_KEY)
+
+    def mark_owned(self, source):
+        with HandleScope(self.obs) as scope:
+            private_settings = scope.data(self.obs.obs_source_get_private_settings(source))
+            self.obs.obs_data_set_bool(private_settings, OWNER_KEY, True)
+
+    def remove_source(self, name):
+        # Removes a scene or source by name, returns False if it no longer exists
+        with HandleScope(self.obs) as scope:
+            source = scope.source(self.obs.obs_get_source_by_name(name))
+            if source is None:
+                return False
+            self.obs.obs_source_remove(source)
+            return True
+
+    def snapshot(self):
+        # Names of every scene and source generated by a previous run
+        with HandleScope(self.obs) as scope:
+            scenes = scope.source_list(self.obs.obs_frontend_get_scenes())
+            for source in scenes:
+                if self.is_owned(source):
+                    self.owned_scenes.add(self.obs.obs_source_get_name(source))
+
+            sources = scope.source_list(self.obs.obs_enum_sources())
+            for source in sources:
+                if self.is_owned(source):
+                    self.owned_sources.add(self.obs.obs_source_get_name(source))
+        self.protect_nested()
+
+    def protect_nested(self):
+        # Everything rendered by a protected scene is protected, including nested scenes and their sources
+        pending = list(self.protected_scenes)
+        while pending:
+            with HandleScope(self.obs) as scope:
+                scene = scope.scene(self.obs.obs_get_scene_by_name(pending.pop()))
+                if scene is None:
+                    continue
+                for item in scope.item_list(self.obs.obs_scene_enum_items(scene)):
+                    source = self.obs.obs_sceneitem_get_source(item)
+                    name = self.obs.obs_source_get_name(source)
+                    if self.obs.obs_source_get_id(source) != "scene":
+                        self.protected_sources.add(name)
+                    elif name not in self.protected_scenes:
+                        self.protected_scenes.add(name)
+                        pending.append(name)
+
+    def ensure_source(self, planned):
+        with HandleScope(self.obs) as scope:
+            source = scope.source(self.obs.obs_get_source_by_name(planned.name))
+            if source is not None and planned.name in self.protected_sources:
+                self.defer_source(source, planned)
+                return
+            if source is not None and self.obs.obs_source_get_id(source) != planned.id:
+                if planned.name not in self.owned_sources:
+                    raise Exception(f"Source {planned.name} already exists and was not generated by this script")
+                # Type changed (e.g. image to video), replace it
+                self.obs.obs_source_remove(source)
+                scope.release(source)
+                self.stats["sources_removed"] += 1
+                source = None
+
+            if source is None:
+                settings = scope.data(self.obs.obs_data_create_from_json(json.dumps(planned.settings)))
+                source = self.obs.obs_source_create(planned.id, planned.name, settings, None)
+                self.held.append(source)
+                self.mark_owned(source)
+                self.created.append(planned.name)
+                self.stats["sources_created"] += 1
+            else:
+                current_settings = scope.data(self.obs.obs_source_get_settings(source))
+                live_settings = json.loads(self.obs.obs_data_get_json(current_settings))
+                if any(live_settings.get(key) != value for key, value in planned.settings.items()):
+                    settings = scope.data(self.obs.obs_data_create_from_json(json.dumps(planned.settings)))
+                    self.obs.obs_source_update(source, settings)
+                    self.stats["sources_updated"] += 1
+                else:
+                    self.stats["sources_unchanged"] += 1
+                if planned.name not in self.owned_sources:
+                    # Generated before ownership was tracked, adopt it
+                    self.mark_owned(source)
+
+            if self.obs.obs_source_get_volume(source) != planned.volume:
+                self.obs.obs_source_set_volume(source, planned.volume)
+            self.owned_sources.add(planned.name)
+
+    def defer_source(self, source, planned):
+        # On program, only note whether the plan wants it changed
+        self.owned_sources.add(planned.name)
+        if self.obs.obs_source_get_id(source) != planned.id:
+            self.stats["sources_deferred"] += 1
+            return
+        with HandleScope(self.obs) as scope:
+            current_settings = scope.data(self.obs.obs_source_get_settings(source))
+            live_settings = json.loads(self.obs.obs_data_get_json(current_settings))
+        if any(live_settings.get(key) != value for key, value in planned.settings.items()):
+            self.stats["sources_deferred"] += 1
+        else:
+            self.stats["sources_unchanged"] += 1
+
+    def ensure_scene(self, planned):
+        with HandleScope(self.obs) as scope:
+            source = scope.source(self.obs.obs_get_source_by_name(planned.name))
+            if source is None:
+                scene = scope.scene(self.obs.obs_scene_create(planned.name))
+                self.mark_owned(self.obs.obs_scene_get_source(scene))
+                self.created.append(planned.name)
+                self.stats["scenes_created"] += 1
+            else:
+                if self.obs.obs_source_get_id(source) != "scene":
+                    raise Exception(f"Scene {planned.name} clashes with an existing source of the same name")
+                if planned.name not in self.owned_scenes:
+                    self.mark_owned(source)
+                self.stats["scenes_unchanged"] += 1
+        self.owned_scenes.add(planned.name)
+
+    def reconcile_items(self, planned):
+        if planned.name in self.protected_scenes:
+            if self.items_differ(planned):
+                self.stats["scenes_deferred"] += 1
+            return
+        with HandleScope(self.obs) as scope:
+            scene = scope.scene(self.obs.obs_get_scene_by_name(planned.name))
+            wanted = [item.source.name for item in planned.items]
+
+            # Keep the first live item per wanted source, drop everything else
+            live_items = {}
+            live_order = []
+            items = scope.item_list(self.obs.obs_scene_enum_items(scene))
+            for item in items:
+                name = self.obs.obs_source_get_name(self.obs.obs_sceneitem_get_source(item))
+                if name in wanted and name not in live_items:
+                    live_items[name] = item
+                    live_order.append(name)
+                else:
+                    self.obs.obs_sceneitem_remove(item)
+                    self.stats["items_removed"] += 1
+
+            ordered = []
+            for planned_item in planned.items:
+                name = planned_item.source.name
+                item = live_items.get(name)
+                if item is None:
+                    source = scope.source(self.obs.obs_get_source_by_name(name))
+                    if source is None:
+                        # Placeholder scene the user has not created
+                        self.stats["items_missing"] += 1
+                        continue
+                    item = self.obs.obs_scene_add(scene, source)
+                    scope.release(source)
+                    live_order.append(name)
+                    self.stats["items_added"] += 1
+                self.apply_transform(item, planned_item)
+                ordered.append(item)
+
+            # New items land on top, restack only when the order differs
+            if live_order != [name for name in wanted if name in live_order]:
+                for position, item in enumerate(ordered):
+                    self.obs.obs_sceneitem_set_order_position(item, position)
+                self.stats["scenes_restacked"] += 1
+
+    def items_differ(self, planned):
+        # Item order or transforms of a live scene differ from the plan
+        with HandleScope(self.obs) as scope:
+            scene = scope.scene(self.obs.obs_get_scene_by_name(planned.name))
+            items = scope.item_list(self.obs.obs_scene_enum_items(scene))
+            live = []
+            for item in items:
+                name = self.obs.obs_source_get_name(self.obs.obs_sceneitem_get_source(item))
+                private_settings = scope.data(self.obs.obs_sceneitem_get_private_settings(item))
+                live.append((name, self.obs.obs_data_get_string(private_settings, TRANSFORM_KEY)))
+        return live != [(item.source.name, item_transform(item)) for item in planned.items]
+
+    def apply_transform(self, item, planned_item):
+        # Only push transforms the plan changed since the last run, manual adjustments stay put
+        transform = item_transform(planned_item)
+        with HandleScope(self.obs) as scope:
+            private_settings = scope.data(self.obs.obs_sceneitem_get_private_settings(item))
+            if self.obs.obs_data_get_string(private_settings, TRANSFORM_KEY) == transform:
+                return
+            pos = self.obs.vec2()
+            pos.x, pos.y = planned_item.pos
+            scale = self.obs.vec2()
+            scale.x, scale.y = planned_item.scale
+            self.obs.obs_sceneitem_set_pos(item, pos)
+            self.obs.obs_sceneitem_set_scale(item, scale)
+            self.obs.obs_sceneitem_set_alignment(item, planned_item.alignment)
+            self.obs.obs_data_set_string(private_settings, TRANSFORM_KEY, transform)
+
+    def remove_stale(self):
+        # Generated by an earlier run but no longer part of the lineup
+        planned_scene_names = {scene.name for scene in self.planned_scenes()}
+        stale_scenes = [name for name in self.owned_scenes if name not in planned_scene_names]
+        stale_sources = [name for name in self.owned_sources if name not in self.plan.sources]
+        for name in stale_scenes + stale_sources:
+            if name in self.protected_scenes or name in self.protected_sources:
+                self.stats["scenes_deferred" if name in stale_scenes else "sources_deferred"] += 1
+                continue
+            if self.remove_source(name):
+                self.stats["scenes_removed" if name in stale_scenes else "sources_removed"] += 1
+
+
+class ReconcileJob:
+    """Drives a LineupReconciler from an OBS timer, spending at most budget_ms per tick (one step at least).
+
+    Sources created on one tick are held by the reconciler until a later tick adds their items,
+    and released once the job finishes, whatever the outcome.
+    on_progress(job) is called after every tick, on_done(job, error) once the
+    apply finished, failed or was cancelled.
+    """
+
+    def __init__(self, reconciler, budget_ms, interval_ms=10, on_progress=None, on_done=None):
+        self.reconciler = reconciler
+        self.budget = budget_ms / 1000
+        self.interval_ms = interval_ms
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.steps = reconciler.steps()
+        self.total_steps = reconciler.total_steps()
+        self.total_scenes = len(reconciler.planned_scenes())
+        self.running = False
+        self.state = "Pending"
+        # timer_remove matches on the callable, keep one bound method around
+        self.tick_callback = self.tick
+
+    def start(self):
+        self.running = True
+        self.state = "Running"
+        self.reconciler.obs.timer_add(self.tick_callback, self.interval_ms)
+
+    def tick(self):
+        if not self.running:
+            return
+        deadline = time.perf_counter() + self.budget
+        try:
+            while True:
+                next(self.steps)
+                self.reconciler.steps_done += 1
+                if time.perf_counter() >= deadline:
+                    break
+        except StopIteration:
+            self.finish("Done")
+            return
+        except Exception as error:
+            self.reconciler.rollback()
+            self.finish("Failed", error)
+            return
+        if self.on_progress:
+            self.on_progress(self)
+
+    def cancel(self):
+        if not self.running:
+            return
+        self.steps.close()
+        self.reconciler.rollback()
+        self.finish("Cancelled")
+
+    def finish(self, state, error=None):
+        self.running = False
+        self.state = state
+        self.reconciler.release_held()
+        self.reconciler.obs.timer_remove(self.tick_callback)
+        if self.on_progress:
+            self.on_progress(self)
+        if self.on_done:
+            self.on_done(self, error)
+
+    def progress_text(self):
+        return (
+            f"{self.state}: {self.reconciler.scenes_done}/{self.total_scenes} scenes "
+            f"({self.reconciler.steps_done}/{self.total_steps} steps)"
+        )
@@ -0,0 +1,169 @@
+# Offline scene collection compiler.
+# Runs the hijack script against an in-memory backend and writes the result as an
+# OBS scene collection JSON (Scene Collection > Import), no OBS instance required.
+
+import json
+from pathlib import Path
+
+from fake_obs import FakeObs
+from reconcile import OWNER_KEY, TRANSFORM_KEY, item_transform
+
+# Audio tracks 1-6 enabled, OBS default for new sources
+ALL_MIXERS = 0x3F
+
+
+class SceneCollectionBackend(FakeObs):
+    """Records the scene graph built by the script and serializes it as a scene collection.
+
+    Scenes the script expects to already exist (overlay/ending without a theme)
+    are created empty so the collection stays loadable and can be filled in later.
+    """
+
+    def __init__(self, render_width=1920, render_height=1080, size_lookup=None):
+        super().__init__(render_width, render_height, size_lookup=size_lookup)
+        self.placeholder_scenes = []
+        # Plugin settings saved with the collection, e.g. Advanced Scene Switcher macros
+        self.modules = {}
+
+    def obs_get_scene_by_name(self, name):
+        if name not in self.scenes:
+            scene = self.obs_scene_create(name)
+            # Owned by the collection, the lookup adds the script's reference
+            scene.refs = 0
+            self.placeholder_scenes.append(name)
+        return super().obs_get_scene_by_name(name)
+
+    def source_entry(self, source):
+        return {
+            "id": source.id,
+            "versioned_id": source.id,
+            "name": source.name,
+            "settings": source.settings,
+            "volume": source.volume,
+            "balance": 0.5,
+            "mixers": 0 if source.id == "scene" else ALL_MIXERS,
+            "enabled": True,
+            "muted": False,
+            "sync": 0,
+            "flags": 0,
+            "monitoring_type": 0,
+            "hotkeys": {},
+            "filters": [],
+            # Marks the source as generated so a later live re-apply can reconcile it
+            "private_settings": {} if source.name in self.placeholder_scenes else {OWNER_KEY: True},
+        }
+
+    def item_entry(self, item, item_id):
+        return {
+            "name": item.source.name,
+            "id": item_id,
+            "visible": True,
+            "locked": False,
+            "rot": 0.0,
+            "pos": {"x": item.pos[0], "y": item.pos[1]},
+            "scale": {"x": item.scale[0], "y": item.scale[1]},
+            "align": item.alignment,
+            "bounds_type": 0,
+            "bounds_align": 0,
+            "bounds": {"x": 0.0, "y": 0.0},
+            "crop_left": 0,
+            "crop_top": 0,
+            "crop_right": 0,
+            "crop_bottom": 0,
+            "scale_filter": "disable",
+            "blend_method": "default",
+            "blend_type": "normal",
+            "group_item_backup": False,
+            "show_transition": {"duration": 0},
+            "hide_transition": {"duration": 0},
+            "private_settings": {TRANSFORM_KEY: item_transform(item)},
+        }
+
+    def scene_entry(self, scene):
+        entry = self.source_entry(scene.source)
+        # Items are stored bottom to top, the order obs_scene_add stacked them
+        items = [self.item_entry(item, index + 1) for index, item in enumerate(scene.items)]
+        entry["settings"] = {
+            "items": items,
+            "id_counter": len(items),
+            "custom_size": False,
+        }
+        return entry
+
+    def to_collection(self, name, current_scene=None):
+        scene_names = list(self.scenes)
+        if current_scene is None and scene_names:
+            current_scene = scene_names[0]
+        sources = [self.scene_entry(scene) for scene in self.scenes.values()]
+        sources += [self.source_entry(source) for source in self.sources.values()]
+        return {
+            "name": name,
+            "current_scene": current_scene,
+            "current_program_scene": current_scene,
+            "scene_order": [{"name": scene_name} for scene_name in scene_names],
+            "sources": sources,
+            "groups": [],
+            "transitions": [],
+            "quick_transitions": [],
+            "current_transition": "Fade",
+            "transition_duration": 300,
+            "saved_projectors": [],
+            "preview_locked": False,
+            "scaling_enabled": False,
+            "modules": self.modules,
+        }
+
+    def write(self, path, name, current_scene=None):
+        # Single bulk write of the whole collection
+        with open(path, "w") as f:
+            json.dump(self.to_collection(name, current_scene), f, indent=4)
+
+
+def main():
+    import argparse
+
+    import shizu_obs_hijack_script as hijack_script
+
+    parser = argparse.ArgumentParser(description="Compile an exported event into an OBS scene collection")
+    parser.add_argument("lineup_path", help="Exported event JSON")
+    parser.add_argument("--stage", default="", help="Only generate this stage of a multi-stage export")
+    parser.add_argument("--day", default="", help="Only generate this day of a multi-day export")
+    parser.add_argument("--host-paths", action="store_true", help="Translate docker paths using the .env file")
+    parser.add_argument("--macros", action="store_true", help="Also write the Advanced Scene Switcher macros")
+    parser.add_argument("--ass-settings", help="Advanced Scene Switcher settings export to merge the macros into")
+    parser.add_argument(
+        "--check-media",
+        choices=[hijack_script.MISSING_MEDIA_WARN, hijack_script.MISSING_MEDIA_ABORT, hijack_script.MISSING_MEDIA_SKIP],
+        help="Check every media file first, then warn, abort or skip scenes with missing media"
+    )
+    parser.add_argument(
+        "--promo-reel", action="store_true", help="Play the promos as one gapless reel instead of a VLC playlist"
+    )
+    parser.add_argument("--nodes", type=int, default=1, help="Split the DJs across this many OBS nodes, one collection each")
+    parser.add_argument(
+        "--shard-by", choices=[hijack_script.SHARD_BY_LOAD, hijack_script.SHARD_BY_ZONE], default=hijack_script.SHARD_BY_LOAD
+    )
+    args = parser.parse_args()
+
+    for node in range(1, args.nodes + 1):
+        hijack = hijack_script.Hijack()
+        hijack.lineup_path = str(Path(args.lineup_path).absolute())
+        hijack.lineup_stage = args.stage
+        hijack.lineup_day = args.day
+        hijack.host_paths = args.host_paths
+        hijack.generate_macros = args.macros
+        hijack.ass_settings_path = args.ass_settings
+        if args.check_media:
+            hijack.check_media = True
+            hijack.missing_media = args.check_media
+        if args.promo_reel:
+            hijack.promo_mode = hijack_script.PROMO_REEL
+        hijack.shard_nodes = args.nodes
+        hijack.shard_node = node
+        hijack.shard_by = args.shard_by
+        hijack.output_mode = hijack_script.OUTPUT_COLLECTION
+        hijack.begin()
+
+
+if __name__ == "__main__":
+    main()
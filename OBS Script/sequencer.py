@@ -0,0 +1,133 @@
+# Built-in show sequencer.
+# Each recording and the promo playlist signal media_ended when they finish, the sequencer then switches
+# program to the next scene of the lineup: DJs in order, the promos, then the ending scene. Nothing is
+# polled, live sets are handed off manually or after a fixed set length.
+
+import logging
+
+from obs_handles import HandleScope
+
+MEDIA_ENDED_SIGNAL = "media_ended"
+
+log = logging.getLogger("shizu.sequencer")
+
+
+class SequenceStep:
+    __slots__ = ("scene", "media_source", "live")
+
+    def __init__(self, scene, media_source=None, live=False):
+        self.scene = scene
+        # Source whose end moves the show on, None for live sets and the ending scene
+        self.media_source = media_source
+        self.live = live
+
+    def __repr__(self):
+        return f"SequenceStep({self.scene!r}, {self.media_source!r}, live={self.live})"
+
+
+class Sequencer:
+    """Switches program along steps, in show order, when the media of the program scene ends.
+
+    A step only advances while its scene is on program, media ending in preview or in a scene
+    that was switched away from by hand does not move the show.
+    """
+
+    def __init__(self, obs, steps, live_minutes=0):
+        self.obs = obs
+        self.steps = steps
+        self.index = {step.scene: position for position, step in enumerate(steps)}
+        self.live_minutes = live_minutes
+        # (source name, callback) of every connected signal
+        self.connections = []
+        self.handoff_scene = None
+        self.handoff_callback = self.handoff
+        self.switches = 0
+
+    def start(self):
+        with HandleScope(self.obs) as scope:
+            for step in self.steps:
+                if not step.media_source:
+                    continue
+                source = scope.source(self.obs.obs_get_source_by_name(step.media_source))
+                if source is None:
+                    log.warning("Sequencer: %s not found, %s will need a manual switch", step.media_source, step.scene)
+                    continue
+                callback = self.media_callback(step.scene)
+                self.obs.signal_handler_connect(
+                    self.obs.obs_source_get_signal_handler(source), MEDIA_ENDED_SIGNAL, callback
+                )
+                self.connections.append((step.media_source, callback))
+        log.info("Sequencer: following %d scenes, %d switch on media end", len(self.steps), len(self.connections))
+        self.refresh()
+
+    def media_callback(self, scene):
+        # One callback per step so the handler knows which scene's media ended
+        def media_ended(calldata):
+            self.media_ended(scene)
+        return media_ended
+
+    def stop(self):
+        self.cancel_handoff()
+        with HandleScope(self.obs) as scope:
+            for source_name, callback in self.connections:
+                # Sources removed by a later update took their connections with them
+                source = scope.source(self.obs.obs_get_source_by_name(source_name))
+                if source is not None:
+                    self.obs.signal_handler_disconnect(
+                        self.obs.obs_source_get_signal_handler(source), MEDIA_ENDED_SIGNAL, callback
+                    )
+        self.connections = []
+
+    def program_scene(self):
+        with HandleScope(self.obs) as scope:
+            return self.obs.obs_source_get_name(scope.source(self.obs.obs_frontend_get_current_scene()))
+
+    def next_scene(self, scene):
+        position = self.index.get(scene)
+        if position is None or position + 1 >= len(self.steps):
+            return None
+        return self.steps[position + 1].scene
+
+    def media_ended(self, scene):
+        if self.program_scene() != scene:
+            log.debug("Sequencer: media of %s ended off program, ignored", scene)
+            return
+        self.advance(scene, "ended")
+
+    def advance(self, scene, reason):
+        target = self.next_scene(scene)
+        if target is None:
+            return
+        with HandleScope(self.obs) as scope:
+            source = scope.source(self.obs.obs_get_source_by_name(target))
+            if source is None:
+                log.warning("Sequencer: %s %s but scene %s does not exist", scene, reason, target)
+                return
+            log.info("Sequencer: %s %s, switching to %s", scene, reason, target)
+            self.switches += 1
+            self.obs.obs_frontend_set_current_scene(source)
+
+    def refresh(self):
+        # Called on every program scene change, (re)arms the hand-off of a live set
+        scene = self.program_scene()
+        if scene == self.handoff_scene:
+            return
+        self.cancel_handoff()
+        position = self.index.get(scene)
+        if position is None or not self.steps[position].live or self.live_minutes <= 0:
+            return
+        self.handoff_scene = scene
+        self.obs.timer_add(self.handoff_callback, self.live_minutes * 60 * 1000)
+        log.info("Sequencer: %s is live, handing off in %d minutes", scene, self.live_minutes)
+
+    def handoff(self):
+        # One-shot, OBS timers repeat until removed
+        scene = self.handoff_scene
+        self.cancel_handoff()
+        if self.program_scene() == scene:
+            self.advance(scene, "set time is up")
+
+    def cancel_handoff(self):
+        if self.handoff_scene is not None:
+            self.obs.timer_remove(self.handoff_callback)
+            self.handoff_scene = None
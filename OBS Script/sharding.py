@@ -0,0 +1,327 @@
+# One event split across several OBS nodes.
+# Big events run more sets than one encoding box can decode, each node then only builds its share of the
+# DJs: grouped by the RTMP zone their stream comes in on, or split by predicted decoding load. Every node
+# computes the same split from the same export, and hands the show over to the next node at its boundaries.
+
+import json
+import logging
+import re
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from lineup_model import DJ_KEY, PROMO_KEY, THEME_KEY, Lineup, LineupTheme, load_lineup
+
+SHARD_BY_LOAD = "load"
+SHARD_BY_ZONE = "zone"
+# Generated files of a node are tagged with it, e.g. event_node-2_collection.json
+NODE_TAG = "_node-%d"
+SHARDS_SUFFIX = "_shards.json"
+
+# Predicted load of a set, in 1080p video decoders.
+# A live stream's size is unknown until it connects, VLC also buffers it ahead.
+LIVE_LOAD = 1.5
+# Recording playing under separate visuals, the export's resolution is the visuals'
+AUDIO_LOAD = 0.1
+REFERENCE_PIXELS = 1920 * 1080
+MIN_VIDEO_LOAD = 0.25
+
+log = logging.getLogger("shizu.sharding")
+
+
+def dj_load(dj):
+    if dj.url:
+        return LIVE_LOAD
+    video = 1.0
+    if dj.resolution:
+        video = max(dj.resolution[0] * dj.resolution[1] / REFERENCE_PIXELS, MIN_VIDEO_LOAD)
+    return video + (AUDIO_LOAD if dj.visuals_path else 0.0)
+
+
+def rtmp_pattern(rtmp_server):
+    # RTMP_SERVER of the backend's .env turned around, every %s becomes a group (zone, then key)
+    if not rtmp_server or "%s" not in rtmp_server:
+        return None
+    return re.compile("^" + "([^/]+)".join(re.escape(part) for part in rtmp_server.split("%s")) + "$")
+
+
+def parse_zones(value):
+    # RTMP_ZONES, {"zone-a": "Zone A", ...}. Unset or malformed means the export has no zones
+    try:
+        zones = json.loads(value) if value else {}
+    except ValueError:
+        log.warning("RTMP_ZONES is not valid JSON, zones are taken from the stream hosts")
+        return {}
+    return zones if isinstance(zones, dict) else {}
+
+
+def dj_zone(dj, pattern=None, zones=None):
+    # Zone a live DJ streams to, the stream host when RTMP_SERVER does not say
+    if not dj.url:
+        return None
+    match = pattern.match(dj.url) if pattern else None
+    if match and zones and match.lastindex >= 2:
+        return match.group(1)
+    return urlsplit(dj.url).hostname or dj.url
+
+
+def contiguous_split(loads, parts):
+    # [(start, end)] of `parts` runs of loads, in order, with the heaviest run as light as possible.
+    # Dynamic programming over run ends, lineups are tens to hundreds of DJs.
+    count = len(loads)
+    prefix = [0.0]
+    for load in loads:
+        prefix.append(prefix[-1] + load)
+    infinity = float("inf")
+    # best[k][i]: heaviest run of the first i loads split into k runs, cut[k][i]: start of the last run
+    best = [[infinity] * (count + 1) for _ in range(parts + 1)]
+    cut = [[0] * (count + 1) for _ in range(parts + 1)]
+    best[0][0] = 0.0
+    for k in range(1, parts + 1):
+        for i in range(k, count + 1):
+            for j in range(k - 1, i):
+                heaviest = max(best[k - 1][j], prefix[i] - prefix[j])
+                if heaviest < best[k][i]:
+                    best[k][i] = heaviest
+                    cut[k][i] = j
+    runs = []
+    end = count
+    for k in range(parts, 0, -1):
+        start = cut[k][end]
+        runs.append((start, end))
+        end = start
+    return runs[::-1]
+
+
+class Shard:
+    __slots__ = ("node", "positions", "load", "zones")
+
+    def __init__(self, node):
+        self.node = node
+        # Show positions of the node's DJs, in show order
+        self.positions = []
+        self.load = 0.0
+        self.zones = []
+
+    def add(self, position, load, zone=None):
+        self.positions.append(position)
+        self.load += load
+        if zone and zone not in self.zones:
+            self.zones.append(zone)
+
+
+class ShardPlan:
+    """DJs of one export assigned to nodes 1..N, built by plan_shards."""
+
+    def __init__(self, djs, shards, mode, zone_labels=None):
+        self.djs = djs
+        self.shards = shards
+        self.mode = mode
+        self.zone_labels = zone_labels or {}
+        # Node of every show position
+        self.owner = [0] * len(djs)
+        for shard in shards:
+            for position in shard.positions:
+                self.owner[position] = shard.node
+        for shard in shards:
+            shard.positions.sort()
+
+    def shard(self, node):
+        if not 1 <= node <= len(self.shards):
+            raise ValueError(f"Node {node} is not one of the {len(self.shards)} nodes")
+        return self.shards[node - 1]
+
+    def starts_show(self, node):
+        return bool(self.djs) and self.owner[0] == node
+
+    def ends_show(self, node):
+        return bool(self.djs) and self.owner[-1] == node
+
+    def handoffs(self, node):
+        # {index in the node's DJs: (next node, next DJ)}, where the show moves to another node
+        handoffs = {}
+        for index, position in enumerate(self.shard(node).positions):
+            following = position + 1
+            if following < len(self.djs) and self.owner[following] != node:
+                handoffs[index] = (self.owner[following], self.djs[following].name)
+        return handoffs
+
+    def node_lineup(self, node, lineup):
+        # The node's DJs; promos and the ending go with the end of the show, the starting scene with its start
+        node_lineup = Lineup(lineup.stage, lineup.day)
+        node_lineup.djs = [self.djs[position] for position in self.shard(node).positions]
+        if self.ends_show(node):
+            node_lineup.promos = list(lineup.promos)
+        if lineup.theme:
+            theme = LineupTheme(**{name: getattr(lineup.theme, name) for name in LineupTheme.FIELDS})
+            if not self.starts_show(node):
+                theme.starting = ""
+            if not self.ends_show(node):
+                theme.ending = ""
+            node_lineup.theme = theme
+        return node_lineup
+
+    def zone_name(self, zone):
+        return self.zone_labels.get(zone, zone)
+
+    def report(self):
+        return {
+            "mode": self.mode,
+            "nodes": [
+                {
+                    "node": shard.node,
+                    "load": round(shard.load, 2),
+                    "zones": [self.zone_name(zone) for zone in shard.zones],
+                    "djs": [self.djs[position].name for position in shard.positions],
+                    "live": sum(1 for position in shard.positions if self.djs[position].url),
+                    "starts_show": self.starts_show(shard.node),
+                    "ends_show": self.ends_show(shard.node),
+                    "handoffs": [
+                        {"after": self.djs[shard.positions[index]].name, "node": next_node, "dj": next_dj}
+                        for index, (next_node, next_dj) in self.handoffs(shard.node).items()
+                    ],
+                }
+                for shard in self.shards
+            ],
+        }
+
+    def __str__(self) -> str:
+        lines = [f"Sharded {len(self.djs)} DJs across {len(self.shards)} nodes by {self.mode}"]
+        for shard in self.shards:
+            zones = f", zones {', '.join(self.zone_name(zone) for zone in shard.zones)}" if shard.zones else ""
+            lines.append(
+                f"  node {shard.node}: {len(shard.positions)} DJs, load {shard.load:.2f}{zones}, "
+                f"{len(self.handoffs(shard.node))} hand-offs"
+            )
+        return "\n".join(lines)
+
+
+def plan_shards(djs, nodes, mode=SHARD_BY_LOAD, rtmp_server="", zones=None):
+    """Assigns every DJ to one of `nodes` nodes.
+
+    By load the show is cut into `nodes` consecutive runs with the heaviest run as light as possible,
+    so there is one hand-off per node boundary. By zone every live DJ goes to the node of its RTMP zone,
+    zones are spread over the nodes by load when there are more zones than nodes, and each run of
+    recordings between live sets goes to the least loaded node.
+    """
+    if nodes < 1:
+        raise ValueError("Sharding needs at least one node")
+    zones = zones or {}
+    loads = [dj_load(dj) for dj in djs]
+    shards = [Shard(node) for node in range(1, nodes + 1)]
+
+    if mode == SHARD_BY_ZONE:
+        pattern = rtmp_pattern(rtmp_server)
+        dj_zones = [dj_zone(dj, pattern, zones) for dj in djs]
+        if any(dj_zones):
+            assign_by_zone(shards, loads, dj_zones, list(zones))
+            return ShardPlan(djs, shards, mode, zones)
+        log.warning("No live DJs to group by zone, sharding by load")
+        mode = SHARD_BY_LOAD
+    elif mode != SHARD_BY_LOAD:
+        raise ValueError(f"Unknown sharding mode: {mode!r}")
+
+    for shard, (start, end) in zip(shards, contiguous_split(loads, min(nodes, len(djs)))):
+        for position in range(start, end):
+            shard.add(position, loads[position])
+    return ShardPlan(djs, shards, mode, zones)
+
+
+def assign_by_zone(shards, loads, dj_zones, zone_order):
+    # Zones in RTMP_ZONES order, then in order of appearance
+    zone_loads = {}
+    for zone in zone_order:
+        if zone in dj_zones:
+            zone_loads[zone] = 0.0
+    for zone, load in zip(dj_zones, loads):
+        if zone:
+            zone_loads[zone] = zone_loads.get(zone, 0.0) + load
+    zone_node = {}
+    if len(zone_loads) <= len(shards):
+        for shard, zone in zip(shards, zone_loads):
+            zone_node[zone] = shard
+    else:
+        # Heaviest zone first onto the least loaded node
+        totals = {shard.node: 0.0 for shard in shards}
+        for zone in sorted(zone_loads, key=lambda zone: -zone_loads[zone]):
+            node = min(totals, key=lambda node: (totals[node], node))
+            totals[node] += zone_loads[zone]
+            zone_node[zone] = shards[node - 1]
+    for position, zone in enumerate(dj_zones):
+        if zone:
+            zone_node[zone].add(position, loads[position], zone)
+
+    # Recordings between two live sets stay together, one hand-off at most each way
+    run = []
+    previous = None
+    for position, zone in enumerate(dj_zones + [None]):
+        if zone is None and position < len(dj_zones):
+            run.append(position)
+            continue
+        if run:
+            # Ties go to the node of the set before the run
+            target = min(shards, key=lambda shard: (shard.load, shard is not previous, shard.node))
+            for run_position in run:
+                target.add(run_position, loads[run_position])
+            run = []
+        if position < len(dj_zones):
+            previous = zone_node[zone]
+
+
+def lineup_entry(record):
+    entry = {}
+    for name in record.FIELDS:
+        value = getattr(record, name)
+        entry[name] = list(value) if isinstance(value, tuple) else value
+    return entry
+
+
+def write_node_lineups(plan, lineup, lineup_path):
+    # <event>_node-<n>.json per node in the export format, each loads on its own like the full export
+    lineup_path = Path(lineup_path)
+    paths = []
+    for shard in plan.shards:
+        node_lineup = plan.node_lineup(shard.node, lineup)
+        data = {
+            DJ_KEY: [lineup_entry(dj) for dj in node_lineup.djs],
+            PROMO_KEY: [lineup_entry(promo) for promo in node_lineup.promos],
+            THEME_KEY: lineup_entry(node_lineup.theme) if node_lineup.theme else {},
+        }
+        path = lineup_path.with_name(lineup_path.stem + NODE_TAG % shard.node + ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        paths.append(path)
+    plan_path = lineup_path.with_name(lineup_path.stem + SHARDS_SUFFIX)
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump(plan.report(), f, indent=2)
+    return paths, plan_path
+
+
+def main():
+    import argparse
+
+    from shizu_obs_hijack_script import read_env_file
+
+    parser = argparse.ArgumentParser(description="Split an exported event into one lineup per OBS node")
+    parser.add_argument("lineup_path", help="Exported event JSON")
+    parser.add_argument("--nodes", type=int, required=True, help="Number of OBS nodes")
+    parser.add_argument("--by", choices=[SHARD_BY_LOAD, SHARD_BY_ZONE], default=SHARD_BY_LOAD)
+    parser.add_argument(
+        "--env", default=str(Path(__file__).absolute().parent.parent.joinpath(".env")),
+        help="Backend .env with RTMP_SERVER and RTMP_ZONES, for --by zone"
+    )
+    parser.add_argument("--stage", default="", help="Only split this stage of a multi-stage export")
+    parser.add_argument("--day", default="", help="Only split this day of a multi-day export")
+    args = parser.parse_args()
+
+    env = read_env_file(args.env)[0] if Path(args.env).is_file() else {}
+    lineup = load_lineup(args.lineup_path, args.stage or None, args.day or None)
+    plan = plan_shards(lineup.djs, args.nodes, args.by, env.get("RTMP_SERVER", ""), parse_zones(env.get("RTMP_ZONES")))
+    print(plan)
+    paths, plan_path = write_node_lineups(plan, lineup, args.lineup_path)
+    for path in paths:
+        print(f"Wrote {path}")
+    print(f"Wrote {plan_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,45 +2,215 @@
 # Provided as is, use at your own risk.
 # Contact linkcube @ Anison Hijack for assistance.
 
-import obspython as S
+import hashlib
 import json
+import logging
 import os
+import re
+import sys
+import time
+from contextlib import nullcontext
 from pathlib import Path
-from PIL import Image
 from copy import deepcopy
 
-# Export json properties
-DJ_KEY = "djs"
-PROMO_KEY = "promos"
-THEME_KEY = "theme"
+from decoder_budget import DecoderBudget, scene_media_from_plan
+from host_paths import PathTranslator, StatCache
+from image_cache import ImageCache
+from lineup_fetch import FetchWatcher, LineupFetcher
+from lineup_model import Lineup, load_lineup
+from lineup_watch import LineupWatcher
+from live_streams import LiveStreams, scene_streams_from_plan
+from media_probe import MediaProbe
+from obs_handles import HandleScope, tracker
+from preflight import drop_failed_media, run_preflight
+from promo_reel import REEL_FFMPEG_OPTIONS, REEL_SUFFIX, check_reel, write_concat_list
+from profiler import InstrumentedObs, Profiler
+from read_ahead import ReadAhead, scene_files_from_plan, started_media_from_plan
+from reconcile import LineupReconciler, ReconcileJob, live_source_size
+from scene_collection import SceneCollectionBackend
+from sequencer import SequenceStep, Sequencer
+from sharding import NODE_TAG, SHARD_BY_LOAD, SHARD_BY_ZONE, parse_zones, plan_shards
+from telemetry import ShowTelemetry
+from text_cards import TextCards
+
+try:
+    import obspython as S
+except ImportError:
+    # Running outside of OBS, a backend must be supplied through set_obs_backend
+    S = None
+
 ENV_FILE_NAME = ".env"
 ASS_DEFAULT_OBS = "advanced_scene_switcher_obs.json"
+# Generated macros are named MACRO_PREFIX + scene, a merge replaces every macro with the prefix
+MACRO_PREFIX = "switch_from_"
+# Key of the Advanced Scene Switcher settings in a scene collection
+ASS_MODULE = "advanced-scene-switcher"
+
+# Local caches, safe to delete
+CACHE_DIR = Path(__file__).absolute().parent.joinpath(".cache")
+PROBE_CACHE_FILE = "media_probe.json"
+IMAGE_CACHE_DIR = "images"
+CARD_CACHE_DIR = "cards"
+# Last good lineup fetched from the backend per event
+FETCHED_LINEUP_DIR = "lineups"
+
+# DJ name and VJ credit cards
+CARD_FONT_FACE = "Arial"
+CARD_FONT_SIZE = 200
 
 # Expected existing scenes if not supplying a theme
 OVERLAY_SCENE = "# - Overlay"
 STARTING_SCENE = "! - Starting"
 ENDING_SCENE = "! - Ending"
 PROMOS_SCENE = "Promotional Videos"
+# Where a node of a sharded event waits while another node has the show, one per hand-off
+HANDOFF_SCENE = "! - Handoff %d to node %d (%s)"
+
+# Output modes
+OUTPUT_LIVE = "live"
+OUTPUT_COLLECTION = "collection"
+
+# Watch mode polling, a change is applied once the file stopped changing for WATCH_SETTLE_MS
+WATCH_INTERVAL_MS = 1000
+WATCH_SETTLE_MS = 2000
+# Watch mode polling of the backend when the lineup is fetched
+FETCH_WATCH_INTERVAL_MS = 5000
+
+# Show telemetry report files, next to the lineup, one pair per show named after its start
+TELEMETRY_CSV_SUFFIX = "_telemetry_%s.csv"
+TELEMETRY_JSON_SUFFIX = "_telemetry_%s.json"
+
+# Handling of missing or unreadable media found by the pre-flight check
+MISSING_MEDIA_WARN = "warn"
+MISSING_MEDIA_ABORT = "abort"
+MISSING_MEDIA_SKIP = "skip"
+
+# Promo playback, a VLC playlist or one ffmpeg source playing a concat list
+PROMO_PLAYLIST = "playlist"
+PROMO_REEL = "reel"
 
 # OBS output
 RENDER_WIDTH = 1920
 RENDER_HEIGHT = 1080
 
+# Theme layout fields and the Hijack attribute each one sets
+THEME_LAYOUT = {
+    "video_width": "target_video_width",
+    "video_height": "target_video_height",
+    "video_offset_x": "video_offset_x",
+    "video_offset_y": "video_offset_y",
+    "chat_width": "chat_width",
+    "chat_height": "chat_height",
+    "chat_offset_x": "chat_offset_x",
+    "chat_offset_y": "chat_offset_y",
+}
+
 # Tailor to your use case
 CHAT_CSS = (
     "body {background-color: rgba(0,0,0,0);font-family: 'Comic Sans MS';" + 
     "margin: 0px auto;overflow: hidden;}.name {font-family: 'Comic Sans MS';}"
 )
 
-IMG_EXTS = [*Image.registered_extensions()]
+# Extensions OBS opens with image_source, a static table so loading the script does not import PIL
+IMG_EXTS = frozenset({".bmp", ".tga", ".png", ".jpeg", ".jpg", ".jxr", ".gif", ".psd", ".webp"})
+
+# Script log, per-entry details are only shown at debug level
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING"]
+log = logging.getLogger("shizu")
+if not log.handlers:
+    log_handler = logging.StreamHandler(sys.stdout)
+    log_handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+    log.addHandler(log_handler)
+    log.propagate = False
+    log.setLevel(logging.INFO)
+
+
+def is_image_path(path):
+    return os.path.splitext(path)[1].lower() in IMG_EXTS
+
+
+# {.env path: ((mtime_ns, ctime_ns, inode, size), values)}, reparsed only when the file changed.
+# ctime and inode catch a same size rewrite that kept its mtime (restored, or within the mtime granularity)
+env_cache = {}
+
+
+def read_env_file(path):
+    # KEY=VALUE lines, blank lines and # comments are skipped, surrounding quotes are removed
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino, stat.st_size)
+    cached = env_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1], True
+    values = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            values[key.strip()] = value
+    env_cache[path] = (signature, values)
+    return values, False
+
+
+def set_obs_backend(backend):
+    # Route every OBS call made by the script through backend.
+    # Anything exposing the obspython functions used here works, e.g. fake_obs.FakeObs.
+    global S
+    S = backend
 
 
 class Hijack:
     # Input values
     lineup_path = None
+    # Stage and day taken from an export covering several, empty keeps every entry
+    lineup_stage = ""
+    lineup_day = ""
+    # Fetch the lineup of event_name from the backend instead of reading lineup_path
+    backend_url = ""
+    event_name = ""
+    # Cached copy of the last fetched export, lineup_path stays the file chosen in the settings
+    fetched_lineup_path = None
     host_paths = False
     path_translation_map = {}
+    # Compiled from the .env paths, kept while the file is unchanged along with its memoised paths
+    path_translator = None
     generate_macros = False
+    # Advanced Scene Switcher settings export the macros are merged into
+    ass_settings_path = None
+    output_mode = OUTPUT_LIVE
+    check_media = False
+    downscale_images = False
+    max_logo_size = 500
+    missing_media = MISSING_MEDIA_SKIP
+    promo_mode = PROMO_PLAYLIST
+    # Milliseconds of OBS work per tick when applying, 0 applies everything at once
+    tick_budget_ms = 0
+    # Print handles that were not released once begin returns
+    debug_handles = False
+    # Close media outside the program scene and the next few lineup scenes
+    close_idle_media = False
+    warm_scenes = 1
+    # MB of the next scene's recording and visuals pulled into the page cache, 0 disables
+    read_ahead_mb = 0
+    # Re-apply the lineup automatically when the file changes
+    watch_lineup = False
+    # Connect the next scene's live stream while the current set plays
+    prewarm_live = False
+    # Seconds between checks of the upcoming live DJs' streams, 0 disables
+    stream_check_interval = 0
+    # Seconds between render/stream statistics samples during the show, 0 disables
+    telemetry_interval = 0
+    # Switch to the next scene when a recording or the promos end, live sets after live_set_minutes (0: manually)
+    auto_switch = False
+    live_set_minutes = 0
+    # Split the DJs across shard_nodes OBS instances, this one builds node shard_node (1-based)
+    shard_nodes = 1
+    shard_node = 1
+    shard_by = SHARD_BY_LOAD
 
     # Theme default values
     target_video_width = 1530
@@ -52,173 +222,628 @@ class Hijack:
     chat_offset_x = 0
     chat_offset_y = 0
 
+    # Only held while generate_scenes runs
     overlay_scene = None
-    promos_scene = None
-    ending_scene = None
+    promos_scene_name = None
     ass_manager = None
-
-    def begin(self):
-        if self.lineup_path:
-            lineup_data = self.validate_json_file(self.lineup_path)
+    ass_settings = None
+    media_probe = None
+    # Every media file is stat'ed once per run, by whichever step needs it first
+    stat_cache = None
+    text_cards = None
+    shared_sources = None
+    job = None
+    plan = None
+    profiler = None
+    job_started = None
+    decoder_budget = None
+    read_ahead = None
+    live_streams = None
+    sequencer = None
+    # Outlives scene watchers, re-applying the lineup mid-show keeps adding to the same report
+    telemetry = None
+    # Lineup output path the running telemetry reports on
+    telemetry_lineup = None
+    # Scenes in show order with the media that ends them, filled by generate_scenes
+    show_steps = None
+    # {index in this node's DJs: (next node, next DJ)} of a sharded event, set by shard_lineup
+    shard_handoffs = {}
+    # False on a shard node whose last DJ is not the last of the show
+    shard_ends_show = True
+    # Added to the name of every generated file, each node of a sharded event writes its own
+    output_tag = ""
+    watcher = None
+    watch_key = None
+    lineup_fetcher = None
+    # Leave the program scene alone, set for automatic updates
+    protect_program = False
+    deferred_changes = 0
+
+    def begin(self, protect_program=False, lineup=None):
+        # lineup, when given, is the export the watcher already parsed
+        self.protect_program = protect_program
+        tracker.reset()
+        tracker.enabled = self.debug_handles
+        try:
+            self.run(lineup)
+        finally:
+            if self.debug_handles:
+                self.audit_handles()
+            tracker.enabled = False
+            self.plan = None
+            # A background apply writes the profile once it is done
+            if not (self.job and self.job.running):
+                self.write_profile()
+
+    def run(self, lineup_data=None):
+        self.profiler = Profiler()
+        self.fetched_lineup_path = None
+        if lineup_data is not None:
+            if self.event_name:
+                self.fetched_lineup_path = str(self.fetcher().cache_path(self.event_name))
+        elif self.event_name:
+            with self.phase("fetch_lineup"):
+                lineup_data = self.fetch_lineup()
         else:
-            raise Exception("No lineup submitted")
+            if not self.lineup_path:
+                raise Exception("No lineup submitted")
+            with self.phase("validate_json_file"):
+                lineup_data = self.validate_json_file(self.lineup_path)
 
         if self.host_paths:
-            self.parse_env_paths()
+            with self.phase("parse_env_paths"):
+                self.parse_env_paths()
+
+        self.shard_handoffs = {}
+        self.shard_ends_show = True
+        self.output_tag = NODE_TAG % self.shard_node if self.shard_nodes > 1 else ""
+        if self.shard_nodes > 1:
+            with self.phase("shard_lineup"):
+                lineup_data = self.shard_lineup(lineup_data)
         
         if self.generate_macros:
             self.parse_ass_objs()
 
-        
-        print("Retreived lineup data, processing..")
-
-        lineup = self.init_lineup_data(lineup_data)
-
-        print("Data processed! Beginning scene generation..")
-
-        self.generate_scenes(lineup)
-
-        print(f"Generation is done! {len(lineup)} scenes created.")
+        # Build the desired scenes in memory, then apply them to OBS or write them out as a collection
+        live_backend = S
+        if self.output_mode == OUTPUT_COLLECTION:
+            plan = SceneCollectionBackend(RENDER_WIDTH, RENDER_HEIGHT)
+        else:
+            plan = SceneCollectionBackend(RENDER_WIDTH, RENDER_HEIGHT, size_lookup=live_source_size(live_backend))
+        self.plan = plan
+        self.stat_cache = StatCache()
+        set_obs_backend(self.instrumented(plan))
+
+        try:
+            log.info("Retrieved lineup data, processing..")
+
+            with self.phase("init_lineup_data"):
+                lineup = self.init_lineup_data(lineup_data)
+
+            if self.check_media:
+                with self.phase("preflight_media"):
+                    lineup = self.preflight_media(lineup)
+
+            # Media sizes from the container headers, OBS reports 0 until a frame is decoded.
+            # Only DJs the export has no resolution for are laid out from a probe
+            with self.phase("probe_media"):
+                self.media_probe = MediaProbe(CACHE_DIR.joinpath(PROBE_CACHE_FILE), stats=self.stat_cache)
+                self.media_probe.probe_all(
+                    scene.visuals_path or scene.recording_path
+                    for scene in lineup if scene.type == "DJ" and not scene.resolution
+                )
+
+            if self.promo_mode == PROMO_REEL:
+                with self.phase("promo_reel"):
+                    lineup = self.build_promo_reel(lineup)
+
+            if self.downscale_images:
+                with self.phase("downscale_images"):
+                    self.use_downscaled_images(lineup)
+
+            with self.phase("render_text_cards"):
+                self.render_text_cards(lineup)
+
+            log.info("Data processed! Beginning scene generation..")
+
+            with self.phase("generate_scenes"):
+                self.generate_scenes(lineup)
+            self.media_probe.save()
+
+            if self.generate_macros:
+                with self.phase("generate_ass_file"):
+                    self.generate_ass_file()
+        finally:
+            set_obs_backend(live_backend)
+            self.stat_cache = None
+
+        self.profiler.info.update({
+            "lineup": str(Path(self.current_lineup_path()).absolute()),
+            "output_mode": self.output_mode,
+            "stage": self.lineup_stage or None,
+            "day": self.lineup_day or None,
+            "djs": sum(1 for scene in lineup if scene.type == "DJ"),
+            "scenes": len(plan.scenes),
+            "sources": len(plan.sources),
+        })
+        if self.output_mode == OUTPUT_COLLECTION:
+            with self.phase("write_scene_collection"):
+                self.write_scene_collection(plan, lineup)
+        elif self.tick_budget_ms > 0:
+            self.start_job(plan)
+        else:
+            with self.phase("apply_plan"):
+                self.apply_plan(plan)
+
+    def phase(self, name):
+        # Profiled section, a no-op when the phases are called outside of begin (benchmarks)
+        return self.profiler.phase(name) if self.profiler else nullcontext()
+
+    def instrumented(self, backend):
+        # Counts and times every OBS call made through backend
+        return InstrumentedObs(backend, self.profiler) if self.profiler else backend
+
+    def write_profile(self):
+        if not self.profiler or not self.current_lineup_path():
+            return
+        log.info("%s", self.profiler.summary())
+        profile_path = self.lineup_output_path("_profile.json")
+        try:
+            self.profiler.write(profile_path)
+        except OSError as error:
+            log.warning("Could not write profile to %s: %s", profile_path, error)
+            return
+        log.info("Wrote profile to: %s", profile_path)
+
+    def audit_handles(self):
+        # Scoped handles still held, and anything the planning code acquired without a scope
+        log.info("%s", tracker.report())
+        if self.plan is None:
+            return
+        leaked = self.plan.outstanding()
+        log.info("Planning handles never released: %d", len(leaked))
+        for handle in leaked:
+            log.warning("  %s %s", handle.kind, getattr(handle, "name", ""))
 
-        if self.generate_macros:
-            self.generate_ass_file()
-    
     def validate_json_file(self, path):
-        # Validate file exists, and load JSON data
+        # Validate file exists, and load the lineup entries of the selected stage/day
         if not os.path.exists(path):
             raise Exception("Supplied file does not exist at: " + path)
-        with open(path, 'r') as f:
-            data = json.load(f)
-        return data
+        return load_lineup(path, self.lineup_stage, self.lineup_day)
     
+    def fetcher(self):
+        # Kept between updates, its connection and validators make repeat fetches a 304
+        if self.lineup_fetcher is None or self.lineup_fetcher.base_url != self.backend_url:
+            self.close_fetcher()
+            if not self.backend_url:
+                raise Exception("No backend URL to fetch the event from")
+            self.lineup_fetcher = LineupFetcher(self.backend_url, CACHE_DIR.joinpath(FETCHED_LINEUP_DIR))
+        return self.lineup_fetcher
+
+    def close_fetcher(self):
+        if self.lineup_fetcher:
+            self.lineup_fetcher.close()
+            self.lineup_fetcher = None
+
+    def fetch_lineup(self):
+        # An unchanged export comes back as a 304 with the lineup parsed on the previous fetch
+        result = self.fetcher().fetch(self.event_name, self.lineup_stage, self.lineup_day)
+        log.info("Fetched %s", result)
+        self.fetched_lineup_path = str(result.path)
+        return result.lineup
+
+    def env_path(self):
+        # The backend's .env at the root of the repository
+        return Path(__file__).absolute().parent.parent.joinpath(ENV_FILE_NAME)
+
     def parse_env_paths(self):
         # Prepare translation map for docker->host paths
-        env_fp = Path(__file__).absolute().parent.parent.joinpath(ENV_FILE_NAME)
+        env_fp = self.env_path()
         if not env_fp.exists():
             raise Exception("Could not find .env file for path translation: " + str(env_fp))
         
-        with env_fp.open() as f:
-            for line in f.readlines():
-                key, value = line.rstrip("\n").split("=", 1)
-                self.path_translation_map[key] = value
+        values, cached = read_env_file(str(env_fp))
+        # A fresh map per run, keys removed from .env must not linger from the last update
+        self.path_translation_map = dict(values)
+        if not cached or self.path_translator is None:
+            self.path_translator = PathTranslator(values)
         
-        print(".env paths translated")
+        log.info(
+            ".env paths translated, %d docker roots%s", len(self.path_translator), " (unchanged, reused)" if cached else ""
+        )
+    
+    def shard_lineup(self, lineup_data: Lineup):
+        # Every node splits the same export the same way and keeps its own DJs
+        if not 1 <= self.shard_node <= self.shard_nodes:
+            raise Exception(f"Node {self.shard_node} is not one of the {self.shard_nodes} nodes")
+        env = self.path_translation_map
+        if not env and self.shard_by == SHARD_BY_ZONE and self.env_path().exists():
+            env, _ = read_env_file(str(self.env_path()))
+        plan = plan_shards(
+            lineup_data.djs, self.shard_nodes, self.shard_by, env.get("RTMP_SERVER", ""), parse_zones(env.get("RTMP_ZONES"))
+        )
+        log.info("%s", plan)
+        if not plan.shard(self.shard_node).positions:
+            raise Exception(f"Node {self.shard_node} has no DJs, use fewer nodes for {len(lineup_data.djs)} DJs")
+        self.shard_handoffs = plan.handoffs(self.shard_node)
+        self.shard_ends_show = plan.ends_show(self.shard_node)
+        for next_node, next_dj in self.shard_handoffs.values():
+            log.debug("Hand-off to node %d before %s", next_node, next_dj)
+        return plan.node_lineup(self.shard_node, lineup_data)
+
+    def preflight_media(self, lineup: list['ObsSceneValue']):
+        # Check every referenced file before anything is created in OBS
+        report = run_preflight(lineup, stats=self.stat_cache)
+        if report.ok:
+            log.info("%s", report)
+            return lineup
+        log.warning("%s", report)
+        if self.missing_media == MISSING_MEDIA_WARN:
+            # Reported only, scenes are generated as if the check had not run
+            return lineup
+        if self.missing_media == MISSING_MEDIA_SKIP:
+            lineup = drop_failed_media(lineup, report)
+            if not lineup:
+                raise Exception("Pre-flight removed every scene, nothing to generate")
+            return lineup
+        raise Exception("Pre-flight found missing media, no scenes were generated")
+    
+    def build_promo_reel(self, lineup: list['ObsSceneValue']):
+        # Join the promos into one concat list, clips the demuxer cannot join are reported before anything is created
+        for scene_values in lineup:
+            if scene_values.type != "Promos":
+                continue
+            # Every clip's codec and size, read concurrently before they are compared
+            self.media_probe.probe_all(scene_values.paths)
+            report = check_reel(scene_values.paths, self.media_probe)
+            if report.ok:
+                log.info("%s", report)
+            else:
+                log.warning("%s", report)
+                if self.missing_media == MISSING_MEDIA_ABORT:
+                    raise Exception("Promo reel has clips of another codec or size, no scenes were generated")
+                if not report.clips:
+                    raise Exception("Promo reel has no clip that can be joined, nothing to generate")
+            durations = {path: (self.media_probe.probe(path) or {}).get("duration") for path in report.clips}
+            reel_path = self.lineup_output_path(REEL_SUFFIX)
+            if write_concat_list(reel_path, report.clips, durations):
+                log.info("Wrote promo reel to: %s", reel_path)
+            scene_values.paths = report.clips
+            scene_values.reel_path = str(reel_path)
+        return lineup
+
+    def use_downscaled_images(self, lineup: list['ObsSceneValue']):
+        # Point logos and still theme images at display sized variants, saves GPU memory and load time
+        image_cache = ImageCache(CACHE_DIR.joinpath(IMAGE_CACHE_DIR), stats=self.stat_cache)
+        logo_box = (self.max_logo_size, self.max_logo_size)
+        render_box = (RENDER_WIDTH, RENDER_HEIGHT)
+        requests = []
+        for scene_values in lineup:
+            if isinstance(scene_values, ObsThemeScene):
+                if is_image_path(scene_values.path):
+                    requests.append((scene_values.path, render_box))
+            elif scene_values.type == "DJ" and scene_values.logo_path:
+                requests.append((scene_values.logo_path, logo_box))
+
+        resolved = image_cache.resolve(requests)
+        for scene_values in lineup:
+            if isinstance(scene_values, ObsThemeScene):
+                scene_values.path = resolved.get((scene_values.path, render_box), scene_values.path)
+            elif scene_values.type == "DJ" and scene_values.logo_path:
+                scene_values.logo_path = resolved[(scene_values.logo_path, logo_box)]
+        log.info("Images: %d processed, %d reused from cache", image_cache.processed, image_cache.reused)
     
-    def generate_host_path(self, docker_key, host_key, raw_path):
-        docker_root = self.path_translation_map[docker_key]
-        host_root = self.path_translation_map[host_key]
-        val = str(Path(host_root).joinpath(raw_path[len(docker_root)+1:]))
-        return val
+    def render_text_cards(self, lineup: list['ObsSceneValue']):
+        # Rasterise every DJ name and VJ credit up front, cached between runs
+        self.text_cards = TextCards(CACHE_DIR.joinpath(CARD_CACHE_DIR), CARD_FONT_FACE, CARD_FONT_SIZE)
+        texts = []
+        for scene_values in lineup:
+            if scene_values.type != "DJ":
+                continue
+            if not scene_values.logo_path:
+                texts.append(scene_values.name)
+            if scene_values.vj:
+                texts.append("VJ: " + scene_values.vj)
+        self.text_cards.render_all(texts)
+        log.info("Text cards: %d rendered, %d reused from cache", self.text_cards.rendered, self.text_cards.reused)
+    
+    def generate_host_path(self, raw_path):
+        # The longest DOCKER_*_PATH the path starts with picks its LOCAL_*_PATH
+        return self.path_translator.translate(raw_path, self.stat_cache)
     
     def parse_ass_objs(self):
         self.ass_manager = AdvancedSceneSwitchManager()
     
     def generate_ass_file(self):
-        print("Generating Automatic Scene Switch Macros")
-        json_data = self.ass_manager.generate_objects(self.promos_scene, self.ending_scene)
+        log.info("Generating Automatic Scene Switch Macros")
+        json_data = self.ass_manager.generate_objects(self.promos_scene_name, ENDING_SCENE)
 
-        macro_file_name = ''.join(Path(self.lineup_path).name.split(".")[:-1]) + "_macro.txt"
-        new_macro_path = Path(self.lineup_path).absolute().parent.joinpath(macro_file_name)
+        new_macro_path = self.lineup_output_path("_macro.txt")
         with open(new_macro_path, "w") as f:
             f.write(json_data)
         
-        print("Wrote new macro to: " + str(new_macro_path))
+        log.info("Wrote new macro to: %s", new_macro_path)
+
+        # Full settings with the previous run's macros replaced, imported instead of the macros alone
+        self.ass_settings = None
+        if self.ass_settings_path:
+            with open(self.ass_settings_path, "r") as f:
+                existing_settings = json.load(f)
+        else:
+            existing_settings = {}
+        self.ass_settings = self.ass_manager.merge_settings(existing_settings, json_data)
+        if self.ass_settings_path:
+            settings_path = self.lineup_output_path("_ass_settings.json")
+            with open(settings_path, "w") as f:
+                json.dump(self.ass_settings, f)
+            log.info("Wrote merged Advanced Scene Switcher settings to: %s", settings_path)
+
+    def write_scene_collection(self, compiler: SceneCollectionBackend, lineup: list['ObsSceneValue']):
+        collection_name = Path(self.current_lineup_path()).stem
+        collection_path = self.lineup_output_path("_collection.json")
+        # Open on the first scene of the show rather than the nested overlay
+        show_scenes = [scene.name for scene in lineup if scene.name != OVERLAY_SCENE]
+        if self.generate_macros and self.ass_settings:
+            compiler.modules[ASS_MODULE] = self.ass_settings
+        compiler.write(collection_path, collection_name, show_scenes[0] if show_scenes else None)
+
+        if compiler.placeholder_scenes:
+            log.info("Created empty placeholder scenes: %s", ", ".join(compiler.placeholder_scenes))
+        log.info("Wrote scene collection to: %s", collection_path)
+
+    def apply_plan(self, plan: SceneCollectionBackend):
+        # Only create, update, restack or remove what differs from the previous run
+        self.report_stats(LineupReconciler(self.instrumented(S), plan, self.program_scenes()).apply())
+        self.start_scene_watchers(plan)
+
+    def start_job(self, plan: SceneCollectionBackend):
+        # Same as apply_plan, spread over OBS ticks so the UI and preview keep running
+        self.stop_scene_watchers()
+        self.job = ReconcileJob(
+            LineupReconciler(self.instrumented(S), plan, self.program_scenes()),
+            self.tick_budget_ms,
+            on_progress=lambda job: show_progress(job.progress_text()),
+            on_done=lambda job, error: self.job_done(job, error, plan)
+        )
+        self.job.start()
+        if self.profiler:
+            self.job_started = (time.perf_counter(), self.profiler.obs_calls, self.profiler.obs_seconds)
+        log.info("Applying %d scenes in the background..", self.job.total_scenes)
+
+    def job_done(self, job: ReconcileJob, error, plan: SceneCollectionBackend):
+        if self.profiler:
+            # Wall time includes the frames between ticks
+            start, obs_calls, obs_seconds = self.job_started
+            self.profiler.add(
+                "apply_plan",
+                time.perf_counter() - start,
+                self.profiler.obs_calls - obs_calls,
+                self.profiler.obs_seconds - obs_seconds
+            )
+        if error:
+            log.error("Generation failed, created scenes and sources were removed: %s", error)
+        elif job.state == "Cancelled":
+            log.warning("Generation cancelled, removed %d created scenes and sources", job.reconciler.stats["rolled_back"])
+        else:
+            self.report_stats(job.reconciler.stats)
+            self.start_scene_watchers(plan)
+        self.write_profile()
+
+    def start_scene_watchers(self, plan: SceneCollectionBackend):
+        # Refreshed on every program scene change through on_frontend_event
+        self.stop_scene_watchers()
+        scene_media = scene_media_from_plan(plan)
+        if self.close_idle_media:
+            self.decoder_budget = DecoderBudget(S, scene_media, self.warm_scenes)
+            self.decoder_budget.refresh()
+        if self.read_ahead_mb > 0:
+            self.read_ahead = ReadAhead(
+                S, started_media_from_plan(plan), scene_files_from_plan(plan), self.read_ahead_mb * 1024 * 1024
+            )
+            self.read_ahead.start()
+        if self.prewarm_live or self.stream_check_interval > 0:
+            self.live_streams = LiveStreams(
+                S, scene_streams_from_plan(plan), self.prewarm_live, self.stream_check_interval * 1000,
+                on_report=show_stream_health
+            )
+            self.live_streams.start()
+        if self.auto_switch and self.show_steps:
+            if self.generate_macros:
+                log.warning("Scene switcher macros switch scenes as well, only import them with automatic switching off")
+            self.sequencer = Sequencer(S, self.show_steps, self.live_set_minutes)
+            self.sequencer.start()
+        self.update_telemetry()
+
+    def stop_scene_watchers(self):
+        self.decoder_budget = None
+        if self.read_ahead:
+            self.read_ahead.close()
+            self.read_ahead = None
+        if self.live_streams:
+            self.live_streams.close()
+            self.live_streams = None
+        if self.sequencer:
+            self.sequencer.stop()
+            self.sequencer = None
+
+    def update_telemetry(self):
+        if not (self.telemetry_interval > 0 and self.current_lineup_path()):
+            self.stop_telemetry()
+            return
+        lineup = str(self.lineup_output_path(""))
+        interval_ms = self.telemetry_interval * 1000
+        if self.telemetry and self.telemetry_lineup == lineup and self.telemetry.interval_ms == interval_ms:
+            self.telemetry.set_steps(self.show_steps or [])
+            return
+        self.stop_telemetry()
+        # A new show, new files: earlier reports are never read back or appended to
+        show = time.strftime("%Y%m%d-%H%M%S")
+        self.telemetry = ShowTelemetry(
+            S, self.lineup_output_path(TELEMETRY_CSV_SUFFIX % show), self.lineup_output_path(TELEMETRY_JSON_SUFFIX % show),
+            self.show_steps or [], interval_ms
+        )
+        self.telemetry_lineup = lineup
+        self.telemetry.start()
+
+    def stop_telemetry(self):
+        if self.telemetry:
+            self.telemetry.stop()
+            log.info("Telemetry report written to: %s", self.telemetry.json_path)
+            self.telemetry = None
+            self.telemetry_lineup = None
+
+    def report_stats(self, stats):
+        log.info(
+            "Generation is done! Scenes: %d created, %d removed. Sources: %d created, %d updated, %d unchanged, %d removed.",
+            stats["scenes_created"], stats["scenes_removed"], stats["sources_created"],
+            stats["sources_updated"], stats["sources_unchanged"], stats["sources_removed"]
+        )
+        self.deferred_changes = stats["scenes_deferred"] + stats["sources_deferred"]
+        if self.deferred_changes:
+            log.info("%d changes to the program scene are deferred until it is switched away from", self.deferred_changes)
+
+    def program_scenes(self):
+        # Scene on program output, the reconciler also protects the scenes nested in it
+        if not self.protect_program:
+            return []
+        with HandleScope(S) as scope:
+            name = S.obs_source_get_name(scope.source(S.obs_frontend_get_current_scene()))
+        return [name] if name else []
+
+    def update_watch(self):
+        # (Re)starts the watcher when watch mode or the lineup path changed
+        if not (self.watch_lineup and (self.event_name or self.lineup_path)):
+            self.stop_watch()
+            return
+        if self.event_name:
+            try:
+                fetcher = self.fetcher()
+            except Exception as error:
+                log.error("Cannot watch %s: %s", self.event_name, error)
+                self.stop_watch()
+                return
+            # The background fetches parse with the selection, a new one restarts the watcher
+            watch_key = (fetcher.url(self.event_name), self.lineup_stage, self.lineup_day)
+        else:
+            watch_key = (self.lineup_path, self.lineup_stage, self.lineup_day)
+        if self.watcher and self.watch_key == watch_key:
+            return
+        self.stop_watch()
+        if self.event_name:
+            self.watcher = FetchWatcher(
+                S, fetcher, self.event_name, self.lineup_changed, FETCH_WATCH_INTERVAL_MS, self.lineup_stage, self.lineup_day
+            )
+        else:
+            self.watcher = LineupWatcher(
+                S, self.lineup_path, self.lineup_changed, WATCH_INTERVAL_MS, WATCH_SETTLE_MS, self.lineup_stage, self.lineup_day
+            )
+        self.watch_key = watch_key
+        self.watcher.start()
+
+    def stop_watch(self):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+            self.watch_key = None
+
+    def lineup_changed(self, lineup=None):
+        # Called by the watcher with the lineup it parsed, returning False retries on the next poll
+        if self.job and self.job.running:
+            return False
+        log.info("Lineup changed, applying it automatically")
+        try:
+            self.begin(protect_program=True, lineup=lineup)
+        except Exception as error:
+            log.error("Automatic update failed: %s", error)
+        return True
+
+    def current_lineup_path(self):
+        # Export the last update read, the cached copy when the event is fetched from the backend
+        return self.fetched_lineup_path if self.event_name else self.lineup_path
+
+    def lineup_output_path(self, suffix):
+        # Generated files are saved next to the exported lineup
+        lineup_path = Path(self.current_lineup_path())
+        file_name = ''.join(lineup_path.name.split(".")[:-1]) + self.output_tag + suffix
+        return lineup_path.absolute().parent.joinpath(file_name)
 
     
-    def init_lineup_data(self, lineup_data):
+    def init_lineup_data(self, lineup_data: Lineup):
         # Initialize djs->promos scenes in memory
         lineup_scenes = []
-        for dj_entry in lineup_data[DJ_KEY]:
-            print(dj_entry)
-            dj_scene = ObsDjScene(dj_entry.get("name"), dj_entry.get("logo_path"))
-            if dj_entry.get("url"):
-                dj_scene.stream_url = dj_entry.get("url")
+        handoffs = 0
+        for index, dj_entry in enumerate(lineup_data.djs):
+            log.debug("DJ entry: %s", dj_entry)
+            dj_scene = ObsDjScene(dj_entry.name, dj_entry.logo_path)
+            if dj_entry.url:
+                dj_scene.stream_url = dj_entry.url
             else:
-                dj_scene.recording_path = dj_entry.get("recording_path")
-                dj_scene.visuals_path = dj_entry.get("visuals_path")
-                dj_scene.resolution = dj_entry.get("resolution")
+                dj_scene.recording_path = dj_entry.recording_path
+                dj_scene.visuals_path = dj_entry.visuals_path
+                dj_scene.resolution = dj_entry.resolution
             if self.host_paths:
                 if dj_scene.logo_path:
-                    dj_scene.logo_path = self.generate_host_path(
-                        "DOCKER_LOGOS_PATH", "LOCAL_LOGOS_PATH", dj_scene.logo_path
-                    )
+                    dj_scene.logo_path = self.generate_host_path(dj_scene.logo_path)
                 if dj_scene.recording_path:
-                    dj_scene.recording_path = self.generate_host_path(
-                        "DOCKER_RECORDINGS_PATH", "LOCAL_RECORDINGS_PATH", dj_scene.recording_path
-                    )
+                    dj_scene.recording_path = self.generate_host_path(dj_scene.recording_path)
+                # Uploaded visuals are under the recordings root, generic ones under the visuals root
                 if dj_scene.visuals_path:
-                    recording_visuals_path = self.generate_host_path(
-                        "DOCKER_RECORDINGS_PATH", "LOCAL_RECORDINGS_PATH", dj_scene.visuals_path
-                    )
-                    if os.path.isfile(recording_visuals_path):
-                        dj_scene.visuals_path = recording_visuals_path
-                    else:
-                        dj_scene.visuals_path = self.generate_host_path(
-                            "DOCKER_GENERIC_VISUALS_PATH", "LOCAL_GENERIC_VISUALS_PATH", dj_scene.visuals_path
-                        )
-
-            dj_scene.vj = dj_entry.get("vj")
+                    dj_scene.visuals_path = self.generate_host_path(dj_scene.visuals_path)
+
+            dj_scene.vj = dj_entry.vj
             lineup_scenes.append(dj_scene)
+            if index in self.shard_handoffs:
+                handoffs += 1
+                lineup_scenes.append(ObsHandoffScene(handoffs, *self.shard_handoffs[index]))
         promos = []
-        for promo in lineup_data[PROMO_KEY]:
-            print(promo)
+        for promo in lineup_data.promos:
+            log.debug("Promo entry: %s", promo)
             if self.host_paths:
-                promos.append(self.generate_host_path(
-                    "DOCKER_RECORDINGS_PATH", "LOCAL_RECORDINGS_PATH", promo.get("path")
-                ))
+                promos.append(self.generate_host_path(promo.path))
             else:
-                promos.append(promo.get("path"))
+                promos.append(promo.path)
         if len(promos) > 0:
             lineup_scenes.append(ObsPromoScene(promos))
         theme_items = []
-        if lineup_data.get(THEME_KEY):
-            theme_data = lineup_data.get(THEME_KEY)
-            print(theme_data)
+        if lineup_data.theme:
+            theme_data = lineup_data.theme
+            log.debug("Theme: %s", theme_data)
             # Update overlay offset and scale
-            self.target_video_width = theme_data.get("video_width", self.target_video_width)
-            self.target_video_height = theme_data.get("video_height", self.target_video_height)
-            self.video_offset_x = theme_data.get("video_offset_x", self.video_offset_x)
-            self.video_offset_y = theme_data.get("video_offset_y", self.video_offset_y)
-            self.chat_width = theme_data.get("chat_width", self.chat_width)
-            self.chat_height = theme_data.get("chat_height", self.chat_height)
-            self.chat_offset_x = theme_data.get("chat_offset_x", self.chat_offset_x)
-            self.chat_offset_y = theme_data.get("chat_offset_y", self.chat_offset_y)
+            for field, attribute in THEME_LAYOUT.items():
+                value = getattr(theme_data, field)
+                if value is not None:
+                    setattr(self, attribute, value)
 
             # Theme scenes
-            if (theme_data.get("overlay")):
-                print("Overlay Theme")
-                overlay_scene = ObsThemeScene(OVERLAY_SCENE, "Overlay", theme_data.get("overlay"))
+            if (theme_data.overlay):
+                log.debug("Overlay Theme")
+                overlay_scene = ObsThemeScene(OVERLAY_SCENE, "Overlay", theme_data.overlay)
                 if self.host_paths:
-                    overlay_scene.path = self.generate_host_path(
-                        "DOCKER_THEMES_PATH", "LOCAL_THEMES_PATH", overlay_scene.path
-                    )
+                    overlay_scene.path = self.generate_host_path(overlay_scene.path)
                 theme_items.append(overlay_scene)
-            if (theme_data.get("starting")):
-                print("Starting Theme")
-                starting_scene = ObsThemeScene(STARTING_SCENE, "Starting", theme_data.get("starting"))
+            if (theme_data.starting):
+                log.debug("Starting Theme")
+                starting_scene = ObsThemeScene(STARTING_SCENE, "Starting", theme_data.starting)
                 if self.host_paths:
-                    starting_scene.path = self.generate_host_path(
-                        "DOCKER_THEMES_PATH", "LOCAL_THEMES_PATH", starting_scene.path
-                    )
+                    starting_scene.path = self.generate_host_path(starting_scene.path)
                 theme_items.append(starting_scene)
             # Not looking viable through scripting
-            # if (theme_data.get("stinger")):
-            #     stinger_scene = ObsThemeScene("Stinger", "Stinger", theme_data.get("stinger"))
+            # if (theme_data.stinger):
+            #     stinger_scene = ObsThemeScene("Stinger", "Stinger", theme_data.stinger)
             #     if self.host_paths:
-            #         stinger_scene.path = self.generate_host_path(
-            #             "DOCKER_THEMES_PATH", "LOCAL_THEMES_PATH", stinger_scene.path
-            #         )
+            #         stinger_scene.path = self.generate_host_path(stinger_scene.path)
             #     theme_items.append(stinger_scene)
-            if (theme_data.get("ending")):
-                print("Ending Theme")
-                ending_scene = ObsThemeScene(ENDING_SCENE, "Ending", theme_data.get("ending"))
+            if (theme_data.ending):
+                log.debug("Ending Theme")
+                ending_scene = ObsThemeScene(ENDING_SCENE, "Ending", theme_data.ending)
                 if self.host_paths:
-                    ending_scene.path = self.generate_host_path(
-                        "DOCKER_THEMES_PATH", "LOCAL_THEMES_PATH", ending_scene.path
-                    )
+                    ending_scene.path = self.generate_host_path(ending_scene.path)
                 lineup_scenes.append(ending_scene)
-            else:
-                self.ending_scene = S.obs_get_scene_by_name(ENDING_SCENE)
+            elif not (lineup_scenes and lineup_scenes[-1].type == "Handoff"):
+                # Looked up so a compiled collection gets a placeholder for the macros to target,
+                # a node handing the show on to another never switches to the ending
+                with HandleScope(S) as scope:
+                    scope.scene(S.obs_get_scene_by_name(ENDING_SCENE))
             
             # Prepend theme items
             lineup_scenes = theme_items + lineup_scenes
@@ -226,309 +851,383 @@ class Hijack:
         return lineup_scenes
 
     def generate_scenes(self, lineup: list['ObsSceneValue']):
-        # Declare shared scenes
-        if lineup[0].name == OVERLAY_SCENE:
-            self.overlay_scene = S.obs_scene_create(OVERLAY_SCENE)
-        else:
-            self.overlay_scene = S.obs_get_scene_by_name(OVERLAY_SCENE)
-        # Create scenes in OBS
-        for scene_values in lineup:
-            # generate sources
-            if scene_values.type == "DJ":
-                scene = S.obs_scene_create(scene_values.name)
-                self.setup_dj_scene_items(scene, scene_values)
-                S.obs_scene_release(scene)
-            elif scene_values.type == "Promos":
-                self.promos_scene = S.obs_scene_create(scene_values.name)
-                self.setup_promo_scene_items(self.promos_scene, scene_values)
-                S.obs_scene_release(scene)
+        self.shared_sources = SourceRegistry()
+        self.promos_scene_name = None
+        self.show_steps = []
+        with HandleScope(S) as scope:
+            # Declare shared scenes
+            if lineup[0].name == OVERLAY_SCENE:
+                self.overlay_scene = scope.scene(S.obs_scene_create(OVERLAY_SCENE))
             else:
-                self.setup_theme_scene_items(scene_values)
-        S.obs_scene_release(self.overlay_scene)
+                self.overlay_scene = scope.scene(S.obs_get_scene_by_name(OVERLAY_SCENE))
+            try:
+                # Create scenes in OBS
+                for scene_values in lineup:
+                    # generate sources
+                    with self.phase("generate_scenes." + scene_values.type):
+                        if scene_values.type == "DJ":
+                            scene = scope.scene(S.obs_scene_create(scene_values.name))
+                            self.setup_dj_scene_items(scene, scene_values)
+                            scope.release(scene)
+                        elif scene_values.type == "Promos":
+                            scene = scope.scene(S.obs_scene_create(scene_values.name))
+                            self.setup_promo_scene_items(scene, scene_values)
+                            self.promos_scene_name = scene_values.name
+                            scope.release(scene)
+                        elif scene_values.type == "Handoff":
+                            # A scene per hand-off keeps every scene at its own position in the show order
+                            scope.release(scope.scene(S.obs_scene_create(scene_values.name)))
+                            self.add_handoff(scene_values)
+                        else:
+                            self.setup_theme_scene_items(scene_values)
+            finally:
+                # Released with the scope
+                self.overlay_scene = None
+        if self.shard_ends_show:
+            # Other nodes stop on their last hand-off, the show ends elsewhere
+            self.show_steps.append(SequenceStep(ENDING_SCENE))
+        log.info("%s", self.shared_sources.report())
     
+    def add_handoff(self, scene_values: 'ObsHandoffScene'):
+        # Macros and the sequencer stop on the hand-off scene. Nothing is sent to the next node, its operator
+        # (or the switcher picking between node outputs) takes the next DJ's scene to program there
+        if self.generate_macros:
+            self.ass_manager.add_dj(f"node {scene_values.next_node}", scene_values.name, True, None)
+        self.show_steps.append(SequenceStep(scene_values.name))
+        log.info("Hand-off to node %d, %s is next", scene_values.next_node, scene_values.next_dj)
+
     def setup_theme_scene_items(self, scene_values: 'ObsThemeScene'):
-        if scene_values.type == "Overlay":
-            scene = self.overlay_scene
-        else:
-            scene = S.obs_scene_create(scene_values.name)
-            if (scene_values.name == ENDING_SCENE):
-                self.ending_scene = scene
-        if ("." + scene_values.path.split(".")[-1]) in IMG_EXTS:
-            image_settings = S.obs_data_create()
-            S.obs_data_set_string(image_settings, "file", scene_values.path)
-            image_source = S.obs_source_create("image_source", scene_values.type, image_settings, None)
-            S.obs_scene_add(scene, image_source)
-        else:
-            json_settings = {
-                "local_file": scene_values.path,
-                "hw_decode": True,
-                "looping": True
-            }
-            video_settings = S.obs_data_create_from_json(json.dumps(json_settings))
-            video_source = S.obs_source_create("ffmpeg_source", scene_values.type, video_settings, None)
-            S.obs_scene_add(scene, video_source)
-        if scene_values.type == "Overlay":
-            if self.path_translation_map.get("OBS_CHAT_URL"):
+        with HandleScope(S) as scope:
+            if scene_values.type == "Overlay":
+                # Owned by generate_scenes
+                scene = self.overlay_scene
+            else:
+                scene = scope.scene(S.obs_scene_create(scene_values.name))
+            if is_image_path(scene_values.path):
+                image_settings = scope.data(S.obs_data_create())
+                S.obs_data_set_string(image_settings, "file", scene_values.path)
+                image_source = scope.source(S.obs_source_create("image_source", scene_values.type, image_settings, None))
+                S.obs_scene_add(scene, image_source)
+            else:
+                json_settings = {
+                    "local_file": scene_values.path,
+                    "hw_decode": True,
+                    "looping": True
+                }
+                video_settings = scope.data(S.obs_data_create_from_json(json.dumps(json_settings)))
+                video_source = scope.source(S.obs_source_create("ffmpeg_source", scene_values.type, video_settings, None))
+                S.obs_scene_add(scene, video_source)
+            if scene_values.type == "Overlay" and self.path_translation_map.get("OBS_CHAT_URL"):
                 json_settings = {
                     "url": self.path_translation_map.get("OBS_CHAT_URL"),
                     "height": self.chat_height,
                     "width": self.chat_width,
                     "css": CHAT_CSS
                 }
-                chat_settings = S.obs_data_create_from_json(json.dumps(json_settings))
-                chat_source = S.obs_source_create("browser_source", "Chat", chat_settings, None)
+                chat_settings = scope.data(S.obs_data_create_from_json(json.dumps(json_settings)))
+                chat_source = scope.source(S.obs_source_create("browser_source", "Chat", chat_settings, None))
                 chat_item = S.obs_scene_add(scene, chat_source)
                 pos = S.vec2()
                 # Offset for overlay
                 pos.x = self.chat_offset_x
                 pos.y = self.chat_offset_y
-                print(pos)
                 S.obs_sceneitem_set_pos(chat_item, pos)
-                S.obs_data_release(chat_settings)
-                S.obs_source_release(chat_source)
-        else:
-            S.obs_scene_release(scene)
 
     
     def setup_dj_scene_items(self, scene, scene_values: 'ObsDjScene'):
-        # Load recording or setup vlc stream
-        visuals_source = None
-        if scene_values.recording_path:
-            if scene_values.visuals_path:
-                visuals_source_name = f"{scene_values.name}_visuals"
-                visuals_json_settings = {
-                    "local_file": scene_values.visuals_path,
-                    "hw_decode": True,
-                    "looping": True
-                }
-                visuals_settings = S.obs_data_create_from_json(json.dumps(visuals_json_settings))
-                visuals_source = S.obs_source_create("ffmpeg_source", visuals_source_name, visuals_settings, None)
-                S.obs_source_set_volume(visuals_source, 0.0)
-                
-            video_source_name = f"{scene_values.name}_recording"
-            json_settings = {
-                "local_file": scene_values.recording_path,
-                "hw_decode": True
-            }
-            video_settings = S.obs_data_create_from_json(json.dumps(json_settings))
-            video_source = S.obs_source_create("ffmpeg_source", video_source_name, video_settings, None)
-        else:
-            video_source_name = f"{scene_values.name}_live"
-            json_settings = {
-                "playlist": [
-                    {
-                        "hidden": False,
-                        "value": scene_values.stream_url
+        with HandleScope(S) as scope:
+            # Load recording or setup vlc stream
+            visuals_source = None
+            if scene_values.recording_path:
+                if scene_values.visuals_path:
+                    visuals_json_settings = {
+                        "local_file": scene_values.visuals_path,
+                        "hw_decode": True,
+                        "looping": True
                     }
-                ]
-            }
-            video_settings = S.obs_data_create_from_json(json.dumps(json_settings))
-            video_source = S.obs_source_create("vlc_source", video_source_name, video_settings, None)
-        
-        self.ass_manager.add_dj(
-            scene_values.name,
-            S.obs_source_get_name(S.obs_scene_get_source(scene)),
-            not bool(scene_values.recording_path),
-            video_source_name
-        )
+                    # Generic visuals are often shared between DJs, one decoder serves every scene
+                    visuals_source = scope.source(self.shared_sources.acquire(
+                        "ffmpeg_source", os.path.basename(scene_values.visuals_path), visuals_json_settings, volume=0.0
+                    ))
 
-        video_item = S.obs_scene_add(scene, video_source)
-        if visuals_source:
-            visuals_item = S.obs_scene_add(scene, visuals_source)
+                video_source_name = f"{scene_values.name}_recording"
+                json_settings = {
+                    "local_file": scene_values.recording_path,
+                    "hw_decode": True
+                }
+                video_settings = scope.data(S.obs_data_create_from_json(json.dumps(json_settings)))
+                video_source = scope.source(S.obs_source_create("ffmpeg_source", video_source_name, video_settings, None))
+            else:
+                video_source_name = f"{scene_values.name}_live"
+                json_settings = {
+                    "playlist": [
+                        {
+                            "hidden": False,
+                            "value": scene_values.stream_url
+                        }
+                    ]
+                }
+                video_settings = scope.data(S.obs_data_create_from_json(json.dumps(json_settings)))
+                video_source = scope.source(S.obs_source_create("vlc_source", video_source_name, video_settings, None))
 
-        pos = S.vec2()
-        # Offset for overlay
-        pos.x = self.video_offset_x
-        pos.y = self.video_offset_y
-        
-        if scene_values.resolution:
-            source_width = scene_values.resolution[0]
-            source_height = scene_values.resolution[1]
-        elif visuals_source:
-            source_width = S.obs_source_get_width(visuals_source)
-            source_height = S.obs_source_get_height(visuals_source)
-        else:
-            source_width = S.obs_source_get_width(video_source)
-            source_height = S.obs_source_get_height(video_source)
-
-        # Fallback if no frame is rendered
-        if source_width == 0 or source_height == 0:
-            source_width = RENDER_WIDTH
-            source_height = RENDER_HEIGHT
-        scale = S.vec2()
-        scale.x = self.target_video_width / source_width
-        scale.y = self.target_video_height / source_height
-        if visuals_source:
-            S.obs_sceneitem_set_pos(visuals_item, pos)
-            S.obs_sceneitem_set_scale(visuals_item, scale)
-            S.obs_data_release(visuals_settings)
-            S.obs_source_release(visuals_source)
-        else:
-            S.obs_sceneitem_set_pos(video_item, pos)
-            S.obs_sceneitem_set_scale(video_item, scale)
+            scene_name = S.obs_source_get_name(S.obs_scene_get_source(scene))
+            is_live = not bool(scene_values.recording_path)
+            if self.generate_macros:
+                self.ass_manager.add_dj(scene_values.name, scene_name, is_live, video_source_name)
+            self.show_steps.append(SequenceStep(scene_name, None if is_live else video_source_name, is_live))
+
+            video_item = S.obs_scene_add(scene, video_source)
+            if visuals_source:
+                visuals_item = S.obs_scene_add(scene, visuals_source)
+
+            pos = S.vec2()
+            # Offset for overlay
+            pos.x = self.video_offset_x
+            pos.y = self.video_offset_y
+
+            probed_size = None
+            if not scene_values.resolution and self.media_probe:
+                probed_size = self.media_probe.size(scene_values.visuals_path or scene_values.recording_path)
+
+            if scene_values.resolution:
+                source_width = scene_values.resolution[0]
+                source_height = scene_values.resolution[1]
+            elif probed_size:
+                source_width, source_height = probed_size
+            elif visuals_source:
+                source_width = S.obs_source_get_width(visuals_source)
+                source_height = S.obs_source_get_height(visuals_source)
+            else:
+                source_width = S.obs_source_get_width(video_source)
+                source_height = S.obs_source_get_height(video_source)
 
-        S.obs_data_release(video_settings)
-        S.obs_source_release(video_source)
+            # Fallback if no frame is rendered
+            if source_width == 0 or source_height == 0:
+                source_width = RENDER_WIDTH
+                source_height = RENDER_HEIGHT
+            scale = S.vec2()
+            scale.x = self.target_video_width / source_width
+            scale.y = self.target_video_height / source_height
+            if visuals_source:
+                S.obs_sceneitem_set_pos(visuals_item, pos)
+                S.obs_sceneitem_set_scale(visuals_item, scale)
+            else:
+                S.obs_sceneitem_set_pos(video_item, pos)
+                S.obs_sceneitem_set_scale(video_item, scale)
 
         # Insert overlay
         S.obs_scene_add(scene, S.obs_scene_get_source(self.overlay_scene))
 
         # Load logo
         if scene_values.logo_path:
-            logo_source_name = f"{scene_values.name}_logo"
-            logo_settings = S.obs_data_create()
-            S.obs_data_set_string(logo_settings, "file", scene_values.logo_path)
-            logo_source = S.obs_source_create("image_source", logo_source_name, logo_settings, None)
-            logo_item = S.obs_scene_add(scene, logo_source)
-
-            # From OBS c obs-defs.h
-            align_right = 1 << 1
-            align_bottom = 1 << 3
-
-            alignment = align_right | align_bottom
-            S.obs_sceneitem_set_alignment(logo_item, alignment)
-
-            pos = S.vec2()
-            pos.x = RENDER_WIDTH
-            pos.y = RENDER_HEIGHT
-            S.obs_sceneitem_set_pos(logo_item, pos)
-
-            S.obs_data_release(logo_settings)
-            S.obs_source_release(logo_source)
+            self.add_image(scene, "logo", scene_values.logo_path)
         else:
-            text_source_name = f"{scene_values.name}_text"
-            text_settings = S.obs_data_create()
-            S.obs_data_set_string(text_settings, "text", scene_values.name)
-            font_data_obj = S.obs_data_create_from_json(json.dumps({"face":"Arial","style":"Regular","size":200,"flags":0}))
-            S.obs_data_set_obj(text_settings, "font", font_data_obj)
-            text_source = S.obs_source_create("text_gdiplus", text_source_name, text_settings, None)
-            text_item = S.obs_scene_add(scene, text_source)
-
-            # From OBS c obs-defs.h
-            align_right = 1 << 1
-            align_bottom = 1 << 3
-
-            alignment = align_right | align_bottom
-            S.obs_sceneitem_set_alignment(text_item, alignment)
+            self.add_text_card(scene, scene_values.name)
 
-            pos = S.vec2()
-            pos.x = RENDER_WIDTH
-            pos.y = RENDER_HEIGHT
-            S.obs_sceneitem_set_pos(text_item, pos)
-
-            scale = S.vec2()
-            scale.x = 1
-            scale.y = 1
-            S.obs_sceneitem_set_scale(text_item, scale)
-
-            S.obs_data_release(text_settings)
-            S.obs_source_release(text_source)
-    
         # Setup VJ
         if scene_values.vj:
-            text_source_name = f"{scene_values.name}_vj"
-            text_settings = S.obs_data_create()
-            S.obs_data_set_string(text_settings, "text", "VJ: " + scene_values.vj)
-            font_data_obj = S.obs_data_create_from_json(json.dumps({"face":"Arial","style":"Regular","size":200,"flags":0}))
-            S.obs_data_set_obj(text_settings, "font", font_data_obj)
-            text_source = S.obs_source_create("text_gdiplus", text_source_name, text_settings, None)
-            text_item = S.obs_scene_add(scene, text_source)
+            self.add_text_card(scene, "VJ: " + scene_values.vj)
+
+    def add_text_card(self, scene, text):
+        # Text is pre-rendered to a PNG card, no text source runs at show time
+        if self.text_cards is None:
+            self.text_cards = TextCards(CACHE_DIR.joinpath(CARD_CACHE_DIR), CARD_FONT_FACE, CARD_FONT_SIZE)
+        self.add_image(scene, text, self.text_cards.card(text))
+
+    def add_image(self, scene, label, path):
+        # Logos and cards sit in the bottom right corner
+        with HandleScope(S) as scope:
+            image_source = scope.source(self.shared_sources.acquire("image_source", label, {"file": path}))
+            image_item = S.obs_scene_add(scene, image_source)
 
             # From OBS c obs-defs.h
             align_right = 1 << 1
             align_bottom = 1 << 3
 
             alignment = align_right | align_bottom
-            S.obs_sceneitem_set_alignment(text_item, alignment)
+            S.obs_sceneitem_set_alignment(image_item, alignment)
 
             pos = S.vec2()
             pos.x = RENDER_WIDTH
             pos.y = RENDER_HEIGHT
-            S.obs_sceneitem_set_pos(text_item, pos)
+            S.obs_sceneitem_set_pos(image_item, pos)
+
+    def setup_promo_scene_items(self, scene, promotion: 'ObsPromoScene'):
+        video_source_name = "promo_videos"
+        if promotion.reel_path:
+            # One demuxer and decoder for the whole reel, no reopening between clips
+            source_id = "ffmpeg_source"
+            json_settings = {
+                "local_file": promotion.reel_path,
+                "hw_decode": True,
+                "looping": False,
+                "ffmpeg_options": REEL_FFMPEG_OPTIONS
+            }
+        else:
+            # Load all promos into a single VLC playlist
+            source_id = "vlc_source"
+            json_settings = {"playlist": [], "loop": False}
+            for path in promotion.paths:
+                json_settings["playlist"].append({
+                    "hidden": False,
+                    "value": path
+                })
+        with HandleScope(S) as scope:
+            promo_settings = scope.data(S.obs_data_create_from_json(json.dumps(json_settings)))
+            promo_source = scope.source(S.obs_source_create(source_id, video_source_name, promo_settings, None))
+            promo_item = S.obs_scene_add(scene, promo_source)
+            self.show_steps.append(SequenceStep(S.obs_source_get_name(S.obs_scene_get_source(scene)), video_source_name))
 
             scale = S.vec2()
             scale.x = 1
             scale.y = 1
-            S.obs_sceneitem_set_scale(text_item, scale)
+            S.obs_sceneitem_set_scale(promo_item, scale)
 
-            S.obs_data_release(text_settings)
-            S.obs_source_release(text_source)
+class SourceRegistry:
+    # Identical media (same source type, settings and volume) becomes one OBS source shared by every scene using it.
+    # Sources are named after their content, so reordering or dropping DJs never renames a shared source
+    FILE_KEYS = ("local_file", "file")
+    DECODER_TYPES = ("ffmpeg_source", "vlc_source")
+    NAME_HASH_LENGTH = 10
 
-
-    def setup_promo_scene_items(self, scene, promotion: 'ObsPromoScene'):
-        # Load all promos into a single VLC playlist
-        video_source_name = "promo_videos"
-        json_settings = {"playlist": [], "loop": False}
-        for path in promotion.paths:
-            json_settings["playlist"].append({
-                "hidden": False,
-                "value": path
-            })
-        promo_settings = S.obs_data_create_from_json(json.dumps(json_settings))
-        promo_source = S.obs_source_create("vlc_source", video_source_name, promo_settings, None)
-        promo_item = S.obs_scene_add(scene, promo_source)
-
-        pos = S.vec2()
-        pos.x = 0
-        pos.y = 0
-        scale = S.vec2()
-        scale.x = 1
-        scale.y = 1
-        S.obs_sceneitem_set_scale(promo_item, scale)
-        S.obs_data_release(promo_settings)
-        S.obs_source_release(promo_source)
+    def __init__(self):
+        self.names = {}
+        self.decoders_saved = 0
+        self.textures_saved = 0
+
+    def key(self, source_id, settings, volume):
+        normalized = dict(settings)
+        for file_key in self.FILE_KEYS:
+            if normalized.get(file_key):
+                normalized[file_key] = os.path.normcase(os.path.normpath(normalized[file_key]))
+        return (source_id, json.dumps(normalized, sort_keys=True), volume)
+
+    def source_name(self, label, key):
+        # "<label> [<hash of the key>]", label only makes the name readable in OBS
+        digest = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()[:self.NAME_HASH_LENGTH]
+        return f"{label} [{digest}]"
+
+    def acquire(self, source_id, label, settings, volume=None):
+        # Returns a source reference the caller must release, created on first use
+        key = self.key(source_id, settings, volume)
+        if key in self.names:
+            if source_id in self.DECODER_TYPES:
+                self.decoders_saved += 1
+            else:
+                self.textures_saved += 1
+            return S.obs_get_source_by_name(self.names[key])
+
+        with HandleScope(S) as scope:
+            obs_settings = scope.data(S.obs_data_create_from_json(json.dumps(settings)))
+            name = self.source_name(label, key)
+            source = S.obs_source_create(source_id, name, obs_settings, None)
+        if volume is not None:
+            S.obs_source_set_volume(source, volume)
+        self.names[key] = name
+        return source
+
+    def report(self):
+        return (
+            f"Shared sources: {len(self.names)} unique, "
+            f"{self.decoders_saved} decoders and {self.textures_saved} textures saved"
+        )
 
 class ObsSceneValue:
-    name = None
-    type = None
+    __slots__ = ("name", "type")
 
     def __init__(self, name, type):
         self.name = name
         self.type = type
 
 class ObsDjScene(ObsSceneValue):
-    logo_path = None
-    recording_path = None
-    visuals_path = None
-    stream_url = None
-    resolution = None
-    vj = None
+    __slots__ = ("logo_path", "recording_path", "visuals_path", "stream_url", "resolution", "vj")
 
     def __init__(self, name, logo_path):
-        self.name = name
+        super().__init__(name, "DJ")
         self.logo_path = logo_path
-        self.type = "DJ"
+        self.recording_path = None
+        self.visuals_path = None
+        self.stream_url = None
+        self.resolution = None
+        self.vj = None
     
     def __str__(self) -> str:
         return f"Name: {self.name}, logo: {self.logo_path}, rec: {self.recording_path}, url: {self.stream_url}, vj: {self.vj}"
 
 class ObsPromoScene(ObsSceneValue):
+    __slots__ = ("paths", "reel_path")
+
     def __init__(self, paths):
+        super().__init__(PROMOS_SCENE, "Promos")
         self.paths = paths
-        self.type = "Promos"
-        self.name = PROMOS_SCENE
+        # Concat list of the paths, set when the promos play as one reel
+        self.reel_path = None
 
-class ObsThemeScene(ObsDjScene):
-    path = None
+class ObsThemeScene(ObsSceneValue):
+    __slots__ = ("path",)
 
     def __init__(self, name, type, path):
-        self.name = name
-        self.type = type
+        super().__init__(name, type)
         self.path = path
 
+class ObsHandoffScene(ObsSceneValue):
+    __slots__ = ("next_node", "next_dj")
+
+    def __init__(self, number, next_node, next_dj):
+        super().__init__(HANDOFF_SCENE % (number, next_node, next_dj), "Handoff")
+        self.next_node = next_node
+        self.next_dj = next_dj
+
+class MacroTemplate:
+    """The switch_from_action template compiled to JSON text around four slots.
+
+    A macro is rendered by joining the text parts with the encoded slot values,
+    no copy of the template dict is made per DJ.
+    """
+    SLOTS = {
+        "name": ("name",),
+        "target_scene": ("actions", 0, "sceneSelection", "name"),
+        "media_source": ("conditions", 0, "source", "name"),
+        "scene": ("conditions", 1, "sceneSelection", "name"),
+    }
+    SLOT_PATTERN = re.compile(r'"\\u0000(\w+)\\u0000"')
+
+    def __init__(self, action):
+        template = deepcopy(action)
+        for slot, path in self.SLOTS.items():
+            parent = template
+            for key in path[:-1]:
+                parent = parent[key]
+            parent[path[-1]] = f"\0{slot}\0"
+        # Alternating literal text and slot names, starting and ending with text
+        self.parts = self.SLOT_PATTERN.split(json.dumps(template))
+
+    def render(self, **values):
+        rendered = [self.parts[0]]
+        for index in range(1, len(self.parts), 2):
+            rendered.append(json.dumps(values[self.parts[index]]))
+            rendered.append(self.parts[index + 1])
+        return "".join(rendered)
+
+# Compiled templates by (path, mtime), shared by every run in the OBS session
+macro_templates = {}
+
 class AdvancedSceneSwitchManager:
-    default_action = None
-    djs = []
+    template = None
 
     def __init__(self):
         ass_fp = Path(__file__).absolute().parent.joinpath(ASS_DEFAULT_OBS)
         if not ass_fp.exists():
             raise Exception("Could not find default advanced scene switcher file for macros: " + str(ass_fp))
-        
-        with open(ass_fp, 'r') as f:
-            data = json.load(f)
 
-        self.default_action = data["switch_from_action"]
+        key = (str(ass_fp), ass_fp.stat().st_mtime_ns)
+        if key not in macro_templates:
+            with open(ass_fp, 'r') as f:
+                data = json.load(f)
+            macro_templates[key] = MacroTemplate(data["switch_from_action"])
+        self.template = macro_templates[key]
+        # One entry per DJ of this run
+        self.djs = []
     
     def add_dj(self, dj_name, scene_name, is_live, video_source) -> None:
         self.djs.append([
@@ -538,65 +1237,283 @@ class AdvancedSceneSwitchManager:
             video_source
         ])
     
-    def generate_objects(self, promos_scene, ending_scene):
+    def generate_objects(self, promos_scene_name, ending_scene_name):
         actions = []
         total_actions = len(self.djs)
 
         for index, dj in enumerate(self.djs):
-            print(dj)
+            log.debug("Macro for %s", dj)
             # Skip waiting on media end for live DJs
             if dj[2]:
                 continue
-            action = deepcopy(self.default_action)
-            action["name"] = "switch_from_" + dj[0]
             # Set target scene to switch to
             if index < total_actions - 1:
-                action["actions"][0]["sceneSelection"]["name"] = self.djs[index+1][1]
-            elif promos_scene:
-                action["actions"][0]["sceneSelection"]["name"] = S.obs_source_get_name(S.obs_scene_get_source(promos_scene))
+                target_scene = self.djs[index+1][1]
+            elif promos_scene_name:
+                target_scene = promos_scene_name
             else:
-                action["actions"][0]["sceneSelection"]["name"] = S.obs_source_get_name(S.obs_scene_get_source(ending_scene))
-            # Set conditional media to switch on end
-            action["conditions"][0]["source"]["name"] = dj[3]
-            action["conditions"][1]["sceneSelection"]["name"] = dj[1]
-            actions.append(action)
-            print(f"Added {dj[0]} pointing to scene {action['actions'][0]['sceneSelection']['name']}")
+                target_scene = ending_scene_name
+            # Named after the scene so a re-run produces the same macro names
+            actions.append(self.template.render(
+                name=MACRO_PREFIX + dj[1],
+                target_scene=target_scene,
+                media_source=dj[3],
+                scene=dj[1]
+            ))
+            log.debug("Added %s pointing to scene %s", dj[0], target_scene)
         
-        if promos_scene:
-            promos_action = deepcopy(self.default_action)
-            promos_action["name"] = "switch_from_promos"
-            promos_action["actions"][0]["sceneSelection"]["name"] = S.obs_source_get_name(S.obs_scene_get_source(ending_scene))
-            promos_action["conditions"][0]["source"]["name"] = "promo_videos"
-            promos_action["conditions"][1]["sceneSelection"]["name"] = S.obs_source_get_name(S.obs_scene_get_source(promos_scene))
-            actions.append(promos_action)
-
-        return json.dumps({
-            "macros": actions
-        })
+        if promos_scene_name:
+            actions.append(self.template.render(
+                name=MACRO_PREFIX + "promos",
+                target_scene=ending_scene_name,
+                media_source="promo_videos",
+                scene=promos_scene_name
+            ))
+
+        return '{"macros": [' + ", ".join(actions) + "]}"
+
+    def merge_settings(self, settings, macros_json):
+        # Previously generated macros are replaced, every other macro and setting is kept
+        macros = [
+            macro for macro in settings.get("macros", [])
+            if not str(macro.get("name", "")).startswith(MACRO_PREFIX)
+        ]
+        merged = dict(settings)
+        merged["macros"] = macros + json.loads(macros_json)["macros"]
+        return merged
 
 
 
 hijack = Hijack()
+script_settings = None
+
+def show_progress(text):
+    # Shown in the script properties through the read-only progress field
+    if script_settings:
+        S.obs_data_set_string(script_settings, "_progress", text)
+
+def show_stream_health(text):
+    # Last check of every upcoming live DJ, read-only like the progress field
+    if script_settings:
+        S.obs_data_set_string(script_settings, "_stream_health", text)
 
 # OBS starts
 def script_description():
     print("Shizu has infiltrated OBS, setup your config and she'll take care of the lineup")
 
+def on_frontend_event(event):
+    if event != S.OBS_FRONTEND_EVENT_SCENE_CHANGED:
+        return
+    if hijack.telemetry:
+        hijack.telemetry.refresh()
+    if hijack.decoder_budget:
+        hijack.decoder_budget.refresh()
+    if hijack.read_ahead:
+        hijack.read_ahead.refresh()
+    if hijack.live_streams:
+        hijack.live_streams.refresh()
+    if hijack.sequencer:
+        hijack.sequencer.refresh()
+    if hijack.deferred_changes and hijack.watcher:
+        # The scene that held back the last automatic update left program
+        hijack.deferred_changes = 0
+        hijack.watcher.request_apply()
+
+def script_load(settings):
+    global script_settings
+    script_settings = settings
+    S.obs_frontend_add_event_callback(on_frontend_event)
+
+def script_unload():
+    S.obs_frontend_remove_event_callback(on_frontend_event)
+    if hijack.job:
+        hijack.job.cancel()
+    hijack.stop_scene_watchers()
+    hijack.stop_telemetry()
+    hijack.stop_watch()
+    hijack.close_fetcher()
+
 def update_lineup(props, prop):
+    if hijack.job and hijack.job.running:
+        log.warning("Generation is already running, cancel it first")
+        return True
     hijack.begin()
+    return True
+
+def cancel_lineup(props, prop):
+    if hijack.job:
+        hijack.job.cancel()
+    return True
 
 def script_update(settings):
     hijack.lineup_path = S.obs_data_get_string(settings, "_lineup_path")
+    hijack.lineup_stage = S.obs_data_get_string(settings, "_stage").strip()
+    hijack.lineup_day = S.obs_data_get_string(settings, "_day").strip()
+    hijack.backend_url = S.obs_data_get_string(settings, "_backend_url").strip()
+    hijack.event_name = S.obs_data_get_string(settings, "_event_name").strip()
     hijack.host_paths = S.obs_data_get_bool(settings, "_host_bool")
     hijack.generate_macros = S.obs_data_get_bool(settings, "_ass_bool")
+    hijack.ass_settings_path = S.obs_data_get_string(settings, "_ass_settings_path") or None
+    hijack.output_mode = S.obs_data_get_string(settings, "_output_mode") or OUTPUT_LIVE
+    hijack.check_media = S.obs_data_get_bool(settings, "_check_media_bool")
+    hijack.downscale_images = S.obs_data_get_bool(settings, "_downscale_bool")
+    hijack.max_logo_size = S.obs_data_get_int(settings, "_max_logo_size")
+    hijack.missing_media = S.obs_data_get_string(settings, "_missing_media") or MISSING_MEDIA_SKIP
+    hijack.promo_mode = S.obs_data_get_string(settings, "_promo_mode") or PROMO_PLAYLIST
+    hijack.tick_budget_ms = S.obs_data_get_int(settings, "_tick_budget")
+    hijack.close_idle_media = S.obs_data_get_bool(settings, "_close_idle_bool")
+    hijack.warm_scenes = S.obs_data_get_int(settings, "_warm_scenes")
+    hijack.read_ahead_mb = S.obs_data_get_int(settings, "_read_ahead_mb")
+    hijack.auto_switch = S.obs_data_get_bool(settings, "_auto_switch_bool")
+    hijack.live_set_minutes = S.obs_data_get_int(settings, "_live_set_minutes")
+    hijack.shard_nodes = S.obs_data_get_int(settings, "_shard_nodes")
+    hijack.shard_node = S.obs_data_get_int(settings, "_shard_node")
+    hijack.shard_by = S.obs_data_get_string(settings, "_shard_by") or SHARD_BY_LOAD
+    hijack.prewarm_live = S.obs_data_get_bool(settings, "_prewarm_live_bool")
+    hijack.stream_check_interval = S.obs_data_get_int(settings, "_stream_check_interval")
+    hijack.telemetry_interval = S.obs_data_get_int(settings, "_telemetry_interval")
+    if hijack.telemetry and hijack.telemetry.interval_ms != hijack.telemetry_interval * 1000:
+        hijack.update_telemetry()
+    hijack.debug_handles = S.obs_data_get_bool(settings, "_debug_handles_bool")
+    log.setLevel(S.obs_data_get_string(settings, "_log_level") or "INFO")
+    hijack.watch_lineup = S.obs_data_get_bool(settings, "_watch_bool")
+    hijack.update_watch()
+
+def script_defaults(settings):
+    S.obs_data_set_default_string(settings, "_backend_url", "http://localhost:4004")
+    S.obs_data_set_default_string(settings, "_output_mode", OUTPUT_LIVE)
+    S.obs_data_set_default_bool(settings, "_check_media_bool", True)
+    S.obs_data_set_default_string(settings, "_missing_media", MISSING_MEDIA_SKIP)
+    S.obs_data_set_default_string(settings, "_promo_mode", PROMO_PLAYLIST)
+    S.obs_data_set_default_int(settings, "_shard_nodes", 1)
+    S.obs_data_set_default_int(settings, "_shard_node", 1)
+    S.obs_data_set_default_string(settings, "_shard_by", SHARD_BY_LOAD)
+    S.obs_data_set_default_bool(settings, "_downscale_bool", False)
+    S.obs_data_set_default_int(settings, "_max_logo_size", 500)
+    S.obs_data_set_default_int(settings, "_tick_budget", 5)
+    S.obs_data_set_default_bool(settings, "_close_idle_bool", False)
+    S.obs_data_set_default_int(settings, "_warm_scenes", 1)
+    S.obs_data_set_default_int(settings, "_read_ahead_mb", 0)
+    S.obs_data_set_default_bool(settings, "_prewarm_live_bool", False)
+    S.obs_data_set_default_int(settings, "_stream_check_interval", 0)
+    S.obs_data_set_default_int(settings, "_telemetry_interval", 0)
+    S.obs_data_set_default_string(settings, "_log_level", "INFO")
 
 def script_properties():  # ui
     props = S.obs_properties_create()
     S.obs_properties_add_path(props, "_lineup_path", "Location of the Event:", S.OBS_PATH_FILE, "*.json", None)
+    event_prop = S.obs_properties_add_text(props, "_event_name", "Event Name (fetch from backend)", S.OBS_TEXT_DEFAULT)
+    S.obs_property_set_long_description(
+        event_prop, "Fetches the event's last export from the backend instead of the file above, the last fetched copy is used while the backend is unreachable"
+    )
+    backend_prop = S.obs_properties_add_text(props, "_backend_url", "Backend URL", S.OBS_TEXT_DEFAULT)
+    S.obs_property_set_long_description(backend_prop, "Where the shizu backend is reachable from OBS")
+    stage_prop = S.obs_properties_add_text(props, "_stage", "Stage", S.OBS_TEXT_DEFAULT)
+    S.obs_property_set_long_description(stage_prop, "Only for events covering several stages, empty generates every entry")
+    day_prop = S.obs_properties_add_text(props, "_day", "Day", S.OBS_TEXT_DEFAULT)
+    S.obs_property_set_long_description(day_prop, "Only for events covering several days, empty generates every entry")
     bool_prop = S.obs_properties_add_bool(props, "_host_bool", "Translate to Host Paths");
     S.obs_property_set_long_description(bool_prop, "Leave unchecked if running in Docker")
     S.obs_properties_add_bool(props, "_ass_bool", "Generate OBS Macros");
+    ass_settings_prop = S.obs_properties_add_path(
+        props, "_ass_settings_path", "Scene Switcher Settings Export", S.OBS_PATH_FILE, "*.json", None
+    )
+    S.obs_property_set_long_description(
+        ass_settings_prop, "Optional, generated macros replace the previous run's macros in a copy of these settings"
+    )
+    switch_prop = S.obs_properties_add_bool(props, "_auto_switch_bool", "Switch Scenes Automatically")
+    S.obs_property_set_long_description(
+        switch_prop, "Switches to the next scene as soon as a recording or the promos end, no Advanced Scene Switcher macros needed"
+    )
+    live_set_prop = S.obs_properties_add_int(props, "_live_set_minutes", "Live Set Length (min)", 0, 600, 5)
+    S.obs_property_set_long_description(
+        live_set_prop, "With automatic switching, live sets move on after this long, 0 leaves live sets to be switched by hand"
+    )
+    nodes_prop = S.obs_properties_add_int(props, "_shard_nodes", "OBS Nodes", 1, 32, 1)
+    S.obs_property_set_long_description(
+        nodes_prop, "Splits the DJs across this many OBS instances, each builds only its own scenes. 1 builds the whole event"
+    )
+    S.obs_properties_add_int(props, "_shard_node", "This Node", 1, 32, 1)
+    shard_by_prop = S.obs_properties_add_list(
+        props, "_shard_by", "Split DJs By", S.OBS_COMBO_TYPE_LIST, S.OBS_COMBO_FORMAT_STRING
+    )
+    S.obs_property_list_add_string(shard_by_prop, "Predicted load (consecutive sets)", SHARD_BY_LOAD)
+    S.obs_property_list_add_string(shard_by_prop, "RTMP zone", SHARD_BY_ZONE)
+    watch_prop = S.obs_properties_add_bool(props, "_watch_bool", "Apply Event Changes Automatically")
+    S.obs_property_set_long_description(
+        watch_prop, "Re-applies the event whenever the file is re-exported, the scene on program is updated once it is switched away from"
+    )
+    check_prop = S.obs_properties_add_bool(props, "_check_media_bool", "Check Media Before Generating")
+    S.obs_property_set_long_description(check_prop, "Verifies every logo, recording, visual, promo and theme file exists and is readable")
+    missing_prop = S.obs_properties_add_list(
+        props, "_missing_media", "On Missing Media", S.OBS_COMBO_TYPE_LIST, S.OBS_COMBO_FORMAT_STRING
+    )
+    S.obs_property_list_add_string(missing_prop, "Skip affected scenes", MISSING_MEDIA_SKIP)
+    S.obs_property_list_add_string(missing_prop, "Abort generation", MISSING_MEDIA_ABORT)
+    S.obs_property_list_add_string(missing_prop, "Log a warning", MISSING_MEDIA_WARN)
+    S.obs_property_set_long_description(
+        missing_prop,
+        "Skip (default) leaves out the scenes and promo clips with missing media, abort generates nothing, "
+        "warn only logs the report and generates every scene"
+    )
+    promo_prop = S.obs_properties_add_list(
+        props, "_promo_mode", "Promo Playback", S.OBS_COMBO_TYPE_LIST, S.OBS_COMBO_FORMAT_STRING
+    )
+    S.obs_property_list_add_string(promo_prop, "VLC playlist", PROMO_PLAYLIST)
+    S.obs_property_list_add_string(promo_prop, "Gapless reel (one decoder)", PROMO_REEL)
+    S.obs_property_set_long_description(
+        promo_prop, "The reel plays every promo through one media source, clips must share a codec and size"
+    )
+    downscale_prop = S.obs_properties_add_bool(props, "_downscale_bool", "Downscale Logos and Theme Images")
+    S.obs_property_set_long_description(downscale_prop, "Off by default. Oversized images are resized once into a local cache and loaded from there, they then show at the smaller size")
+    S.obs_properties_add_int(props, "_max_logo_size", "Max Logo Size (px)", 50, 4000, 10)
+    output_prop = S.obs_properties_add_list(
+        props, "_output_mode", "Output", S.OBS_COMBO_TYPE_LIST, S.OBS_COMBO_FORMAT_STRING
+    )
+    S.obs_property_list_add_string(output_prop, "Build scenes in OBS", OUTPUT_LIVE)
+    S.obs_property_list_add_string(output_prop, "Compile scene collection file", OUTPUT_COLLECTION)
+    S.obs_property_set_long_description(
+        output_prop, "Scene collection files are saved next to the event and loaded with Scene Collection > Import"
+    )
+    budget_prop = S.obs_properties_add_int(props, "_tick_budget", "Generation Budget (ms per frame)", 0, 100, 1)
+    S.obs_property_set_long_description(
+        budget_prop, "Scenes are applied a few milliseconds at a time so OBS stays responsive, 0 applies everything at once"
+    )
+    idle_prop = S.obs_properties_add_bool(props, "_close_idle_bool", "Close Idle Media")
+    S.obs_property_set_long_description(
+        idle_prop, "Recordings and visuals only stay open for the program scene and the next scenes in the lineup"
+    )
+    S.obs_properties_add_int(props, "_warm_scenes", "Scenes Kept Open Ahead", 0, 20, 1)
+    read_ahead_prop = S.obs_properties_add_int(props, "_read_ahead_mb", "Read-ahead (MB per file)", 0, 4096, 16)
+    S.obs_property_set_long_description(
+        read_ahead_prop, "The start of the next scene's recording and visuals is read in the background, 0 (the default) disables"
+    )
+    prewarm_prop = S.obs_properties_add_bool(props, "_prewarm_live_bool", "Pre-connect Next Live DJ")
+    S.obs_property_set_long_description(
+        prewarm_prop, "The stream of the next scene's live DJ is connected while the current set plays, so it starts without black"
+    )
+    check_interval_prop = S.obs_properties_add_int(props, "_stream_check_interval", "Live Stream Checks (s)", 0, 600, 5)
+    S.obs_property_set_long_description(
+        check_interval_prop, "Seconds between checks of the next live DJs' streams, 0 disables"
+    )
+    S.obs_properties_add_text(props, "_stream_health", "Live Streams", S.OBS_TEXT_INFO)
+    telemetry_prop = S.obs_properties_add_int(props, "_telemetry_interval", "Show Telemetry (s)", 0, 60, 1)
+    S.obs_property_set_long_description(
+        telemetry_prop, "Seconds between samples of render lag, skipped and dropped frames per scene, 0 disables"
+    )
+    log_prop = S.obs_properties_add_list(
+        props, "_log_level", "Log Level", S.OBS_COMBO_TYPE_LIST, S.OBS_COMBO_FORMAT_STRING
+    )
+    for level in LOG_LEVELS:
+        S.obs_property_list_add_string(log_prop, level.capitalize(), level)
+    S.obs_property_set_long_description(log_prop, "Debug also logs every lineup entry and macro")
+    debug_prop = S.obs_properties_add_bool(props, "_debug_handles_bool", "Audit OBS Handles")
+    S.obs_property_set_long_description(debug_prop, "Logs every OBS object still held when an update finishes")
     S.obs_properties_add_button(
         props, "button", "Update Event", update_lineup
     )
+    S.obs_properties_add_text(props, "_progress", "Progress", S.OBS_TEXT_INFO)
+    S.obs_properties_add_button(
+        props, "cancel_button", "Cancel", cancel_lineup
+    )
     return props
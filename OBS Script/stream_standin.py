@@ -0,0 +1,178 @@
+# Local stand-in for the RTMP zones and HTTP stream endpoints.
+# Serves synthetic media at a fixed bitrate so the live stream checks and pre-connecting can be tried
+# without a DJ streaming, stream keys listed as dead are refused like an RTMP server without a publisher.
+
+import socket
+import socketserver
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from live_streams import (
+    MSG_COMMAND_AMF0, MSG_SET_PEER_BANDWIDTH, MSG_VIDEO, MSG_WINDOW_ACK_SIZE, amf_decode, rtmp_server_handshake,
+)
+
+# Media is sent in slices of this many milliseconds
+SLICE_MS = 100
+WINDOW_ACK_SIZE = 2500000
+
+
+class StreamStandin:
+    """RTMP and HTTP servers on localhost, port 0 picks a free port.
+
+    with StreamStandin(bitrate_kbps=4000, dead_keys={"offline"}) as standin:
+        check_stream(standin.rtmp_url("dj-key", "key0001"))
+    """
+
+    def __init__(self, rtmp_port=0, http_port=0, bitrate_kbps=2500, dead_keys=(), first_byte_delay=0.0, host="127.0.0.1"):
+        self.bitrate_kbps = bitrate_kbps
+        self.dead_keys = set(dead_keys)
+        # Seconds between the play request and the first media, emulates a slow ingest
+        self.first_byte_delay = first_byte_delay
+        self.host = host
+        self.plays = 0
+        standin = self
+
+        class RtmpHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                try:
+                    standin.serve_rtmp(self.request)
+                except OSError:
+                    pass
+
+        class HttpHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                standin.serve_http(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.rtmp_server = socketserver.ThreadingTCPServer((host, rtmp_port), RtmpHandler)
+        self.rtmp_server.daemon_threads = True
+        self.http_server = ThreadingHTTPServer((host, http_port), HttpHandler)
+        self.http_server.daemon_threads = True
+        self.threads = []
+
+    @property
+    def rtmp_port(self):
+        return self.rtmp_server.server_address[1]
+
+    @property
+    def http_port(self):
+        return self.http_server.server_address[1]
+
+    def rtmp_url(self, app, key):
+        return f"rtmp://{self.host}:{self.rtmp_port}/{app}/{key}"
+
+    def http_url(self, key):
+        return f"http://{self.host}:{self.http_port}/live/{key}.flv"
+
+    def start(self):
+        for server in (self.rtmp_server, self.http_server):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in (self.rtmp_server, self.http_server):
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+        return False
+
+    def media_slices(self):
+        # (timestamp ms, payload) every SLICE_MS at the configured bitrate, until the client goes away
+        slice_bytes = max(1, self.bitrate_kbps * 1000 // 8 * SLICE_MS // 1000)
+        payload = b"\x17\x01" + bytes(slice_bytes - 2) if slice_bytes > 2 else bytes(slice_bytes)
+        start = time.perf_counter()
+        index = 0
+        while True:
+            due = start + index * SLICE_MS / 1000
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield index * SLICE_MS, payload
+            index += 1
+
+    def serve_rtmp(self, sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        stream = rtmp_server_handshake(sock)
+        while True:
+            msg_type, stream_id, payload = stream.read_message()
+            if msg_type != MSG_COMMAND_AMF0:
+                continue
+            values = amf_decode(payload)
+            if len(values) < 2:
+                continue
+            name, transaction = values[0], values[1]
+            if name == "connect":
+                stream.write_message(2, MSG_WINDOW_ACK_SIZE, 0, struct.pack(">I", WINDOW_ACK_SIZE))
+                stream.write_message(2, MSG_SET_PEER_BANDWIDTH, 0, struct.pack(">IB", WINDOW_ACK_SIZE, 2))
+                stream.set_chunk_size(4096)
+                stream.command(0, "_result", transaction, {"fmsVer": "FMS/3,0,1,123", "capabilities": 31}, {
+                    "level": "status", "code": "NetConnection.Connect.Success", "description": "Connection succeeded."
+                })
+            elif name == "createStream":
+                stream.command(0, "_result", transaction, None, 1)
+            elif name == "play":
+                key = values[3] if len(values) > 3 else ""
+                if key in self.dead_keys:
+                    stream.command(stream_id, "onStatus", 0, None, {
+                        "level": "error", "code": "NetStream.Play.StreamNotFound", "description": f"{key} is not live"
+                    })
+                    continue
+                self.plays += 1
+                stream.command(stream_id, "onStatus", 0, None, {
+                    "level": "status", "code": "NetStream.Play.Start", "description": f"Started playing {key}"
+                })
+                time.sleep(self.first_byte_delay)
+                for timestamp, media in self.media_slices():
+                    stream.write_message(6, MSG_VIDEO, stream_id, media, timestamp)
+
+    def serve_http(self, handler):
+        key = handler.path.rsplit("/", 1)[-1].split(".")[0]
+        if key in self.dead_keys:
+            handler.send_error(404, f"{key} is not live")
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Type", "video/x-flv")
+        handler.end_headers()
+        time.sleep(self.first_byte_delay)
+        try:
+            for _, media in self.media_slices():
+                handler.wfile.write(media)
+                handler.wfile.flush()
+        except OSError:
+            pass
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve synthetic live streams for the live stream checks")
+    parser.add_argument("--rtmp-port", type=int, default=1935)
+    parser.add_argument("--http-port", type=int, default=8080)
+    parser.add_argument("--bitrate", type=int, default=2500, help="kbps of synthetic media per stream")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds before the first media byte")
+    parser.add_argument("--dead", nargs="*", default=[], help="Stream keys to refuse")
+    args = parser.parse_args()
+
+    standin = StreamStandin(args.rtmp_port, args.http_port, args.bitrate, args.dead, args.delay, host="0.0.0.0")
+    standin.start()
+    print(f"RTMP on rtmp://127.0.0.1:{standin.rtmp_port}/<app>/<key>, HTTP on http://127.0.0.1:{standin.http_port}/live/<key>.flv")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# Show-time render telemetry.
+# OBS render and output counters are sampled on a timer and every sample is tagged with the scene that was
+# on program, so dropped frames can be traced back to the DJ set (visuals, overlay, chat) that caused them.
+# Samples wait in a ring buffer and are appended to one CSV per show, per-scene totals go to a JSON report.
+
+import csv
+import json
+import logging
+import os
+import time
+from collections import deque
+
+from obs_handles import HandleScope
+
+SAMPLE_INTERVAL_MS = 2000
+# Samples buffered between flushes, the oldest are dropped if the report cannot be written
+RING_CAPACITY = 10800
+FLUSH_SAMPLES = 30
+
+# CSV columns, counters are frames since the previous sample
+FIELDS = (
+    "time", "scene", "seconds", "fps", "frame_time_ms", "rendered_frames", "lagged_frames",
+    "encoded_frames", "skipped_frames", "output_frames", "dropped_frames", "active_sources",
+)
+
+log = logging.getLogger("shizu.telemetry")
+
+
+class TelemetrySample:
+    __slots__ = FIELDS
+
+    def __init__(self, **values):
+        for name in FIELDS:
+            setattr(self, name, values.get(name, 0))
+
+    def row(self):
+        return [getattr(self, name) for name in FIELDS]
+
+
+def percent(part, total):
+    return round(part * 100 / total, 2) if total else 0.0
+
+
+class SceneStats:
+    """Totals of every sample taken while a scene was on program."""
+
+    __slots__ = (
+        "scene", "samples", "seconds", "fps_sum", "fps_min", "frame_time_sum", "frame_time_max",
+        "rendered", "lagged", "encoded", "skipped", "output", "dropped", "active_sources_max",
+    )
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.samples = 0
+        self.seconds = 0.0
+        self.fps_sum = 0.0
+        self.fps_min = None
+        self.frame_time_sum = 0.0
+        self.frame_time_max = 0.0
+        self.rendered = 0
+        self.lagged = 0
+        self.encoded = 0
+        self.skipped = 0
+        self.output = 0
+        self.dropped = 0
+        self.active_sources_max = 0
+
+    def add(self, sample):
+        self.samples += 1
+        self.seconds += sample.seconds
+        self.fps_sum += sample.fps
+        self.fps_min = sample.fps if self.fps_min is None else min(self.fps_min, sample.fps)
+        self.frame_time_sum += sample.frame_time_ms
+        self.frame_time_max = max(self.frame_time_max, sample.frame_time_ms)
+        self.rendered += sample.rendered_frames
+        self.lagged += sample.lagged_frames
+        self.encoded += sample.encoded_frames
+        self.skipped += sample.skipped_frames
+        self.output += sample.output_frames
+        self.dropped += sample.dropped_frames
+        self.active_sources_max = max(self.active_sources_max, sample.active_sources)
+
+    def merge(self, other):
+        for name in ("samples", "seconds", "fps_sum", "frame_time_sum", "rendered", "lagged", "encoded", "skipped", "output", "dropped"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        if other.fps_min is not None:
+            self.fps_min = other.fps_min if self.fps_min is None else min(self.fps_min, other.fps_min)
+        self.frame_time_max = max(self.frame_time_max, other.frame_time_max)
+        self.active_sources_max = max(self.active_sources_max, other.active_sources_max)
+
+    def to_dict(self):
+        samples = self.samples or 1
+        return {
+            "scene": self.scene,
+            "samples": self.samples,
+            "seconds": round(self.seconds, 1),
+            "fps_avg": round(self.fps_sum / samples, 2),
+            "fps_min": round(self.fps_min or 0, 2),
+            "frame_time_ms_avg": round(self.frame_time_sum / samples, 3),
+            "frame_time_ms_max": round(self.frame_time_max, 3),
+            "lagged_frames": int(self.lagged),
+            "lagged_percent": percent(self.lagged, self.rendered),
+            "skipped_frames": int(self.skipped),
+            "skipped_percent": percent(self.skipped, self.encoded),
+            "dropped_frames": int(self.dropped),
+            "dropped_percent": percent(self.dropped, self.output),
+            "active_sources_max": int(self.active_sources_max),
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{self.scene}: {self.seconds:.0f} s, lagged {int(self.lagged)} ({percent(self.lagged, self.rendered)}%), "
+            f"skipped {int(self.skipped)} ({percent(self.skipped, self.encoded)}%), "
+            f"dropped {int(self.dropped)} ({percent(self.dropped, self.output)}%)"
+        )
+
+
+class ShowTelemetry:
+    """Samples render, encoder and stream counters every interval_ms and on every program scene change.
+
+    A sample covers the time since the previous one and is tagged with the scene on program at its start.
+    steps (SequenceStep, show order) name the lineup scenes and mark the live DJs in the report.
+    """
+
+    def __init__(self, obs, csv_path, json_path, steps=(), interval_ms=SAMPLE_INTERVAL_MS, capacity=RING_CAPACITY):
+        self.obs = obs
+        self.csv_path = str(csv_path)
+        self.json_path = str(json_path)
+        self.interval_ms = interval_ms
+        self.steps = list(steps)
+        self.ring = deque(maxlen=capacity)
+        self.lost = 0
+        self.stats = {}
+        self.counters = None
+        self.current_scene = None
+        self.last_sample = None
+        self.since_flush = 0
+        self.running = False
+        self.sample_callback = self.sample
+
+    def set_steps(self, steps):
+        # The lineup was re-applied, the sampling and totals carry on
+        self.steps = list(steps)
+
+    def start(self):
+        self.counters = self.read_counters()
+        self.last_sample = time.monotonic()
+        self.current_scene = self.program_scene()
+        self.running = True
+        self.obs.timer_add(self.sample_callback, self.interval_ms)
+        log.info("Telemetry: sampling every %.1f s into %s", self.interval_ms / 1000, self.csv_path)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.sample()
+        self.running = False
+        self.obs.timer_remove(self.sample_callback)
+        self.flush()
+
+    def scene_stats(self, scene):
+        stats = self.stats.get(scene)
+        if stats is None:
+            stats = self.stats[scene] = SceneStats(scene)
+        return stats
+
+    def program_scene(self):
+        with HandleScope(self.obs) as scope:
+            source = scope.source(self.obs.obs_frontend_get_current_scene())
+            return self.obs.obs_source_get_name(source) if source else None
+
+    def read_counters(self):
+        # Cumulative counters, (rendered, lagged, encoded, skipped, output, dropped)
+        video = self.obs.obs_get_video()
+        output_frames = dropped = 0
+        with HandleScope(self.obs) as scope:
+            output = scope.output(self.obs.obs_frontend_get_streaming_output())
+            if output is not None and self.obs.obs_output_active(output):
+                output_frames = self.obs.obs_output_get_total_frames(output)
+                dropped = self.obs.obs_output_get_frames_dropped(output)
+        return (
+            self.obs.obs_get_total_frames(),
+            self.obs.obs_get_lagged_frames(),
+            self.obs.video_output_get_total_frames(video),
+            self.obs.video_output_get_skipped_frames(video),
+            output_frames,
+            dropped,
+        )
+
+    def active_sources(self):
+        with HandleScope(self.obs) as scope:
+            sources = scope.source_list(self.obs.obs_enum_sources()) or []
+            return sum(1 for source in sources if self.obs.obs_source_active(source))
+
+    def sample(self):
+        now = time.monotonic()
+        counters = self.read_counters()
+        # Counters restart with a new stream, the new value is then the count since
+        deltas = [
+            current - previous if current >= previous else current
+            for current, previous in zip(counters, self.counters)
+        ]
+        sample = TelemetrySample(
+            time=time.strftime("%Y-%m-%d %H:%M:%S"),
+            scene=self.current_scene or "",
+            seconds=round(now - self.last_sample, 3),
+            fps=round(self.obs.obs_get_active_fps(), 2),
+            frame_time_ms=round(self.obs.obs_get_average_frame_time_ns() / 1e6, 3),
+            rendered_frames=deltas[0],
+            lagged_frames=deltas[1],
+            encoded_frames=deltas[2],
+            skipped_frames=deltas[3],
+            output_frames=deltas[4],
+            dropped_frames=deltas[5],
+            active_sources=self.active_sources(),
+        )
+        self.counters = counters
+        self.last_sample = now
+        if sample.scene == "":
+            # Nothing on program yet, e.g. OBS still loading the collection
+            return None
+        if len(self.ring) == self.ring.maxlen:
+            self.lost += 1
+        self.ring.append(sample)
+        self.scene_stats(sample.scene).add(sample)
+        self.since_flush += 1
+        if self.since_flush >= FLUSH_SAMPLES:
+            self.flush()
+        return sample
+
+    def refresh(self):
+        # Program scene changed: close the previous scene's sample so it is not charged to the next one
+        scene = self.program_scene()
+        if scene == self.current_scene:
+            return
+        previous = self.current_scene
+        self.sample()
+        self.current_scene = scene
+        if previous in self.stats:
+            log.info("Telemetry: %s", self.stats[previous])
+
+    def flush(self):
+        self.since_flush = 0
+        try:
+            new_file = not os.path.exists(self.csv_path)
+            with open(self.csv_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(FIELDS)
+                while self.ring:
+                    writer.writerow(self.ring[0].row())
+                    self.ring.popleft()
+            self.write_report()
+        except OSError as error:
+            # Kept in the ring until the next flush, lost once it overflows
+            log.warning("Telemetry: could not write the report: %s", error)
+
+    def report(self):
+        # Lineup scenes in show order first, then anything else that was on program (starting soon, manual scenes)
+        lineup = [step.scene for step in self.steps]
+        live = {step.scene for step in self.steps if step.live}
+        order = [scene for scene in lineup if scene in self.stats]
+        order += [scene for scene in self.stats if scene not in order]
+        total = SceneStats("total")
+        scenes = []
+        for scene in order:
+            stats = self.stats[scene]
+            total.merge(stats)
+            scenes.append(dict(stats.to_dict(), lineup=scene in lineup, live=scene in live))
+        return {
+            "interval_ms": self.interval_ms,
+            "samples_lost": self.lost,
+            "total": total.to_dict(),
+            "scenes": scenes,
+        }
+
+    def write_report(self):
+        temp_path = self.json_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        os.replace(temp_path, self.json_path)
@@ -0,0 +1,68 @@
+# The script modules live next to shizu_obs_hijack_script.py and import each other by name, like in OBS
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPT_DIR = Path(__file__).absolute().parent.parent
+sys.path.insert(0, str(SCRIPT_DIR))
+sys.path.insert(0, str(SCRIPT_DIR.joinpath("benchmarks")))
+
+
+@pytest.fixture
+def plan_lineup(tmp_path, monkeypatch):
+    """Plans a lineup dict in memory like Hijack.begin, plan_lineup(lineup, **hijack attributes) -> (hijack, plan).
+
+    Rendered cards and caches go to tmp_path instead of OBS Script/.cache.
+    """
+    import shizu_obs_hijack_script as hijack_script
+    from lineup_model import parse_lineup
+    from scene_collection import SceneCollectionBackend
+
+    monkeypatch.setattr(hijack_script, "CACHE_DIR", tmp_path.joinpath(".cache"))
+
+    def plan(lineup, **attributes):
+        backend = SceneCollectionBackend()
+        hijack_script.set_obs_backend(backend)
+        hijack = hijack_script.Hijack()
+        hijack.ass_manager = hijack_script.AdvancedSceneSwitchManager()
+        for name, value in attributes.items():
+            setattr(hijack, name, value)
+        lineup_data = parse_lineup(json.dumps(lineup))
+        if hijack.shard_nodes > 1:
+            lineup_data = hijack.shard_lineup(lineup_data)
+        lineup_scenes = hijack.init_lineup_data(lineup_data)
+        hijack.render_text_cards(lineup_scenes)
+        hijack.generate_scenes(lineup_scenes)
+        return hijack, backend
+
+    yield plan
+    hijack_script.set_obs_backend(None)
+
+
+@pytest.fixture
+def run_lineup(tmp_path, monkeypatch):
+    """Runs Hijack.begin on a lineup dict written to tmp_path/event.json against a FakeObs.
+
+    run_lineup(lineup, **hijack attributes) -> (hijack, obs), the same FakeObs is used by every call of a test.
+    """
+    import shizu_obs_hijack_script as hijack_script
+    from fake_obs import FakeObs
+
+    monkeypatch.setattr(hijack_script, "CACHE_DIR", tmp_path.joinpath(".cache"))
+    obs = FakeObs()
+    lineup_path = tmp_path.joinpath("event.json")
+
+    def run(lineup, **attributes):
+        lineup_path.write_text(json.dumps(lineup), encoding="utf-8")
+        hijack_script.set_obs_backend(obs)
+        hijack = hijack_script.Hijack()
+        hijack.lineup_path = str(lineup_path)
+        for name, value in attributes.items():
+            setattr(hijack, name, value)
+        hijack.begin()
+        return hijack, obs
+
+    yield run
+    hijack_script.set_obs_backend(None)
@@ -0,0 +1,76 @@
+from decoder_budget import DecoderBudget, scene_media_from_plan
+from fake_obs import FakeObs
+from synthetic_lineup import make_lineup
+
+SCENES = ["DJ 1", "DJ 2", "DJ 3", "DJ 4", "DJ 5"]
+
+
+def budget_obs():
+    # One recording per scene, DJ 1 and DJ 4 share looping visuals. Sources are held by the test
+    obs = FakeObs()
+    scene_media = {}
+    for scene in SCENES:
+        obs.obs_scene_create(scene)
+        obs.obs_source_create("ffmpeg_source", f"{scene} video", None, None)
+        scene_media[scene] = [f"{scene} video"]
+    obs.obs_source_create("ffmpeg_source", "visuals", None, None)
+    scene_media["DJ 1"].append("visuals")
+    scene_media["DJ 4"].append("visuals")
+    return obs, scene_media
+
+
+def closing(obs):
+    return {name for name, source in obs.sources.items() if source.settings.get("close_when_inactive")}
+
+
+def switch(obs, budget, scene):
+    obs.obs_frontend_set_current_scene(obs.scenes[scene].source)
+    budget.refresh()
+
+
+def test_only_media_outside_the_window_closes():
+    obs, scene_media = budget_obs()
+    budget = DecoderBudget(obs, scene_media, warm_scenes=1)
+    switch(obs, budget, "DJ 1")
+    # DJ 1 on program, DJ 2 next, the visuals play on program
+    assert closing(obs) == {"DJ 3 video", "DJ 4 video", "DJ 5 video"}
+    assert all(obs.sources[name].settings["restart_on_activate"] for name in closing(obs))
+
+    switch(obs, budget, "DJ 3")
+    # DJ 1 stays open for the transition out of it, DJ 4 is next. DJ 3 went on program closing,
+    # it is left alone rather than restarted and only closes once it leaves program
+    assert closing(obs) == {"DJ 2 video", "DJ 3 video", "DJ 5 video"}
+    assert budget.open_sources == {"DJ 3 video", "DJ 4 video", "DJ 1 video", "visuals"}
+
+
+def test_sources_on_program_and_unchanged_sources_are_not_updated():
+    obs, scene_media = budget_obs()
+    budget = DecoderBudget(obs, scene_media, warm_scenes=1)
+    switch(obs, budget, "DJ 1")
+    updates = obs.calls["obs_source_update"]
+    assert updates == 3
+
+    # Same window, updating a source reopens its media
+    budget.rebalance("DJ 1")
+    assert obs.calls["obs_source_update"] == updates
+
+    # Only DJ 3 enters the window, the scenes on program and in the transition are not updated
+    switch(obs, budget, "DJ 2")
+    assert closing(obs) == {"DJ 4 video", "DJ 5 video"}
+    assert obs.calls["obs_source_update"] == updates + 1
+
+
+def test_outside_the_lineup_the_start_of_the_show_stays_open():
+    obs, scene_media = budget_obs()
+    obs.obs_scene_create("Starting Soon")
+    budget = DecoderBudget(obs, scene_media, warm_scenes=2)
+    switch(obs, budget, "Starting Soon")
+    assert closing(obs) == {"DJ 4 video", "DJ 5 video"}
+
+
+def test_overlay_media_is_never_budgeted(plan_lineup):
+    _, plan = plan_lineup(make_lineup(8))
+    scene_media = scene_media_from_plan(plan)
+    nested = {item.source.name for scene in plan.scenes.values() for item in scene.items if item.source.id == "scene"}
+    assert nested and not nested & set(scene_media)
+    assert all(plan.sources[name].id == "ffmpeg_source" for names in scene_media.values() for name in names)
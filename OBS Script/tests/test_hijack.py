@@ -0,0 +1,64 @@
+import pytest
+
+from media_probe import MediaProbe
+from synthetic_lineup import make_lineup
+
+
+def test_update_builds_the_lineup_in_obs(run_lineup):
+    lineup = make_lineup(8)
+    hijack, obs = run_lineup(lineup)
+    assert {dj["name"] for dj in lineup["djs"]} <= set(obs.scenes)
+    assert obs.outstanding() == [] and obs.over_released == []
+    assert [step.scene for step in hijack.show_steps][:8] == [dj["name"] for dj in lineup["djs"]]
+
+
+def test_only_djs_without_a_resolution_are_probed(run_lineup, monkeypatch):
+    probed = []
+    probe_all = MediaProbe.probe_all
+    monkeypatch.setattr(MediaProbe, "probe_all", lambda self, paths: probed.extend(paths) or probe_all(self, []))
+    lineup = make_lineup(16)
+    run_lineup(lineup)
+    expected = [
+        dj["visuals_path"] or dj["recording_path"]
+        for dj in lineup["djs"] if not dj["url"] and not dj["resolution"]
+    ]
+    # Live DJs have no file, probe_all skips them
+    assert expected and [path for path in probed if path] == expected
+
+
+def on_disk(tmp_path, value):
+    # The lineup with every docker path pointing at a small file under tmp_path
+    if isinstance(value, dict):
+        return {key: on_disk(tmp_path, item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [on_disk(tmp_path, item) for item in value]
+    if isinstance(value, str) and value.startswith("/var/"):
+        path = tmp_path.joinpath("media", value[len("/var/"):])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"\0" * 16)
+        return str(path)
+    return value
+
+
+def test_missing_media_skips_the_affected_scenes_by_default(run_lineup, tmp_path):
+    lineup = on_disk(tmp_path, make_lineup(8))
+    lineup["djs"][1]["recording_path"] = str(tmp_path.joinpath("media", "gone.mp4"))
+    _, obs = run_lineup(lineup, check_media=True)
+    names = {dj["name"] for dj in lineup["djs"]}
+    assert names - set(obs.scenes) == {lineup["djs"][1]["name"]}
+
+
+def test_missing_media_can_be_only_reported(run_lineup):
+    import shizu_obs_hijack_script as hijack_script
+
+    # None of the synthetic media exists on disk
+    lineup = make_lineup(8)
+    _, obs = run_lineup(lineup, check_media=True, missing_media=hijack_script.MISSING_MEDIA_WARN)
+    assert {dj["name"] for dj in lineup["djs"]} <= set(obs.scenes)
+
+
+def test_missing_media_can_abort(run_lineup):
+    import shizu_obs_hijack_script as hijack_script
+
+    with pytest.raises(Exception, match="missing media"):
+        run_lineup(make_lineup(8), check_media=True, missing_media=hijack_script.MISSING_MEDIA_ABORT)
@@ -0,0 +1,123 @@
+import ntpath
+import os
+import posixpath
+
+import pytest
+
+from host_paths import PathTranslationError, PathTranslator, StatCache, path_pairs
+
+ENV = {
+    "DOCKER_RECORDINGS_PATH": "/var/recordings",
+    "LOCAL_RECORDINGS_PATH": "D:/Shizu/recordings",
+    "DOCKER_GENERIC_VISUALS_PATH": "/var/recordings/visuals",
+    "LOCAL_GENERIC_VISUALS_PATH": "E:/visuals",
+    "DOCKER_LOGOS_PATH": "/var/logos/",
+    "LOCAL_LOGOS_PATH": "C:/Shizu/logos",
+    # No host side, ignored
+    "DOCKER_THEMES_PATH": "/var/themes",
+    "BACKEND_URL": "http://localhost:8000",
+}
+
+
+def test_only_complete_pairs_are_used():
+    assert [name for name, _, _ in path_pairs(ENV)] == ["RECORDINGS", "GENERIC_VISUALS", "LOGOS"]
+
+
+def test_longest_root_wins_and_windows_paths_are_built():
+    translator = PathTranslator(ENV, pathmod=ntpath)
+    assert translator.translate("/var/recordings/visuals/loop.mp4") == "E:\\visuals\\loop.mp4"
+    assert translator.translate("/var/recordings/dj/set.mp4") == "D:\\Shizu\\recordings\\dj\\set.mp4"
+    assert translator.translate("/var/logos/dj.png") == "C:\\Shizu\\logos\\dj.png"
+    # A root only matches whole path components
+    with pytest.raises(PathTranslationError):
+        translator.translate("/var/recordings-old/set.mp4")
+
+
+def test_path_under_no_root_is_an_error():
+    translator = PathTranslator(ENV, pathmod=posixpath)
+    with pytest.raises(PathTranslationError, match="/var/themes/overlay.png"):
+        translator.translate("/var/themes/overlay.png")
+
+
+def test_translations_are_memoized():
+    translator = PathTranslator(ENV, pathmod=posixpath)
+    for _ in range(3):
+        translator.translate("/var/logos/dj.png")
+    assert (translator.hits, translator.misses) == (2, 1)
+
+
+def test_shared_root_resolves_to_the_host_root_holding_the_file(tmp_path):
+    first = tmp_path.joinpath("recordings")
+    second = tmp_path.joinpath("visuals")
+    first.mkdir()
+    second.mkdir()
+    second.joinpath("loop.mp4").write_bytes(b"")
+    env = {
+        "DOCKER_RECORDINGS_PATH": "/var/media",
+        "LOCAL_RECORDINGS_PATH": str(first),
+        "DOCKER_GENERIC_VISUALS_PATH": "/var/media",
+        "LOCAL_GENERIC_VISUALS_PATH": str(second),
+    }
+    translator = PathTranslator(env)
+    assert len(translator) == 1
+    stats = StatCache()
+    assert translator.translate("/var/media/loop.mp4", stats) == str(second.joinpath("loop.mp4"))
+    # Without stats, or when the file is nowhere, the first root
+    assert translator.translate("/var/media/loop.mp4") == str(first.joinpath("loop.mp4"))
+    assert translator.translate("/var/media/missing.mp4", stats) == str(first.joinpath("missing.mp4"))
+
+
+def test_stat_cache_stats_each_path_once(tmp_path, monkeypatch):
+    present = tmp_path.joinpath("set.mp4")
+    present.write_bytes(b"1234")
+    stats = StatCache()
+    calls = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, "stat", lambda path: calls.append(path) or real_stat(path))
+    for _ in range(2):
+        assert stats.stat(str(present)).st_size == 4
+        assert stats.is_file(str(present))
+        assert not stats.is_file(str(tmp_path.joinpath("missing.mp4")))
+    with pytest.raises(FileNotFoundError):
+        stats.stat(str(tmp_path.joinpath("missing.mp4")))
+    assert sorted(calls) == sorted([str(present), str(tmp_path.joinpath("missing.mp4"))])
+    assert len(stats) == 2
+
+
+def write_env(path, values):
+    path.write_text("".join(f"{key}={value}\n" for key, value in values.items()), encoding="utf-8")
+
+
+def test_changed_env_file_is_read_again(tmp_path):
+    from shizu_obs_hijack_script import read_env_file
+
+    path = tmp_path.joinpath(".env")
+    write_env(path, {"DB_PASSWORD": "first", "DOCKER_LOGOS_PATH": "/var/logos"})
+    assert read_env_file(str(path)) == ({"DB_PASSWORD": "first", "DOCKER_LOGOS_PATH": "/var/logos"}, False)
+    assert read_env_file(str(path))[1] is True
+
+    write_env(path, {"DB_PASSWORD": "second!", "DOCKER_LOGOS_PATH": "/var/logos"})
+    assert read_env_file(str(path)) == ({"DB_PASSWORD": "second!", "DOCKER_LOGOS_PATH": "/var/logos"}, False)
+
+    # Same size and the old mtime put back, still a different file
+    stat = os.stat(path)
+    write_env(path, {"DB_PASSWORD": "third!!", "DOCKER_LOGOS_PATH": "/var/logos"})
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    values, cached = read_env_file(str(path))
+    assert values["DB_PASSWORD"] == "third!!" and not cached
+
+
+def test_update_uses_the_changed_env_paths(tmp_path, monkeypatch):
+    import shizu_obs_hijack_script as hijack_script
+
+    path = tmp_path.joinpath(".env")
+    monkeypatch.setattr(hijack_script.Hijack, "env_path", lambda self: path)
+    hijack = hijack_script.Hijack()
+    write_env(path, {"DOCKER_LOGOS_PATH": "/var/logos", "LOCAL_LOGOS_PATH": "/srv/logos"})
+    hijack.parse_env_paths()
+    assert hijack.path_translator.translate("/var/logos/a.png") == os.path.normpath("/srv/logos/a.png")
+
+    write_env(path, {"DOCKER_LOGOS_PATH": "/var/logos", "LOCAL_LOGOS_PATH": "/mnt/shizu/logos"})
+    hijack.parse_env_paths()
+    assert hijack.path_translation_map["LOCAL_LOGOS_PATH"] == "/mnt/shizu/logos"
+    assert hijack.path_translator.translate("/var/logos/a.png") == os.path.normpath("/mnt/shizu/logos/a.png")
@@ -0,0 +1,125 @@
+import socket
+
+import pytest
+
+import shizu_obs_hijack_script as hijack_script
+from backend_standin import BackendStandin
+from lineup_fetch import FetchError, LineupFetcher
+from lineup_model import LineupError
+from synthetic_lineup import make_lineup
+
+
+@pytest.fixture
+def backend(tmp_path):
+    with BackendStandin(tmp_path.joinpath("exports")) as standin:
+        standin.write_export("Summer Fest", make_lineup(4))
+        yield standin
+
+
+@pytest.fixture
+def fetcher(backend, tmp_path):
+    fetcher = LineupFetcher(backend.url, tmp_path.joinpath("cache"), timeout=2.0)
+    yield fetcher
+    fetcher.close()
+
+
+def statuses(backend):
+    return [status for _, _, status in backend.requests]
+
+
+def test_unchanged_export_is_a_304_over_the_same_connection(backend, fetcher):
+    first = fetcher.fetch("Summer Fest")
+    assert (first.status, first.changed, first.offline) == (200, True, False)
+    assert len(first.lineup.djs) == 4
+    assert first.path.read_text(encoding="utf-8").startswith("{")
+
+    second = fetcher.fetch("Summer Fest")
+    assert (second.status, second.changed) == (304, False)
+    # Not parsed again
+    assert second.lineup is first.lineup
+    assert statuses(backend) == [200, 304]
+    assert fetcher.connects == 1 and backend.connections == 1
+
+
+def test_changed_export_is_fetched_again(backend, fetcher):
+    fetcher.fetch("Summer Fest")
+    backend.write_export("Summer Fest", make_lineup(6))
+    result = fetcher.fetch("Summer Fest")
+    assert (result.status, result.changed) == (200, True)
+    assert len(result.lineup.djs) == 6
+
+
+def test_validators_survive_a_new_fetcher(backend, fetcher, tmp_path):
+    fetcher.fetch("Summer Fest")
+    restarted = LineupFetcher(backend.url, tmp_path.joinpath("cache"), timeout=2.0)
+    try:
+        result = restarted.fetch("Summer Fest")
+    finally:
+        restarted.close()
+    assert result.status == 304 and len(result.lineup.djs) == 4
+
+
+def test_unreachable_backend_falls_back_to_the_cache(backend, fetcher):
+    fetcher.fetch("Summer Fest")
+    backend.stop()
+    fetcher.close()
+    result = fetcher.fetch("Summer Fest")
+    assert result.offline and result.status is None and not result.changed
+    assert len(result.lineup.djs) == 4
+
+
+def test_server_error_falls_back_to_the_cache(backend, fetcher):
+    fetcher.fetch("Summer Fest", stage=None)
+    backend.fail_status = 503
+    result = fetcher.fetch("Summer Fest")
+    assert result.offline and len(result.lineup.djs) == 4
+
+
+def test_nothing_cached_and_unreachable_is_an_error(tmp_path):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    fetcher = LineupFetcher(f"http://127.0.0.1:{port}", tmp_path.joinpath("cache"), timeout=1.0)
+    with pytest.raises(FetchError, match="no copy is cached"):
+        fetcher.fetch("Summer Fest")
+
+
+def test_missing_export_is_an_error(fetcher):
+    with pytest.raises(FetchError, match="HTTP 404"):
+        fetcher.fetch("Winter Fest")
+
+
+def test_invalid_export_keeps_the_last_good_copy(backend, fetcher):
+    fetcher.fetch("Summer Fest")
+    broken = make_lineup(5)
+    broken["djs"][2]["name"] = ""
+    backend.write_export("Summer Fest", broken)
+    with pytest.raises(LineupError, match=r"djs\[2\].name"):
+        fetcher.fetch("Summer Fest")
+    backend.fail_status = 503
+    assert len(fetcher.fetch("Summer Fest").lineup.djs) == 4
+
+
+def test_cache_files_do_not_collide(tmp_path):
+    fetcher = LineupFetcher("http://127.0.0.1:1", tmp_path)
+    paths = {fetcher.cache_path(name) for name in ("a/b", "a_b", "a:b", "a b")}
+    assert len(paths) == 4
+    assert all(path.parent == tmp_path and path.name.startswith("a") for path in paths)
+    assert fetcher.meta_path("a/b") != fetcher.meta_path("a_b")
+
+
+def test_fetching_keeps_the_chosen_lineup_file(backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(hijack_script, "CACHE_DIR", tmp_path.joinpath(".cache"))
+    hijack = hijack_script.Hijack()
+    hijack.lineup_path = str(tmp_path.joinpath("chosen.json"))
+    hijack.backend_url = backend.url
+    hijack.event_name = "Summer Fest"
+    try:
+        lineup = hijack.fetch_lineup()
+    finally:
+        hijack.close_fetcher()
+    assert len(lineup.djs) == 4
+    assert hijack.lineup_path == str(tmp_path.joinpath("chosen.json"))
+    assert hijack.lineup_output_path("_profile.json").parent == tmp_path.joinpath(".cache", hijack_script.FETCHED_LINEUP_DIR)
+    hijack.event_name = ""
+    assert hijack.lineup_output_path("_profile.json") == tmp_path.joinpath("chosen_profile.json")
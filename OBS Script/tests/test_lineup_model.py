@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from lineup_model import LineupError, load_lineup, parse_lineup
+
+DJ = {"name": "DJ A", "logo_path": "", "recording_path": "/var/recordings/a.mp4", "visuals_path": "",
+      "resolution": [1920, 1080], "url": "", "vj": ""}
+
+
+def export(djs=(DJ,), promos=(), theme=None, **extra):
+    return json.dumps(dict({"djs": list(djs), "promos": list(promos), "theme": theme or {}}, **extra), indent=2)
+
+
+def test_valid_export():
+    lineup = parse_lineup(export(
+        djs=[DJ, dict(DJ, name="DJ B", recording_path="", url="rtmp://zone-a/dj-key/b", resolution=None)],
+        promos=[{"name": "Promo", "path": "/var/recordings/promo.mp4", "resolution": [1920, 1080]}],
+        theme={"name": "Theme", "overlay": "/var/themes/overlay.png", "video_width": 1530},
+        extra_key_of_a_newer_backend=[1, 2],
+    ))
+    assert [dj.name for dj in lineup.djs] == ["DJ A", "DJ B"]
+    assert lineup.djs[0].resolution == (1920, 1080)
+    assert lineup.djs[1].resolution == () and lineup.djs[1].url.startswith("rtmp://")
+    assert lineup.promos[0].path.endswith("promo.mp4")
+    assert lineup.theme.video_width == 1530 and lineup.theme.video_height is None
+
+
+@pytest.mark.parametrize("text, message, line, column", [
+    ('{"djs": [], "promos": [] "theme": {}}', "expected ',' or '}'", 1, 26),
+    ('{"djs": [}', "Expecting value", 1, 10),
+    ('{"djs": [], "promos": []} extra', "unexpected data after the lineup", 1, 27),
+    ('{"djs": []}', "missing 'promos'", 1, 1),
+    ('[]', "expected '{'", 1, 1),
+])
+def test_malformed_json_is_rejected_with_its_position(text, message, line, column):
+    with pytest.raises(LineupError) as raised:
+        parse_lineup(text, "event.json")
+    assert message in raised.value.message
+    assert (raised.value.line, raised.value.column) == (line, column)
+
+
+@pytest.mark.parametrize("dj, location, message", [
+    (dict(DJ, vj=3), "djs[1].vj", "expected a string, got number"),
+    (dict(DJ, name=""), "djs[1].name", "a DJ needs a name"),
+    (dict(DJ, url="zone-a/dj-key/b"), "djs[1].url", "not a stream URL"),
+    (dict(DJ, resolution=[1920]), "djs[1].resolution", "expected [width, height] in pixels"),
+    (dict(DJ, resolution=[True, 1080]), "djs[1].resolution", "expected [width, height] in pixels"),
+    (dict(DJ, stage=1), "djs[1].stage", "expected a string, got number"),
+    ("DJ C", "djs[1]", "expected an object, got string"),
+])
+def test_invalid_entry_points_at_the_field(dj, location, message):
+    text = export(djs=[DJ, dj])
+    with pytest.raises(LineupError) as raised:
+        parse_lineup(text, "event.json")
+    error = raised.value
+    assert error.location == location and message in error.message
+    # The line of the offending value, past the first entry
+    assert error.line > text.count("\n", 0, text.index('"DJ A"')) + 1
+    assert str(error).startswith(f"event.json:{error.line}:{error.column}: {location}: ")
+
+
+def test_invalid_theme_size():
+    with pytest.raises(LineupError, match=r"theme.chat_width: must be greater than 0"):
+        parse_lineup(export(theme={"name": "Theme", "chat_width": 0}))
+    with pytest.raises(LineupError, match=r"theme.video_width: expected a number, got boolean"):
+        parse_lineup(export(theme={"name": "Theme", "video_width": True}))
+
+
+def test_stage_and_day_selection():
+    djs = [dict(DJ, name="A1", stage="A", day="Sat"), dict(DJ, name="B1", stage="B", day="Sat"),
+           dict(DJ, name="A2", stage="A", day="Sun"), dict(DJ, name="Untagged")]
+    lineup = parse_lineup(export(djs=djs), stage="A", day="Sat")
+    assert [dj.name for dj in lineup.djs] == ["A1", "Untagged"]
+    assert lineup.skipped == 2
+    assert list(lineup.stages) == ["A", "B"] and list(lineup.days) == ["Sat", "Sun"]
+
+
+def test_unselected_entries_are_skipped_without_checks():
+    djs = [dict(DJ, stage="A"), dict(DJ, name="", vj=3, stage="B")]
+    lineup = parse_lineup(export(djs=djs), stage="A")
+    assert len(lineup.djs) == 1 and lineup.skipped == 1
+    # Selected, the same entry is checked
+    with pytest.raises(LineupError, match="djs\\[1\\]"):
+        parse_lineup(export(djs=djs), stage="B")
+
+
+def test_unknown_stage_lists_the_stages_found():
+    with pytest.raises(LineupError, match="stage 'C' not found, the lineup has: A, B"):
+        parse_lineup(export(djs=[dict(DJ, stage="A"), dict(DJ, stage="B")]), stage="C")
+
+
+def test_load_lineup_reads_a_byte_order_mark(tmp_path):
+    path = tmp_path.joinpath("event.json")
+    path.write_text(export(), encoding="utf-8-sig")
+    assert [dj.name for dj in load_lineup(path).djs] == ["DJ A"]
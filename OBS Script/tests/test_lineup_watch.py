@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from fake_obs import FakeObs
+from lineup_model import parse_lineup
+from lineup_watch import LineupWatcher
+from synthetic_lineup import make_lineup
+
+
+def write(path, lineup):
+    path.write_text(json.dumps(lineup), encoding="utf-8")
+
+
+def test_changed_file_is_parsed_and_handed_over(tmp_path):
+    path = tmp_path.joinpath("event.json")
+    write(path, make_lineup(4))
+    changes = []
+    # Polled by hand, no settle time
+    watcher = LineupWatcher(None, str(path), changes.append, settle_ms=0)
+
+    lineup = make_lineup(6)
+    write(path, lineup)
+    watcher.poll()
+    watcher.poll()
+    assert [[dj.name for dj in change.djs] for change in changes] == [[dj["name"] for dj in lineup["djs"]]]
+
+    # Retries of a deferred update hand the same lineup again
+    watcher.request_apply()
+    watcher.poll()
+    assert len(changes) == 2 and changes[1] is changes[0]
+
+
+def test_unparsable_change_waits_for_the_rest_of_the_write(tmp_path):
+    path = tmp_path.joinpath("event.json")
+    write(path, make_lineup(4))
+    changes = []
+    watcher = LineupWatcher(None, str(path), changes.append, settle_ms=0)
+
+    path.write_text(json.dumps(make_lineup(6))[:-40], encoding="utf-8")
+    watcher.poll()
+    watcher.poll()
+    assert changes == []
+
+    write(path, make_lineup(6))
+    watcher.poll()
+    watcher.poll()
+    assert len(changes) == 1
+
+
+def test_update_uses_the_watched_lineup_without_reading_the_file(tmp_path, monkeypatch):
+    import shizu_obs_hijack_script as hijack_script
+
+    monkeypatch.setattr(hijack_script, "CACHE_DIR", tmp_path.joinpath(".cache"))
+    path = tmp_path.joinpath("event.json")
+    lineup = make_lineup(6)
+    write(path, lineup)
+    watched = parse_lineup(path.read_text(encoding="utf-8"), str(path))
+
+    # pytest.fail is not an Exception, lineup_changed does not swallow it
+    monkeypatch.setattr(hijack_script, "load_lineup", lambda *args: pytest.fail("the export was read again"))
+    obs = FakeObs()
+    hijack_script.set_obs_backend(obs)
+    try:
+        hijack = hijack_script.Hijack()
+        hijack.lineup_path = str(path)
+        hijack.lineup_changed(watched)
+    finally:
+        hijack_script.set_obs_backend(None)
+    assert {dj["name"] for dj in lineup["djs"]} <= set(obs.scenes)
@@ -0,0 +1,124 @@
+import socket
+
+from fake_obs import FakeObs
+from live_streams import (
+    PLAYBACK_ALWAYS,
+    PLAYBACK_DEFAULT,
+    LiveStreams,
+    amf_decode,
+    amf_encode,
+    check_stream,
+)
+from stream_standin import StreamStandin
+
+SAMPLE = 0.3
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_amf_round_trip():
+    values = ["play", 4.0, None, {"code": "NetStream.Play.Start", "level": "status", "nested": {"ok": True}}]
+    assert amf_decode(amf_encode(*values)) == values
+
+
+def test_rtmp_live_stream():
+    with StreamStandin(bitrate_kbps=2000) as standin:
+        health = check_stream(standin.rtmp_url("dj-key", "key0001"), sample_seconds=SAMPLE)
+    assert health.reachable and health.live, health.error
+    assert health.error is None
+    assert health.connect_ms is not None and health.first_byte_ms is not None
+    # Paced by the stand-in, allow for scheduling jitter
+    assert 1000 < health.kbps < 3000
+    assert standin.plays == 1
+
+
+def test_rtmp_dead_key_is_not_live():
+    with StreamStandin(dead_keys={"offline"}) as standin:
+        health = check_stream(standin.rtmp_url("dj-key", "offline"), sample_seconds=SAMPLE)
+    assert health.reachable
+    assert not health.live
+    assert "StreamNotFound" in health.error
+    assert standin.plays == 0
+
+
+def test_rtmp_no_media_times_out():
+    with StreamStandin(first_byte_delay=2.0) as standin:
+        health = check_stream(standin.rtmp_url("dj-key", "slow"), sample_seconds=SAMPLE, timeout=0.5)
+    assert health.reachable
+    assert not health.live
+    assert health.error
+
+
+def test_http_live_and_missing_stream():
+    with StreamStandin(bitrate_kbps=1000, dead_keys={"offline"}) as standin:
+        live = check_stream(standin.http_url("key0001"), sample_seconds=SAMPLE)
+        missing = check_stream(standin.http_url("offline"), sample_seconds=SAMPLE)
+    assert live.live and live.kbps > 0, live.error
+    assert missing.reachable and not missing.live
+    assert "404" in missing.error
+
+
+def test_refused_connection_and_unsupported_scheme():
+    refused = check_stream(f"rtmp://127.0.0.1:{free_port()}/dj-key/key0001", timeout=1.0)
+    assert not refused.reachable and refused.error
+    unsupported = check_stream("srt://127.0.0.1:9000")
+    assert unsupported.error == "unsupported scheme srt"
+    assert str(unsupported).startswith("DOWN")
+
+
+def live_obs(scene_names):
+    obs = FakeObs()
+    scene_streams = {}
+    for index, name in enumerate(scene_names):
+        scene = obs.obs_scene_create(name)
+        source = obs.obs_source_create("vlc_source", f"{name} live", None, None)
+        obs.obs_scene_add(scene, source)
+        scene_streams[name] = [(source.name, f"rtmp://127.0.0.1/dj-key/key{index}")]
+    return obs, scene_streams
+
+
+def playback(obs, source_name):
+    return obs.sources[source_name].settings.get("playback_behavior", PLAYBACK_DEFAULT)
+
+
+def test_prewarm_connects_only_the_next_live_scene():
+    obs, scene_streams = live_obs(["DJ A", "DJ B", "DJ C"])
+    obs.obs_frontend_set_current_scene(obs.scenes["DJ A"].source)
+    # The scenes and sources created above stay held like in a live OBS
+    held = len(obs.outstanding())
+    streams = LiveStreams(obs, scene_streams, prewarm=True, interval_ms=0)
+    streams.start()
+    assert playback(obs, "DJ B live") == PLAYBACK_ALWAYS
+    assert playback(obs, "DJ C live") == PLAYBACK_DEFAULT
+
+    obs.obs_frontend_set_current_scene(obs.scenes["DJ B"].source)
+    streams.refresh()
+    assert playback(obs, "DJ C live") == PLAYBACK_ALWAYS
+    # On program or in the outgoing transition, never restarted
+    assert playback(obs, "DJ B live") == PLAYBACK_ALWAYS
+    assert obs.timers == []
+    streams.close()
+    assert len(obs.outstanding()) == held
+
+
+def test_health_checks_run_from_the_timer():
+    with StreamStandin(dead_keys={"key1"}) as standin:
+        obs, scene_streams = live_obs(["DJ A", "DJ B"])
+        for index, name in enumerate(scene_streams):
+            source = scene_streams[name][0][0]
+            scene_streams[name] = [(source, standin.rtmp_url("dj-key", f"key{index}"))]
+        reports = []
+        streams = LiveStreams(obs, scene_streams, prewarm=False, interval_ms=1000, on_report=reports.append)
+        streams.start()
+        for future in list(streams.pending.values()):
+            future.result(timeout=10)
+        obs.run_timers()
+        streams.close()
+    assert obs.timers == []
+    assert streams.health[standin.rtmp_url("dj-key", "key0")].live
+    assert not streams.health[standin.rtmp_url("dj-key", "key1")].live
+    assert reports and "DJ B: NO MEDIA" in reports[-1]
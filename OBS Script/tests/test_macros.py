@@ -0,0 +1,80 @@
+import json
+from copy import deepcopy
+
+import pytest
+
+
+@pytest.fixture
+def hijack_script():
+    import shizu_obs_hijack_script
+
+    return shizu_obs_hijack_script
+
+
+def template_action(hijack_script):
+    with open(hijack_script.Path(hijack_script.__file__).parent.joinpath(hijack_script.ASS_DEFAULT_OBS)) as f:
+        return json.load(f)["switch_from_action"]
+
+
+def test_render_fills_every_slot_and_keeps_the_rest(hijack_script):
+    action = template_action(hijack_script)
+    original = deepcopy(action)
+    template = hijack_script.MacroTemplate(action)
+    values = {
+        "name": "switch_from_DJ \"Quotes\"",
+        "target_scene": "Ünïcode \\ scene",
+        "media_source": "DJ A_video",
+        "scene": "DJ A",
+    }
+    rendered = json.loads(template.render(**values))
+
+    expected = deepcopy(original)
+    for slot, path in hijack_script.MacroTemplate.SLOTS.items():
+        parent = expected
+        for key in path[:-1]:
+            parent = parent[key]
+        parent[path[-1]] = values[slot]
+    assert rendered == expected
+    # The template dict is not modified, and renders are independent
+    assert action == original
+    other = json.loads(template.render(**dict(values, scene="DJ B")))
+    assert other["conditions"][1]["sceneSelection"]["name"] == "DJ B"
+    assert rendered["conditions"][1]["sceneSelection"]["name"] == "DJ A"
+
+
+def test_render_needs_every_slot(hijack_script):
+    template = hijack_script.MacroTemplate(template_action(hijack_script))
+    with pytest.raises(KeyError):
+        template.render(name="x", target_scene="y", media_source="z")
+
+
+def test_macros_chain_the_lineup(hijack_script):
+    manager = hijack_script.AdvancedSceneSwitchManager()
+    manager.add_dj("A", "DJ A", False, "DJ A_video")
+    manager.add_dj("B", "DJ B", True, "")
+    manager.add_dj("C", "DJ C", False, "DJ C_video")
+    macros = json.loads(manager.generate_objects("Promotional Videos", "Ending"))["macros"]
+    # Live DJs get no macro, the last set switches to the promos and the promos to the ending
+    assert [macro["name"] for macro in macros] == ["switch_from_DJ A", "switch_from_DJ C", "switch_from_promos"]
+    assert [macro["actions"][0]["sceneSelection"]["name"] for macro in macros] == ["DJ B", "Promotional Videos", "Ending"]
+
+
+def test_merge_replaces_generated_macros_and_keeps_the_rest(hijack_script):
+    manager = hijack_script.AdvancedSceneSwitchManager()
+    manager.add_dj("A", "DJ A", False, "DJ A_video")
+    generated = manager.generate_objects("", "Ending")
+    settings = {
+        "interval": 300,
+        "macros": [
+            {"name": "user macro"},
+            {"name": "switch_from_DJ Z"},
+            {"name": "switch_from_DJ A", "stale": True},
+        ],
+    }
+    merged = manager.merge_settings(settings, generated)
+    assert merged["interval"] == 300
+    assert [macro["name"] for macro in merged["macros"]] == ["user macro", "switch_from_DJ A"]
+    assert "stale" not in merged["macros"][1]
+    # The loaded settings are left as they were
+    assert len(settings["macros"]) == 3
+    assert manager.merge_settings({}, generated)["macros"] == json.loads(generated)["macros"]
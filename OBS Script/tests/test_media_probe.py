@@ -0,0 +1,105 @@
+import os
+import struct
+
+import media_probe
+from media_probe import MediaProbe, probe_file
+
+
+def box(box_type, payload=b""):
+    return struct.pack(">I4s", 8 + len(payload), box_type.encode("latin-1")) + payload
+
+
+def mp4_file(width=1920, height=1080, timescale=1000, duration=90500, mdat_size=256 * 1024):
+    # ftyp, a large mdat, then moov: what a recorder that never ran faststart writes
+    mvhd = box("mvhd", struct.pack(">B3xIIII", 0, 0, 0, timescale, duration) + bytes(80))
+    tkhd = box("tkhd", bytes(76) + struct.pack(">II", 1280 << 16, 720 << 16))
+    hdlr = box("hdlr", bytes(8) + b"vide" + bytes(12))
+    # Visual sample entry, coded size at offset 32 of the entry
+    entry = struct.pack(">I4s", 86, b"avc1") + bytes(24) + struct.pack(">HH", width, height) + bytes(50)
+    stsd = box("stsd", struct.pack(">II", 0, 1) + entry)
+    trak = box("trak", tkhd + box("mdia", hdlr + box("minf", box("stbl", stsd))))
+    return box("ftyp", b"isom" + bytes(4)) + box("mdat", bytes(mdat_size)) + box("moov", mvhd + trak)
+
+
+def element(element_id, payload):
+    # 8 byte size, valid for every element
+    return element_id + bytes([0x01]) + len(payload).to_bytes(7, "big") + payload
+
+
+def mkv_file(width=1280, height=720, duration_ms=90500.0):
+    info = element(b"\x2a\xd7\xb1", (1000000).to_bytes(3, "big")) + element(b"\x44\x89", struct.pack(">f", duration_ms))
+    video = element(b"\xb0", width.to_bytes(2, "big")) + element(b"\xba", height.to_bytes(2, "big"))
+    track = element(b"\x83", b"\x01") + element(b"\x86", b"V_VP9") + element(b"\xe0", video)
+    segment = (
+        element(b"\x15\x49\xa9\x66", info)
+        + element(b"\x16\x54\xae\x6b", element(b"\xae", track))
+        + element(b"\x1f\x43\xb6\x75", bytes(64))
+    )
+    return element(b"\x1a\x45\xdf\xa3", element(b"\x42\x82", b"webm")) + element(b"\x18\x53\x80\x67", segment)
+
+
+def write(tmp_path, name, data):
+    path = tmp_path.joinpath(name)
+    path.write_bytes(data)
+    return str(path)
+
+
+def no_fallbacks(monkeypatch):
+    # Only the header parsers, whatever PIL or ffprobe would make of the bytes
+    monkeypatch.setattr(media_probe, "probe_image", lambda path: 1 / 0)
+    monkeypatch.setattr(media_probe, "probe_ffprobe", lambda path: None)
+
+
+def test_mp4_with_moov_at_the_end(tmp_path, monkeypatch):
+    no_fallbacks(monkeypatch)
+    info = probe_file(write(tmp_path, "set.mp4", mp4_file()))
+    # Coded size wins over the tkhd display size
+    assert info == {"width": 1920, "height": 1080, "duration": 90.5, "codec": "h264"}
+
+
+def test_matroska_duration_and_video_track(tmp_path, monkeypatch):
+    no_fallbacks(monkeypatch)
+    info = probe_file(write(tmp_path, "set.webm", mkv_file()))
+    assert info == {"width": 1280, "height": 720, "duration": 90.5, "codec": "vp9"}
+
+
+def test_truncated_files_are_unknown(tmp_path, monkeypatch):
+    no_fallbacks(monkeypatch)
+    mp4 = mp4_file()
+    assert probe_file(write(tmp_path, "cut.mp4", mp4[:len(mp4) - 200])) is None
+    assert probe_file(write(tmp_path, "no_moov.mp4", mp4[:300 * 1024 // 2])) is None
+    mkv = mkv_file()
+    assert probe_file(write(tmp_path, "cut.webm", mkv[:60])) is None
+
+
+def test_unknown_container(tmp_path, monkeypatch):
+    no_fallbacks(monkeypatch)
+    assert probe_file(write(tmp_path, "set.ts", b"\x47" + bytes(187) * 4)) is None
+    assert probe_file(write(tmp_path, "empty.mp4", b"")) is None
+
+
+def test_cache_is_reused_until_size_or_mtime_change(tmp_path, monkeypatch):
+    probed = []
+    monkeypatch.setattr(media_probe, "probe_file", lambda path: probed.append(path) or media_probe.media_info(1, 1))
+    path = write(tmp_path, "set.mp4", mp4_file())
+    cache_path = tmp_path.joinpath("cache", "probe.json")
+
+    probe = MediaProbe(cache_path)
+    probe.probe(path)
+    probe.probe(path)
+    probe.save()
+    assert len(probed) == 1 and (probe.hits, probe.misses) == (1, 1)
+
+    # Persisted, a new run does not read the file
+    assert MediaProbe(cache_path).probe(path) == media_probe.media_info(1, 1)
+    assert len(probed) == 1
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    MediaProbe(cache_path).probe(path)
+    assert len(probed) == 2
+
+    write(tmp_path, "set.mp4", mp4_file(mdat_size=1024))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    MediaProbe(cache_path).probe(path)
+    assert len(probed) == 3
@@ -0,0 +1,99 @@
+import logging
+
+import pytest
+from fake_obs import FakeObs
+from obs_handles import HandleScope, tracker
+from scene_collection import SceneCollectionBackend
+
+
+@pytest.fixture
+def audit():
+    tracker.reset()
+    tracker.enabled = True
+    yield tracker
+    tracker.enabled = False
+    tracker.reset()
+
+
+@pytest.fixture
+def script_log(caplog, monkeypatch):
+    # The script's "shizu" logger only writes to stdout, let caplog see it. Imported first, the import configures it
+    import shizu_obs_hijack_script  # noqa: F401
+
+    monkeypatch.setattr(logging.getLogger("shizu"), "propagate", True)
+    caplog.set_level(logging.INFO, logger="shizu")
+    return caplog
+
+
+def test_scope_releases_everything_on_exit(audit):
+    obs = FakeObs()
+    released = []
+    obs.obs_data_release = lambda data: released.append(data) or FakeObs.obs_data_release(obs, data)
+    with HandleScope(obs) as scope:
+        settings = scope.data(obs.obs_data_create())
+        scene = scope.scene(obs.obs_scene_create("Scene"))
+        other = scope.data(obs.obs_data_create())
+        assert scope.data(None) is None
+    # Newest first
+    assert released == [other, settings]
+    assert scene.refs == 0 and obs.outstanding() == [] and obs.over_released == []
+    assert (audit.adopted, audit.released, audit.held) == (3, 3, {})
+
+
+def test_scope_releases_when_an_exception_is_raised(audit):
+    obs = FakeObs()
+    with pytest.raises(RuntimeError, match="generation failed"):
+        with HandleScope(obs) as scope:
+            scope.data(obs.obs_data_create())
+            scope.scene(obs.obs_scene_create("Scene"))
+            raise RuntimeError("generation failed")
+    assert obs.outstanding() == [] and audit.held == {}
+
+
+def test_failing_release_does_not_keep_the_others(audit, script_log):
+    obs = FakeObs()
+    obs.obs_scene_release = lambda scene: 1 / 0
+    with HandleScope(obs) as scope:
+        settings = scope.data(obs.obs_data_create())
+        scope.scene(obs.obs_scene_create("Scene"))
+    assert settings.refs == 0
+    assert "Could not release scene handle" in script_log.text
+
+
+def test_release_and_detach_before_exit(audit):
+    obs = FakeObs()
+    with HandleScope(obs) as scope:
+        released = scope.data(obs.obs_data_create())
+        kept = scope.data(obs.obs_data_create())
+        scope.release(released)
+        assert released.refs == 0
+        assert scope.detach(kept) is kept
+        with pytest.raises(ValueError):
+            scope.release(kept)
+    # Detached handles belong to the caller
+    assert obs.outstanding() == [kept] and audit.held == {}
+    obs.obs_data_release(kept)
+
+
+def test_audit_reports_a_leaked_handle(audit):
+    obs = FakeObs()
+    # A scope that never exits, e.g. kept on an object by mistake
+    scope = HandleScope(obs)
+    scope.data(obs.obs_data_create())
+    report = audit.report()
+    assert report.startswith("Handles: 1 adopted, 0 released, 1 outstanding")
+    assert "data acquired at" in report and "test_obs_handles.py" in report
+    scope.release_all()
+    assert audit.report().startswith("Handles: 1 adopted, 1 released, 0 outstanding")
+
+
+def test_hijack_audit_lists_planning_handles_taken_without_a_scope(audit, script_log):
+    import shizu_obs_hijack_script as hijack_script
+
+    hijack = hijack_script.Hijack()
+    hijack.plan = SceneCollectionBackend()
+    hijack.plan.obs_data_create()
+    hijack.plan.obs_scene_create("Leaked scene")
+    hijack.audit_handles()
+    assert "Planning handles never released: 2" in script_log.text
+    assert "obs_scene Leaked scene" in script_log.text
@@ -0,0 +1,62 @@
+import json
+import time
+
+import pytest
+from fake_obs import FakeObs
+from profiler import InstrumentedObs, Profiler
+
+
+class SlowObs(FakeObs):
+    def obs_source_update(self, source, settings):
+        time.sleep(0.01)
+        super().obs_source_update(source, settings)
+
+
+def test_calls_are_forwarded_unchanged():
+    backend = FakeObs()
+    obs = InstrumentedObs(backend, Profiler())
+    settings = obs.obs_data_create_from_json(json.dumps({"file": "logo.png"}))
+    source = obs.obs_source_create("image_source", "Logo", settings, None)
+    assert source is backend.sources["Logo"]
+    assert obs.obs_source_get_name(source) == "Logo"
+    assert obs.obs_get_source_by_name("missing") is None
+    # Constants and helpers pass straight through, not counted
+    assert obs.OBS_FRONTEND_EVENT_SCENE_CHANGED == backend.OBS_FRONTEND_EVENT_SCENE_CHANGED
+    assert isinstance(obs.vec2(), type(backend.vec2()))
+    obs.obs_data_release(settings)
+    obs.obs_source_release(source)
+    assert backend.over_released == []
+
+
+def test_errors_are_raised_and_still_timed():
+    profiler = Profiler()
+    obs = InstrumentedObs(FakeObs(), profiler)
+    with pytest.raises(AttributeError):
+        obs.obs_source_get_name(object())
+    assert profiler.calls["obs_source_get_name"][0] == 1
+
+
+def test_calls_and_phases_are_timed():
+    profiler = Profiler()
+    backend = SlowObs()
+    obs = InstrumentedObs(backend, profiler)
+    with profiler.phase("generate_scenes"):
+        settings = obs.obs_data_create()
+        source = obs.obs_source_create("image_source", "Logo", settings, None)
+        obs.obs_source_update(source, settings)
+        obs.obs_source_update(source, settings)
+    with profiler.phase("generate_scenes"):
+        obs.obs_data_release(settings)
+
+    count, seconds = profiler.calls["obs_source_update"]
+    assert count == 2 and seconds >= 0.02
+    assert profiler.obs_calls == 5
+    phase = profiler.phases["generate_scenes"]
+    assert phase["count"] == 2 and phase["obs_calls"] == 5
+    assert phase["wall_ms"] >= phase["obs_ms"] >= 20
+
+    report = profiler.to_dict()
+    # Slowest first
+    assert next(iter(report["obs_calls"])) == "obs_source_update"
+    assert report["obs_calls"]["obs_source_update"]["count"] == 2
+    obs.obs_source_release(source)
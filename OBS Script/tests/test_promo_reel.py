@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from promo_reel import REEL_HEADER, check_reel, quote, read_concat_list, unquote, write_concat_list
+
+
+@pytest.mark.parametrize("path", [
+    "/var/recordings/promo.mp4",
+    "/var/recordings/it's a promo.mp4",
+    "/var/recordings/promo'",
+    "'promo.mp4",
+    "/var/recordings/two''quotes.mp4",
+    "C:\\Shizu\\recordings\\promo (final).mp4",
+])
+def test_quote_round_trip(path):
+    quoted = quote(path)
+    assert quoted.startswith("'") and quoted.endswith("'")
+    assert unquote(quoted) == path
+
+
+def test_concat_list_round_trip(tmp_path):
+    clips = [tmp_path.joinpath(name) for name in ("a.mp4", "it's b.mp4", "c'")]
+    list_path = tmp_path.joinpath("event_promos.ffconcat")
+    assert write_concat_list(list_path, [str(clip) for clip in clips], {str(clips[0]): 12.5})
+    lines = list_path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == REEL_HEADER
+    assert lines[2] == "duration 12.500000"
+    assert read_concat_list(list_path) == [os.path.abspath(clip) for clip in clips]
+
+
+def test_unchanged_concat_list_is_not_rewritten(tmp_path):
+    list_path = tmp_path.joinpath("event_promos.ffconcat")
+    assert write_concat_list(list_path, ["/promos/a.mp4", "/promos/b.mp4"])
+    mtime = list_path.stat().st_mtime_ns
+    assert not write_concat_list(list_path, ["/promos/a.mp4", "/promos/b.mp4"])
+    assert list_path.stat().st_mtime_ns == mtime
+    assert write_concat_list(list_path, ["/promos/b.mp4", "/promos/a.mp4"])
+
+
+class Probe:
+    def __init__(self, infos):
+        self.infos = infos
+
+    def probe(self, path):
+        return self.infos.get(path)
+
+
+def test_reel_takes_the_most_common_format():
+    probe = Probe({
+        "a.mp4": {"codec": "h264", "width": 1920, "height": 1080},
+        "b.mp4": {"codec": "h264", "width": 1920, "height": 1080},
+        "c.mp4": {"codec": "hevc", "width": 1920, "height": 1080},
+        "d.mp4": {"codec": "h264", "width": 1280, "height": 720},
+    })
+    report = check_reel(["a.mp4", "b.mp4", "c.mp4", "d.mp4", "e.mp4"], probe)
+    assert report.reel_format == ("h264", 1920, 1080)
+    assert report.clips == ["a.mp4", "b.mp4"]
+    assert report.problems == {
+        "c.mp4": "hevc instead of h264",
+        "d.mp4": "1280x720 instead of 1920x1080",
+        "e.mp4": "could not be probed",
+    }
+    assert not report.ok
+
+
+def test_reel_without_any_probed_clip():
+    report = check_reel(["a.mp4"], Probe({}))
+    assert report.reel_format is None and report.clips == []
+    assert "no reel format" in str(report)
@@ -0,0 +1,74 @@
+import read_ahead
+from fake_obs import FakeObs
+from read_ahead import ReadAhead, started_media_from_plan
+from synthetic_lineup import make_lineup
+
+
+def test_next_scene_is_warmed_again_during_a_long_set(tmp_path, monkeypatch):
+    files = {}
+    for scene in ("DJ A", "DJ B"):
+        path = tmp_path.joinpath(scene.replace(" ", "_") + ".mp4")
+        path.write_bytes(b"\0" * 4096)
+        files[scene] = [str(path)]
+    warmed = []
+    warm_file = read_ahead.warm_file
+    monkeypatch.setattr(read_ahead, "warm_file", lambda path, budget: warmed.append(path) or warm_file(path, budget))
+
+    obs = FakeObs()
+    for scene in files:
+        obs.obs_scene_create(scene)
+    obs.obs_frontend_set_current_scene(obs.scenes["DJ A"].source)
+    reader = ReadAhead(obs, {}, files, 1024, rewarm_ms=60000)
+    reader.start()
+    reader.pending.result()
+    assert warmed == files["DJ B"]
+
+    # Checked ten times per interval, so a file is read again at most a tenth of the interval late
+    assert obs.timer_intervals[reader.rewarm_callback] == 6000
+
+    # Still fresh, nothing is read
+    obs.run_timers()
+    assert warmed == files["DJ B"]
+
+    # A set later, the next scene is read again
+    reader.warmed = {path: warmed_at - 60 for path, warmed_at in reader.warmed.items()}
+    obs.run_timers()
+    reader.pending.result()
+    assert warmed == files["DJ B"] * 2
+    assert reader.bytes_read == 2 * 1024
+
+    reader.close()
+    assert obs.timers == []
+
+
+def test_first_frame_waits_for_the_restarted_recording():
+    obs = FakeObs()
+    for scene in ("DJ A", "DJ B"):
+        obs.obs_scene_create(scene)
+    # Created and never released, the test holds them
+    obs.obs_source_create("ffmpeg_source", "DJ B_video", None, None)
+    # The recording played before (rehearsal), OBS restarts it on activate
+    obs.sources["DJ B_video"].media_time = 30000
+    reader = ReadAhead(obs, {"DJ A": [], "DJ B": ["DJ B_video"]}, {"DJ A": [], "DJ B": []}, 1024, rewarm_ms=0)
+    obs.obs_frontend_set_current_scene(obs.scenes["DJ B"].source)
+    reader.refresh()
+
+    obs.run_timers()
+    assert "DJ B" not in reader.first_frames
+    obs.sources["DJ B_video"].media_time = 0
+    obs.run_timers()
+    assert "DJ B" not in reader.first_frames
+    obs.sources["DJ B_video"].media_time = 40
+    obs.run_timers()
+    assert reader.first_frames["DJ B"][0] is not None
+    assert obs.timers == []
+    reader.close()
+
+
+def test_looping_visuals_are_not_timed(plan_lineup):
+    _, plan = plan_lineup(make_lineup(8))
+    started = started_media_from_plan(plan)
+    timed = {name for names in started.values() for name in names}
+    assert timed and not any(plan.sources[name].settings.get("looping") for name in timed)
+    looping = {name for name, source in plan.sources.items() if source.settings.get("looping")}
+    assert looping and not timed & looping
@@ -0,0 +1,170 @@
+from fake_obs import FakeObs
+from reconcile import LineupReconciler, ReconcileJob
+from synthetic_lineup import make_lineup
+
+CHANGES = ("sources_created", "sources_updated", "sources_removed", "scenes_created", "scenes_removed",
+           "items_added", "items_removed", "scenes_restacked")
+
+
+def changes(stats):
+    return {name: stats[name] for name in CHANGES if stats[name]}
+
+
+def test_first_apply_builds_the_plan(plan_lineup):
+    _, plan = plan_lineup(make_lineup(8))
+    live = FakeObs()
+    stats = LineupReconciler(live, plan).apply()
+    owned_scenes = [name for name in plan.scenes if name not in plan.placeholder_scenes]
+    assert stats["sources_created"] == len(plan.sources)
+    assert stats["scenes_created"] == len(owned_scenes)
+    assert set(owned_scenes) <= set(live.scenes)
+    for name in owned_scenes:
+        # Placeholder scenes the user has not created are left out
+        planned = [item.source.name for item in plan.scenes[name].items]
+        existing = [source for source in planned if source in live.sources or source in live.scenes]
+        assert [item.source.name for item in live.scenes[name].items] == existing
+    assert live.outstanding() == [] and live.over_released == []
+
+
+def test_empty_collection_gets_every_planned_item(plan_lineup):
+    # FakeObs destroys a source on its last release like libobs, created sources must survive until added
+    _, plan = plan_lineup(make_lineup(8))
+    live = FakeObs()
+    stats = LineupReconciler(live, plan).apply()
+    assert stats["items_missing"] == len(
+        [item for scene in plan.scenes.values() for item in scene.items if item.source.name in plan.placeholder_scenes]
+    )
+    for name, scene in plan.scenes.items():
+        if name in plan.placeholder_scenes:
+            continue
+        planned = [item.source.name for item in scene.items if item.source.name not in plan.placeholder_scenes]
+        assert [item.source.name for item in live.scenes[name].items] == planned, name
+    assert set(plan.sources) <= set(live.sources)
+    assert live.outstanding() == [] and live.over_released == []
+
+
+def test_unused_sources_are_destroyed_on_release():
+    live = FakeObs()
+    settings = live.obs_data_create()
+    source = live.obs_source_create("image_source", "Logo", settings, None)
+    live.obs_data_release(settings)
+    scene = live.obs_scene_create("Scene")
+    item = live.obs_scene_add(scene, source)
+    live.obs_source_release(source)
+    # The scene item keeps it alive
+    assert "Logo" in live.sources
+    live.obs_sceneitem_remove(item)
+    assert "Logo" not in live.sources and live.destroyed_sources == 1
+    live.obs_scene_release(scene)
+
+
+def test_reapplying_the_same_lineup_touches_nothing(plan_lineup):
+    _, plan = plan_lineup(make_lineup(8))
+    live = FakeObs()
+    LineupReconciler(live, plan).apply()
+    calls_after_first = dict(live.calls)
+
+    _, replanned = plan_lineup(make_lineup(8))
+    stats = LineupReconciler(live, replanned).apply()
+    assert changes(stats) == {}
+    assert stats["sources_unchanged"] == len(plan.sources)
+    # Nothing was created, updated or moved the second time
+    for call in ("obs_source_create", "obs_source_update", "obs_scene_add", "obs_sceneitem_set_pos", "obs_source_remove"):
+        assert live.calls[call] == calls_after_first.get(call, 0), call
+    assert live.outstanding() == [] and live.over_released == []
+
+
+def test_one_changed_dj_only_updates_their_sources(plan_lineup):
+    lineup = make_lineup(8)
+    _, plan = plan_lineup(lineup)
+    live = FakeObs()
+    LineupReconciler(live, plan).apply()
+
+    lineup["djs"][1]["recording_path"] = "/var/recordings/dj_0001_set_v2.mp4"
+    _, replanned = plan_lineup(lineup)
+    stats = LineupReconciler(live, replanned).apply()
+    assert changes(stats) == {"sources_updated": 1}
+    updated = [source for source in live.sources.values() if source.settings.get("local_file", "").endswith("_v2.mp4")]
+    assert len(updated) == 1
+
+
+def test_dropped_dj_is_removed(plan_lineup):
+    lineup = make_lineup(8)
+    _, plan = plan_lineup(lineup)
+    live = FakeObs()
+    LineupReconciler(live, plan).apply()
+    dropped = lineup["djs"].pop(2)["name"]
+
+    _, replanned = plan_lineup(lineup)
+    stats = LineupReconciler(live, replanned).apply()
+    assert stats["scenes_removed"] >= 1
+    assert not any(dropped in name for name in live.scenes)
+    assert set(live.scenes) >= {name for name in replanned.scenes if name not in replanned.placeholder_scenes}
+
+
+def test_program_scene_changes_are_deferred(plan_lineup):
+    lineup = make_lineup(8)
+    _, plan = plan_lineup(lineup)
+    live = FakeObs()
+    LineupReconciler(live, plan).apply()
+    program = next(name for name in live.scenes if "DJ 0001" in name)
+    recording = next(item.source.name for item in live.scenes[program].items if item.source.id == "ffmpeg_source")
+    before = dict(live.sources[recording].settings)
+
+    lineup["djs"][1]["recording_path"] = "/var/recordings/dj_0001_set_v2.mp4"
+    _, replanned = plan_lineup(lineup)
+    stats = LineupReconciler(live, replanned, protected_scenes=[program]).apply()
+    assert stats["sources_deferred"] == 1
+    assert stats["sources_updated"] == 0
+    assert live.sources[recording].settings == before
+
+
+def test_reordered_djs_keep_their_shared_sources(plan_lineup):
+    lineup = make_lineup(8)
+    _, plan = plan_lineup(lineup)
+    live = FakeObs()
+    LineupReconciler(live, plan).apply()
+    shared = {name: source for name, source in live.sources.items() if name.endswith("]")}
+    assert shared
+
+    lineup["djs"].reverse()
+    _, replanned = plan_lineup(lineup)
+    LineupReconciler(live, replanned).apply()
+    # Named after their content, not the first DJ using them, so the same OBS sources are kept
+    assert {name: source for name, source in live.sources.items() if name.endswith("]")} == shared
+
+
+def test_job_keeps_sources_alive_across_ticks(plan_lineup):
+    _, plan = plan_lineup(make_lineup(8))
+    live = FakeObs()
+    reconciler = LineupReconciler(live, plan)
+    done = []
+    job = ReconcileJob(reconciler, 0, on_done=lambda job, error: done.append(error))
+    job.start()
+    ticks = 0
+    while job.running:
+        live.run_timers()
+        ticks += 1
+    # One step per tick, every source was created ticks before its items were added
+    assert done == [None] and ticks == job.total_steps + 1
+    for name, scene in plan.scenes.items():
+        if name not in plan.placeholder_scenes:
+            planned = [item.source.name for item in scene.items if item.source.name not in plan.placeholder_scenes]
+            assert [item.source.name for item in live.scenes[name].items] == planned, name
+    assert reconciler.held == []
+    assert live.outstanding() == [] and live.over_released == []
+
+
+def test_cancelled_job_releases_and_removes_its_sources(plan_lineup):
+    _, plan = plan_lineup(make_lineup(8))
+    live = FakeObs()
+    reconciler = LineupReconciler(live, plan)
+    job = ReconcileJob(reconciler, 0)
+    job.start()
+    for _ in range(len(plan.sources) // 2):
+        live.run_timers()
+    assert reconciler.held
+    job.cancel()
+    assert job.state == "Cancelled" and reconciler.held == []
+    assert not set(plan.sources) & set(live.sources)
+    assert live.outstanding() == [] and live.over_released == []
@@ -0,0 +1,115 @@
+from fake_obs import FakeObs
+from reconcile import LineupReconciler
+from sequencer import MEDIA_ENDED_SIGNAL, SequenceStep, Sequencer
+from synthetic_lineup import make_lineup
+
+
+def show(steps, live_minutes=0):
+    # Scenes with one media source each, the sequencer refreshed on scene changes like on_frontend_event
+    obs = FakeObs()
+    for step in steps:
+        scene = obs.obs_scene_create(step.scene)
+        if step.media_source:
+            obs.obs_scene_add(scene, obs.obs_source_create("ffmpeg_source", step.media_source, None, None))
+    sequencer = Sequencer(obs, steps, live_minutes)
+    obs.obs_frontend_add_event_callback(lambda event: sequencer.refresh())
+    return obs, sequencer
+
+
+def switch(obs, scene):
+    obs.obs_frontend_set_current_scene(obs.scenes[scene].source)
+
+
+STEPS = [
+    SequenceStep("DJ A", "DJ A recording"),
+    SequenceStep("DJ B", live=True),
+    SequenceStep("DJ C", "DJ C recording"),
+    SequenceStep("Promotional Videos", "Promo playlist"),
+    SequenceStep("Ending"),
+]
+
+
+def test_media_end_switches_to_the_next_scene():
+    obs, sequencer = show(STEPS)
+    switch(obs, "DJ C")
+    sequencer.start()
+    obs.emit_signal("DJ C recording", MEDIA_ENDED_SIGNAL)
+    assert obs.current_scene == "Promotional Videos"
+    obs.emit_signal("Promo playlist", MEDIA_ENDED_SIGNAL)
+    assert obs.current_scene == "Ending"
+    assert sequencer.switches == 2
+
+
+def test_media_ending_off_program_is_ignored():
+    obs, sequencer = show(STEPS)
+    switch(obs, "DJ A")
+    sequencer.start()
+    obs.emit_signal("DJ C recording", MEDIA_ENDED_SIGNAL)
+    assert obs.current_scene == "DJ A"
+    assert sequencer.switches == 0
+
+
+def test_live_set_hands_off_after_its_length():
+    obs, sequencer = show(STEPS, live_minutes=45)
+    switch(obs, "DJ A")
+    sequencer.start()
+    obs.emit_signal("DJ A recording", MEDIA_ENDED_SIGNAL)
+    assert obs.current_scene == "DJ B"
+    assert obs.timers == [sequencer.handoff_callback]
+    obs.run_timers()
+    assert obs.current_scene == "DJ C"
+    # One-shot
+    assert obs.timers == []
+
+
+def test_switching_away_by_hand_cancels_the_hand_off():
+    obs, sequencer = show(STEPS, live_minutes=45)
+    switch(obs, "DJ B")
+    sequencer.start()
+    assert sequencer.handoff_scene == "DJ B"
+    switch(obs, "DJ A")
+    assert obs.timers == []
+    obs.run_timers()
+    assert obs.current_scene == "DJ A"
+
+
+def test_live_sets_wait_for_a_manual_switch_without_a_length():
+    obs, sequencer = show(STEPS, live_minutes=0)
+    switch(obs, "DJ B")
+    sequencer.start()
+    assert obs.timers == []
+
+
+def test_stop_disconnects_every_signal():
+    obs, sequencer = show(STEPS)
+    switch(obs, "DJ A")
+    sequencer.start()
+    assert len(sequencer.connections) == 3
+    sequencer.stop()
+    assert all(not any(source.signals.values()) for source in obs.sources.values())
+    obs.emit_signal("DJ A recording", MEDIA_ENDED_SIGNAL)
+    assert obs.current_scene == "DJ A"
+
+
+def test_planned_show_runs_in_lineup_order(plan_lineup):
+    # Recordings only, every set ends on its own
+    lineup = make_lineup(6)
+    for index, dj in enumerate(lineup["djs"]):
+        dj["url"] = ""
+        dj["recording_path"] = dj["recording_path"] or f"/var/recordings/dj_{index:04d}_set.mp4"
+    hijack, plan = plan_lineup(lineup)
+    live = FakeObs()
+    LineupReconciler(live, plan).apply()
+    steps = hijack.show_steps
+    sequencer = Sequencer(live, steps)
+    live.obs_frontend_add_event_callback(lambda event: sequencer.refresh())
+    switch(live, steps[0].scene)
+    sequencer.start()
+
+    visited = [live.current_scene]
+    for step in steps:
+        if step.media_source:
+            live.emit_signal(step.media_source, MEDIA_ENDED_SIGNAL)
+            visited.append(live.current_scene)
+    assert visited == [step.scene for step in steps]
+    assert live.outstanding() == []
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+import shizu_obs_hijack_script as hijack_script
+from decoder_budget import scene_media_from_plan
+from lineup_model import parse_lineup
+from sharding import SHARD_BY_LOAD, SHARD_BY_ZONE, contiguous_split, plan_shards
+from synthetic_lineup import make_lineup
+
+RTMP_SERVER = "rtmp://rtmp-%s.server/dj-key/%s"
+
+
+def zone_lineup(zones):
+    # One DJ per entry of zones, a zone streams live, None plays a 1080p recording
+    lineup = make_lineup(0, promo_count=1)
+    for index, zone in enumerate(zones):
+        dj = {"name": f"DJ {index}", "logo_path": "", "recording_path": "", "visuals_path": "",
+              "resolution": [], "url": "", "vj": ""}
+        if zone:
+            dj["url"] = RTMP_SERVER % (zone, f"key{index}")
+        else:
+            dj["recording_path"] = f"/var/recordings/dj_{index}.mp4"
+            dj["resolution"] = [1920, 1080]
+        lineup["djs"].append(dj)
+    return lineup
+
+
+def djs_of(lineup):
+    return parse_lineup(json.dumps(lineup)).djs
+
+
+def check_handoffs(plan):
+    # Every change of owner between two consecutive sets is one hand-off of the outgoing node, and nothing else is
+    expected = {}
+    for position in range(len(plan.djs) - 1):
+        node, next_node = plan.owner[position], plan.owner[position + 1]
+        if node != next_node:
+            index = plan.shard(node).positions.index(position)
+            expected.setdefault(node, {})[index] = (next_node, plan.djs[position + 1].name)
+    for shard in plan.shards:
+        assert plan.handoffs(shard.node) == expected.get(shard.node, {})
+
+
+def test_contiguous_split_keeps_the_heaviest_run_light():
+    assert contiguous_split([1, 1, 1, 1, 4], 2) == [(0, 4), (4, 5)]
+    assert contiguous_split([2, 2, 2, 2], 2) == [(0, 2), (2, 4)]
+    assert contiguous_split([1, 1, 1], 3) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_by_load_hands_off_once_per_boundary():
+    djs = djs_of(make_lineup(20))
+    plan = plan_shards(djs, 3, SHARD_BY_LOAD)
+    positions = [position for shard in plan.shards for position in shard.positions]
+    assert positions == list(range(20))
+    check_handoffs(plan)
+    assert [len(plan.handoffs(node)) for node in (1, 2, 3)] == [1, 1, 0]
+    assert plan.starts_show(1) and plan.ends_show(3)
+    assert not plan.starts_show(2) and not plan.ends_show(2)
+
+
+def test_by_zone_follows_the_stream_zone():
+    zones = ["zone-a", None, "zone-b", "zone-b", None, None, "zone-a"]
+    plan = plan_shards(djs_of(zone_lineup(zones)), 2, SHARD_BY_ZONE, RTMP_SERVER, {"zone-a": "A", "zone-b": "B"})
+    for position, zone in enumerate(zones):
+        if zone:
+            assert plan.owner[position] == (1 if zone == "zone-a" else 2)
+    # The recordings between two live sets stay on one node
+    assert plan.owner[4] == plan.owner[5]
+    check_handoffs(plan)
+    assert plan.shard(1).zones == ["zone-a"] and plan.shard(2).zones == ["zone-b"]
+
+
+def test_node_lineups_split_theme_and_promos():
+    lineup = parse_lineup(json.dumps(make_lineup(9)))
+    plan = plan_shards(lineup.djs, 3)
+    first, middle, last = (plan.node_lineup(node, lineup) for node in (1, 2, 3))
+    assert first.theme.starting and not first.theme.ending and not first.promos
+    assert not middle.theme.starting and not middle.theme.ending and not middle.promos
+    assert not last.theme.starting and last.theme.ending and last.promos == lineup.promos
+    assert [dj.name for node in (first, middle, last) for dj in node.djs] == [dj.name for dj in lineup.djs]
+
+
+def test_every_handoff_gets_its_own_scene_in_show_order(plan_lineup):
+    # Zone A live, a recording, zone B, zone A again: node 1 hands off twice
+    zones = ["zone-a", None, "zone-b", "zone-a", "zone-b"]
+    lineup = zone_lineup(zones)
+    plan = plan_shards(djs_of(lineup), 2, SHARD_BY_ZONE)
+    handoffs = plan.handoffs(1)
+    assert len(handoffs) == 2
+
+    hijack, collection = plan_lineup(lineup, shard_nodes=2, shard_node=1, shard_by=SHARD_BY_ZONE)
+    steps = [step.scene for step in hijack.show_steps]
+    handoff_scenes = [name for name in steps if name.startswith("! - Handoff")]
+    assert handoff_scenes == [
+        hijack_script.HANDOFF_SCENE % (number, next_node, next_dj)
+        for number, (next_node, next_dj) in enumerate(handoffs.values(), 1)
+    ]
+    # Each hand-off directly follows the node's last set before the gap
+    for index, name in zip(handoffs, handoff_scenes):
+        dj_name = plan.djs[plan.shard(1).positions[index]].name
+        assert steps[steps.index(name) - 1] == dj_name
+    # Scene order, sequencer and decoder budget agree on every position, node 1 does not end the show
+    order = [name for name in scene_media_from_plan(collection) if name in steps]
+    assert not plan.ends_show(1)
+    assert order == steps and steps[-1] == handoff_scenes[-1]
+
+    # The node with the last DJ plays the promos and switches to the ending
+    last, _ = plan_lineup(lineup, shard_nodes=2, shard_node=2, shard_by=SHARD_BY_ZONE)
+    steps = [step.scene for step in last.show_steps]
+    assert plan.ends_show(2)
+    assert steps[-3:] == [plan.djs[-1].name, last.promos_scene_name, hijack_script.ENDING_SCENE]
+
+
+def test_node_without_djs_is_an_error(plan_lineup):
+    with pytest.raises(Exception, match="has no DJs"):
+        plan_lineup(make_lineup(2), shard_nodes=3, shard_node=3)
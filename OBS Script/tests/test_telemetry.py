@@ -0,0 +1,54 @@
+import csv
+import json
+
+from fake_obs import FakeObs
+from sequencer import SequenceStep
+from telemetry import FIELDS, ShowTelemetry
+
+
+def show_obs():
+    obs = FakeObs()
+    for name in ("DJ A", "DJ B"):
+        obs.obs_scene_create(name)
+    obs.obs_frontend_set_current_scene(obs.scenes["DJ A"].source)
+    return obs
+
+
+def run_show(obs, csv_path, json_path):
+    telemetry = ShowTelemetry(obs, csv_path, json_path, [SequenceStep("DJ A"), SequenceStep("DJ B", live=True)], 1000)
+    telemetry.start()
+    obs.advance_frames(600, lagged=6)
+    obs.run_timers()
+    obs.obs_frontend_set_current_scene(obs.scenes["DJ B"].source)
+    telemetry.refresh()
+    obs.advance_frames(300, skipped=3)
+    telemetry.stop()
+    return telemetry
+
+
+def test_samples_are_charged_to_the_program_scene(tmp_path):
+    obs = show_obs()
+    telemetry = run_show(obs, tmp_path / "show_1.csv", tmp_path / "show_1.json")
+    assert obs.timers == []
+    with open(telemetry.csv_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == list(FIELDS)
+    assert [row["scene"] for row in rows] == ["DJ A", "DJ A", "DJ B"]
+    report = json.loads((tmp_path / "show_1.json").read_text())
+    scenes = {scene["scene"]: scene for scene in report["scenes"]}
+    assert [scene["scene"] for scene in report["scenes"]] == ["DJ A", "DJ B"]
+    assert scenes["DJ A"]["lagged_frames"] == 6 and scenes["DJ A"]["skipped_frames"] == 0
+    assert scenes["DJ B"]["skipped_frames"] == 3 and scenes["DJ B"]["live"]
+    assert report["total"]["lagged_frames"] == 6
+
+
+def test_a_new_show_never_reads_earlier_reports(tmp_path):
+    run_show(show_obs(), tmp_path / "show_1.csv", tmp_path / "show_1.json")
+    obs = show_obs()
+    telemetry = run_show(obs, tmp_path / "show_2.csv", tmp_path / "show_2.json")
+    report = json.loads((tmp_path / "show_2.json").read_text())
+    # Only this show's frames, the first report is left as it was
+    assert report["total"]["lagged_frames"] == 6
+    assert len(telemetry.stats) == 2
+    with open(tmp_path / "show_1.csv", newline="", encoding="utf-8") as f:
+        assert len(list(csv.DictReader(f))) == 3
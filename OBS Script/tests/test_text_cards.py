@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import text_cards
+from text_cards import TextCards
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    # Texts actually rasterised
+    rendered = []
+    render_card = text_cards.render_card
+    monkeypatch.setattr(
+        text_cards, "render_card", lambda text, *args: rendered.append(text) or render_card(text, *args)
+    )
+    return rendered
+
+
+def test_card_is_a_transparent_png_of_the_text(tmp_path):
+    cards = TextCards(tmp_path, "Arial", 40)
+    with Image.open(cards.card("DJ Shizu")) as image:
+        assert image.format == "PNG" and image.mode == "RGBA"
+        assert image.width > image.height > 0
+        # Transparent corners, white text
+        assert image.getpixel((0, 0))[3] == 0
+        assert image.getextrema()[3] == (0, 255)
+
+
+def test_cached_card_is_reused(tmp_path, renders):
+    path = TextCards(tmp_path, "Arial", 40).card("DJ Shizu")
+    written = os.stat(path).st_mtime_ns
+
+    # Another run, the file is not rendered again
+    cards = TextCards(tmp_path, "Arial", 40)
+    assert cards.card("DJ Shizu") == path
+    assert (cards.rendered, cards.reused) == (0, 1)
+    assert renders == ["DJ Shizu"]
+    assert os.stat(path).st_mtime_ns == written
+
+
+def test_changed_text_or_size_renders_a_new_card(tmp_path, renders):
+    cards = TextCards(tmp_path, "Arial", 40)
+    first = cards.card("DJ Shizu")
+    renamed = cards.card("DJ Shizu b2b Hijack")
+    assert renamed != first
+    bigger = TextCards(tmp_path, "Arial", 60).card("DJ Shizu")
+    assert bigger not in (first, renamed)
+    assert renders == ["DJ Shizu", "DJ Shizu b2b Hijack", "DJ Shizu"]
+    with Image.open(first) as small, Image.open(bigger) as large:
+        assert large.height > small.height
+
+
+def test_lineup_texts_are_rendered_once(tmp_path, renders):
+    cards = TextCards(tmp_path, "Arial", 40, workers=4)
+    paths = cards.render_all(["DJ A", "VJ: B", "DJ A", "", "DJ C"])
+    assert list(paths) == ["DJ A", "VJ: B", "DJ C"]
+    assert sorted(renders) == ["DJ A", "DJ C", "VJ: B"]
+    assert cards.card("DJ A") == paths["DJ A"] and cards.rendered == 3
@@ -0,0 +1,79 @@
+# Pre-rendered text cards for DJ names and VJ credits.
+# Text is rasterised once to a transparent PNG and cached by text, font and size, OBS then only
+# shows a plain image instead of running a text source (GDI+ text is Windows only and costly).
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Tried in order, the first font PIL can load is used
+FONT_FILES = {
+    "Arial": ["arial.ttf", "Arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"],
+}
+TEXT_COLOR = (255, 255, 255, 255)
+PADDING = 8
+
+
+def find_font_file(face):
+    from PIL import ImageFont
+
+    for font_file in FONT_FILES.get(face, [face]):
+        try:
+            ImageFont.truetype(font_file, 10)
+            return font_file
+        except OSError:
+            continue
+    return None
+
+
+def render_card(text, font_file, size, dest_path):
+    from PIL import Image, ImageDraw, ImageFont
+
+    if font_file:
+        font = ImageFont.truetype(font_file, size)
+    else:
+        font = ImageFont.load_default(size)
+    left, top, right, bottom = font.getbbox(text)
+    image = Image.new("RGBA", (right - left + PADDING * 2, bottom - top + PADDING * 2), (0, 0, 0, 0))
+    ImageDraw.Draw(image).text((PADDING - left, PADDING - top), text, font=font, fill=TEXT_COLOR)
+    temp_path = f"{dest_path}.{threading.get_ident()}.tmp"
+    image.save(temp_path, "PNG")
+    os.replace(temp_path, dest_path)
+
+
+class TextCards:
+    def __init__(self, cache_dir, face, size, workers=None):
+        self.cache_dir = Path(cache_dir)
+        self.face = face
+        self.size = size
+        self.workers = workers or os.cpu_count() or 4
+        self.font_file = find_font_file(face)
+        self.paths = {}
+        self.rendered = 0
+        self.reused = 0
+
+    def card_path(self, text):
+        key = "\0".join([text, self.face, str(self.font_file), str(self.size)])
+        return self.cache_dir.joinpath(hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + ".png")
+
+    def card(self, text):
+        # Path of the card for text, rendered on first use
+        if text in self.paths:
+            return self.paths[text]
+        path = self.card_path(text)
+        if path.exists():
+            self.reused += 1
+        else:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            render_card(text, self.font_file, self.size, str(path))
+            self.rendered += 1
+        self.paths[text] = str(path)
+        return self.paths[text]
+
+    def render_all(self, texts):
+        # Warm the cache for a whole lineup, Pillow releases the GIL while drawing
+        unique_texts = list(dict.fromkeys(text for text in texts if text))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return dict(zip(unique_texts, pool.map(self.card, unique_texts)))
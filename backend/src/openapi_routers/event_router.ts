@@ -29,6 +29,8 @@ import {
   ILineupDjObject,
   IUpdateEventDjObject,
 } from "../types";
+import { fileNotFoundError } from "../errors";
+import { EXPORT_ROOT } from "../file_helpers";
 
 export const eventRouter = Router();
 
@@ -575,6 +577,32 @@ eventRouter.post("/:eventName/export", async (req, res) => {
   res.send();
 });
 
+/**
+ * Returns the last export of an event, as written by POST /:eventName/export.
+ *  Conditional requests (If-None-Match / If-Modified-Since) are answered with 304.
+ *
+ * @param {string} req.params.eventName - The unique identifier/name of the exported event.
+ * @returns {Promise<void>} Sends the exported event JSON, or error if the event was not exported.
+ */
+eventRouter.get("/:eventName/export", async (req, res) => {
+  // root keeps the event name from escaping the export directory
+  res.sendFile(
+    `${req.params.eventName}.json`,
+    { root: EXPORT_ROOT, dotfiles: "deny" },
+    (send_error) => {
+      if (!send_error || res.headersSent) return;
+      const error = fileNotFoundError(
+        `Event ${req.params.eventName} has not been exported`,
+      );
+      res.status(404);
+      res.send({
+        errorType: error.name,
+        message: error.message,
+      });
+    },
+  );
+});
+
 /**
  * Retrieves a summary of an event including its details, DJs, promotions,
  *  theme and associated files for export purposes.
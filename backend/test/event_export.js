@@ -0,0 +1,94 @@
+const chai = require("chai");
+const chaiHttp = require("chai-http");
+const express = require("express");
+const fs = require("fs");
+const os = require("os");
+const path = require("path");
+
+// file_helpers refuses to load without the docker paths, exports are served from a temporary directory
+const export_dir = fs.mkdtempSync(path.join(os.tmpdir(), "shizu-export-"));
+for (const name of ["LOGOS", "RECORDINGS", "THEMES", "IMPORT", "GENERIC_VISUALS"]) {
+  process.env[`DOCKER_${name}_PATH`] = process.env[`DOCKER_${name}_PATH`] || export_dir;
+}
+process.env.DOCKER_EXPORT_PATH = export_dir;
+
+const { eventRouter } = require("../src/openapi_routers/event_router");
+
+chai.use(chaiHttp);
+chai.should();
+
+const app = express();
+app.use("/openapi/event", eventRouter);
+
+const lineup = { djs: [{ name: "DJ A", recording_path: "/var/recordings/a.mp4" }], promos: [], theme: {} };
+fs.writeFileSync(path.join(export_dir, "Summer Fest.json"), JSON.stringify(lineup));
+
+describe("API GET /openapi/event/:eventName/export", () => {
+  let etag;
+
+  it("it should return the export with a validator", done => {
+    chai
+      .request(app)
+      .get("/openapi/event/Summer%20Fest/export")
+      .end((err, res) => {
+        res.should.have.status(200);
+        res.should.be.json;
+        res.should.have.header("etag");
+        res.should.have.header("last-modified");
+        res.body.should.be.deep.equal(lineup);
+        etag = res.header["etag"];
+        done();
+      });
+  });
+
+  it("it should return 304 on If-None-Match with the same ETag", done => {
+    chai
+      .request(app)
+      .get("/openapi/event/Summer%20Fest/export")
+      .set("If-None-Match", etag)
+      .end((err, res) => {
+        res.should.have.status(304);
+        done();
+      });
+  });
+
+  it("it should return 200 again once the export changed", done => {
+    const changed = { ...lineup, promos: [{ name: "Promo", path: "/var/recordings/promo.mp4" }] };
+    fs.writeFileSync(path.join(export_dir, "Summer Fest.json"), JSON.stringify(changed));
+    chai
+      .request(app)
+      .get("/openapi/event/Summer%20Fest/export")
+      .set("If-None-Match", etag)
+      .end((err, res) => {
+        res.should.have.status(200);
+        res.body.should.be.deep.equal(changed);
+        res.header["etag"].should.not.be.equal(etag);
+        done();
+      });
+  });
+
+  it("it should return 404 for an event that was not exported", done => {
+    chai
+      .request(app)
+      .get("/openapi/event/Winter%20Fest/export")
+      .end((err, res) => {
+        res.should.have.status(404);
+        res.body.message.should.be.equal("Event Winter Fest has not been exported");
+        done();
+      });
+  });
+
+  it("it should not serve files outside the export directory", done => {
+    chai
+      .request(app)
+      .get("/openapi/event/..%2F..%2Fetc%2Fpasswd/export")
+      .end((err, res) => {
+        res.should.not.have.status(200);
+        done();
+      });
+  });
+
+  after(() => {
+    fs.rmSync(export_dir, { recursive: true, force: true });
+  });
+});